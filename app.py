@@ -1,25 +1,60 @@
+import hmac
 import os
 import json
+import time
 from pathlib import Path
 
-from flask import Flask, jsonify, render_template, request, send_from_directory, session
+from flask import (
+    Flask,
+    Response,
+    g,
+    jsonify,
+    render_template,
+    request,
+    send_from_directory,
+    session,
+    stream_with_context,
+)
 from werkzeug.utils import secure_filename
 
-from classification import build_risk_summary
-from detection import count_sensitive_items, detect_sensitive_data
+import metrics
+import tracing
 from extraction import read_document_text
 from ops.audit_export import export_signed_audit
+from ops.batch_scan import store_batch_uploads, stream_batch
+from ops.dashboard_feed import (
+    STREAM_MAX_SECONDS,
+    acquire_stream_slot,
+    get_dashboard_feed,
+    release_stream_slot,
+    sse_stream,
+    streams_closing,
+)
+from ops.jobs import (
+    SSE_POLL_INTERVAL,
+    SYNC_WAIT_SECONDS,
+    JobQueueFull,
+    analyse_document,
+    get_job_runner,
+)
 from ops.ocr_diagnostics import run_ocr_diagnostics
+from ops.profiler import ProfilerBusy, format_profile_report, profile_document
 from ops.retention import run_retention_cleanup
-from protection import encrypt_text, generate_encryption_key, redact_text, verify_redaction_quality
+from ops.scheduler import PRIORITY_CLASSES
+from protection import verify_redaction_quality
 from security.auth import (
     authenticate_user,
     current_user,
     require_login,
     require_permission,
 )
-from storage.audit_repo import log_audit_event, log_scan_event
+from storage.audit_repo import audit_writer_stats, flush_audit_writer, log_audit_event
 from storage.db import init_db
+from storage.event_query import EVENT_KINDS, MAX_PAGE_SIZE, iter_events
+from storage.job_store import TERMINAL_STATUSES, get_job, get_job_params
+from storage.profile_store import get_profile_store
+from storage.scan_rollups import dashboard_summary, recent_scans, scan_feed_version, scan_volume
+from storage.upload_store import StoredUpload, store_upload
 
 app = Flask(__name__)
 app.secret_key = os.environ.get("PRIVGUARD_SECRET_KEY", "privguard-dev-secret-change-me")
@@ -28,7 +63,6 @@ UPLOAD_FOLDER = "uploads"
 OUTPUT_FOLDER = "outputs"
 KEY_FOLDER = "keys"
 AVATAR_FOLDER = os.path.join(UPLOAD_FOLDER, "avatars")
-PROFILE_STORE = Path("instance/user_profiles.json")
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 os.makedirs(KEY_FOLDER, exist_ok=True)
@@ -36,81 +70,48 @@ os.makedirs(AVATAR_FOLDER, exist_ok=True)
 app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
 init_db()
 
-# In-memory scan history (last 10 only)
-scan_history = []
+@app.before_request
+def _start_trace():
+    # POSTs carry the pipeline work (uploads, scans, protection, admin jobs);
+    # reads and event streams are not traced.
+    if request.method != "POST":
+        return
+    scope = tracing.trace(f"http {request.method} {request.path}", endpoint=request.endpoint)
+    trace_id = scope.__enter__()
+    if trace_id is not None:
+        g.trace_scope = scope
 
 
-def _save_upload(file_obj, destination_dir: str) -> Path:
-    filename = secure_filename(file_obj.filename)
-    filepath = Path(destination_dir) / filename
-    file_obj.save(str(filepath))
-    return filepath
+@app.after_request
+def _tag_trace(response):
+    trace_id = tracing.current_trace_id()
+    if trace_id is not None and "trace_scope" in g:
+        tracing.set_attributes(status=response.status_code)
+        response.headers["X-Trace-Id"] = trace_id
+    return response
 
 
-def _load_profile_store() -> dict:
-    if not PROFILE_STORE.exists():
-        return {}
-    try:
-        return json.loads(PROFILE_STORE.read_text(encoding="utf-8"))
-    except Exception:
-        return {}
+@app.teardown_request
+def _finish_trace(exc):
+    scope = g.pop("trace_scope", None)
+    if scope is not None:
+        scope.__exit__(type(exc) if exc else None, exc, None)
+
+
+def _save_upload(file_obj, destination_dir: str) -> StoredUpload:
+    return store_upload(file_obj, destination_dir)
 
 
-def _save_profile_store(data: dict) -> None:
-    PROFILE_STORE.parent.mkdir(parents=True, exist_ok=True)
-    PROFILE_STORE.write_text(json.dumps(data, indent=2), encoding="utf-8")
+def _upload_params(upload: StoredUpload) -> dict:
+    return {"path": str(upload.path), "filename": upload.filename, "content_hash": upload.content_hash}
 
 
 def _get_profile(username: str) -> dict:
-    profiles = _load_profile_store()
-    profile = profiles.get(username, {})
-    display_name = str(profile.get("display_name", username))
-    avatar_url = str(profile.get("avatar_url", ""))
-    return {"display_name": display_name, "avatar_url": avatar_url}
+    return get_profile_store().get(username)
 
 
 def _set_profile(username: str, display_name: str | None = None, avatar_url: str | None = None) -> dict:
-    profiles = _load_profile_store()
-    current = profiles.get(username, {})
-    if display_name is not None:
-        current["display_name"] = display_name
-    if avatar_url is not None:
-        current["avatar_url"] = avatar_url
-    profiles[username] = current
-    _save_profile_store(profiles)
-    return {"display_name": str(current.get("display_name", username)), "avatar_url": str(current.get("avatar_url", ""))}
-
-
-def _build_dashboard_summary() -> dict:
-    total_scans = len(scan_history)
-    risk_distribution = {"High": 0, "Medium": 0, "Low": 0}
-    avg_risk_score = 0.0
-    entity_totals = {
-        "national_ids": 0,
-        "phone_numbers": 0,
-        "emails": 0,
-        "kra_pins": 0,
-    }
-
-    for entry in scan_history:
-        level = str(entry.get("risk_level", "Low"))
-        if level in risk_distribution:
-            risk_distribution[level] += 1
-        avg_risk_score += float(entry.get("risk_score", 0))
-        for key in entity_totals:
-            entity_totals[key] += int(entry.get("counts", {}).get(key, 0))
-
-    avg_risk_score = round(avg_risk_score / total_scans, 2) if total_scans else 0.0
-    high_ratio = round((risk_distribution["High"] / total_scans) * 100, 2) if total_scans else 0.0
-    trend_scores = [int(entry.get("risk_score", 0)) for entry in reversed(scan_history)]
-    return {
-        "documents_scanned": total_scans,
-        "average_risk_score": avg_risk_score,
-        "high_risk_ratio": high_ratio,
-        "risk_distribution": risk_distribution,
-        "entity_totals": entity_totals,
-        "trend_scores": trend_scores,
-    }
+    return get_profile_store().update(username, display_name=display_name, avatar_url=avatar_url)
 
 
 @app.route("/")
@@ -192,13 +193,169 @@ def profile_api():
 @app.route("/api/dashboard-data")
 @require_permission("view_dashboard")
 def dashboard_data():
-    return jsonify({"recent_scans": scan_history, "summary": _build_dashboard_summary()})
+    # Served from scan_events and its rollups, so every worker sees the same totals.
+    flush_audit_writer()
+    low, high = scan_feed_version()
+    etag = f"scans-{low}-{high}"
+    # Unchanged data is answered from two rowid lookups, without rebuilding the summary.
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        recent = recent_scans()
+        response = jsonify(
+            {
+                "recent_scans": recent,
+                "summary": dashboard_summary(recent),
+                "daily_volume": scan_volume("daily", 30),
+                "hourly_volume": scan_volume("hourly", 24),
+                "last_event_id": high,
+            }
+        )
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+@app.route("/api/dashboard-events")
+@require_permission("view_dashboard")
+def dashboard_events():
+    """Server-sent ``scans`` deltas to apply to the ``/api/dashboard-data`` snapshot.
+
+    Pass the snapshot's ``last_event_id`` as ``after``; reconnecting browsers
+    send ``Last-Event-ID`` and get the scans they missed replayed.
+    """
+    after = request.headers.get("Last-Event-ID") or request.args.get("after")
+    try:
+        after_id = int(after) if after else None
+    except ValueError:
+        return jsonify({"error": "after must be an integer"}), 400
+    if not acquire_stream_slot():
+        return _streams_busy_response()
+    return _event_stream_response(sse_stream(get_dashboard_feed(), after_id))
+
+
+def _streams_busy_response():
+    response = jsonify({"error": "Too many open event streams; retry shortly."})
+    response.status_code = 503
+    response.headers["Retry-After"] = "5"
+    return response
+
+
+def _event_stream_response(events):
+    """SSE response that frees its stream slot when the connection closes."""
+    response = Response(
+        stream_with_context(events),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    # Unlike a generator's ``finally``, this runs even if streaming never starts.
+    response.call_on_close(release_stream_slot)
+    return response
+
+
+def _event_page_response(kind: str):
+    """Stream one keyset page of events as JSON: ``{"events": [...], "next_cursor": id}``.
+
+    ``next_cursor`` is null on the last page; pass it back as ``cursor`` to
+    fetch the next one.
+    """
+    try:
+        limit = int(request.args.get("limit", 100))
+        cursor = request.args.get("cursor")
+        cursor = int(cursor) if cursor else None
+    except ValueError:
+        return jsonify({"error": "limit and cursor must be integers"}), 400
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    descending = request.args.get("order", "desc") == "desc"
+    names = EVENT_KINDS[kind][2] + ("since", "until")
+    filters = {name: request.args.get(name) for name in names}
+    flush_audit_writer()
+    try:
+        events = iter_events(kind, filters, cursor=cursor, limit=limit, descending=descending)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    def generate():
+        yield '{"events":['
+        count = 0
+        last_id = None
+        for event in events:
+            yield ("," if count else "") + json.dumps(event)
+            count += 1
+            last_id = event["id"]
+        next_cursor = last_id if count == limit else None
+        yield f'],"next_cursor":{json.dumps(next_cursor)}}}'
+
+    return Response(stream_with_context(generate()), mimetype="application/json")
+
+
+@app.route("/api/audit-events")
+@require_permission("view_audit")
+def audit_events_api():
+    return _event_page_response("audit")
+
+
+@app.route("/api/scan-events")
+@require_permission("view_audit")
+def scan_events_api():
+    return _event_page_response("scan")
+
+
+def _job_links(job_id: str) -> dict:
+    return {
+        "job_id": job_id,
+        "status_url": f"/jobs/{job_id}",
+        "events_url": f"/jobs/{job_id}/events",
+    }
+
+
+def _requested_priority() -> str:
+    """Priority class for this request; clients may only lower their own priority."""
+    priority = (request.values.get("priority") or "interactive").strip().lower()
+    if priority not in PRIORITY_CLASSES:
+        raise ValueError(f"priority must be one of {', '.join(PRIORITY_CLASSES)}")
+    return priority
+
+
+def _rejected_response(exc: JobQueueFull):
+    response = jsonify({"error": str(exc), "retry_after": exc.retry_after})
+    response.status_code = 429
+    response.headers["Retry-After"] = str(exc.retry_after)
+    return response
+
+
+def _admission_error(priority: str):
+    """Return a 429 response when the job would be refused, before the upload is saved."""
+    try:
+        get_job_runner().check_admission(priority, current_user()["username"])
+    except JobQueueFull as exc:
+        return _rejected_response(exc)
+    return None
+
+
+def _submit_job_response(kind: str, params: dict, priority: str):
+    """Queue a job and wait briefly for it, so quick documents still answer inline.
+
+    Slow jobs (or ``async=1`` requests) get 202 with URLs to poll or stream.
+    """
+    runner = get_job_runner()
+    try:
+        job_id = runner.submit(kind, current_user()["username"], params, priority)
+    except JobQueueFull as exc:
+        return _rejected_response(exc)
+    wants_async = (request.values.get("async") or "").lower() in {"1", "true", "yes"}
+    if not wants_async and runner.wait(job_id, SYNC_WAIT_SECONDS):
+        job = get_job(job_id)
+        if job is not None and job["status"] == "done":
+            return jsonify(job["result"])
+        if job is not None and job["status"] == "failed":
+            return jsonify({"error": job["error"]}), 400
+    return jsonify({**_job_links(job_id), "status": "queued", "priority": priority}), 202
 
 
 @app.route("/scan", methods=["POST"])
 @require_permission("scan")
 def scan():
-    global scan_history
     if "file" not in request.files:
         return jsonify({"error": "No file uploaded"}), 400
 
@@ -207,146 +364,176 @@ def scan():
         return jsonify({"error": "Empty filename"}), 400
 
     try:
-        path = _save_upload(file, app.config["UPLOAD_FOLDER"])
-        extracted_text = read_document_text(path)
-        findings = detect_sensitive_data(extracted_text)
-        risk = build_risk_summary(findings)
-
-        scan_entry = {
-            "filename": path.name,
-            "risk_level": risk["level"],
-            "risk_score": risk["score"],
-            "counts": risk["counts"],
-        }
-        scan_history.insert(0, scan_entry)
-        scan_history = scan_history[:10]
-        total_items = count_sensitive_items(findings)
-        log_scan_event(path.name, risk["level"], risk["score"], total_items, source="web")
-        log_audit_event(
-            event_type="scan",
-            actor="web-user",
-            source="web",
-            details={
-                "filename": path.name,
-                "risk_level": risk["level"],
-                "risk_score": risk["score"],
-                "total_sensitive_items": total_items,
-            },
-        )
+        priority = _requested_priority()
+        rejected = _admission_error(priority)
+        if rejected is not None:
+            return rejected
+        upload = _save_upload(file, app.config["UPLOAD_FOLDER"])
+    except Exception as exc:
+        return jsonify({"error": str(exc)}), 400
+    return _submit_job_response("scan", _upload_params(upload), priority)
 
-        return jsonify(
-            {
-                "filename": path.name,
-                "findings": findings,
-                "risk_score": risk["score"],
-                "risk_level": risk["level"],
-                "counts": risk["counts"],
-                "insights": risk["insights"],
-                "extracted_preview": extracted_text[:700],
-            }
-        )
+
+@app.route("/scan/batch", methods=["POST"])
+@require_permission("scan")
+def scan_batch():
+    """Scan many files (or zips of files); stream one NDJSON line per file as it finishes."""
+    files = request.files.getlist("files")
+    if not files:
+        return jsonify({"error": "No files uploaded"}), 400
+    user = current_user()["username"]
+    try:
+        rejected = _admission_error("batch")
+        if rejected is not None:
+            return rejected
+        uploads, skipped = store_batch_uploads(files, app.config["UPLOAD_FOLDER"])
     except Exception as exc:
         return jsonify({"error": str(exc)}), 400
+    if not uploads and not skipped:
+        return jsonify({"error": "No supported files in upload"}), 400
+    return Response(
+        stream_with_context(
+            stream_batch(get_job_runner(), uploads, skipped, user, trace_id=tracing.current_trace_id())
+        ),
+        mimetype="application/x-ndjson",
+        headers={"X-Accel-Buffering": "no"},
+    )
+
+
+def _scanned_document(scan_id: str):
+    """Upload parameters of a finished scan the current user may reuse, or None.
+
+    The scan id is the scan job's id. Successful scan jobs are kept as long
+    as stored scan results (``uploads.result_ttl_seconds``).
+    """
+    job = _visible_job(scan_id)
+    if job is None or job["kind"] != "scan" or job["status"] != "done":
+        return None
+    params = get_job_params(scan_id) or {}
+    return {key: params[key] for key in ("path", "filename", "content_hash") if key in params}
 
 
 @app.route("/protect", methods=["POST"])
 @require_permission("protect")
 def protect():
-    if "file" not in request.files:
+    scan_id = request.form.get("scan_id", "").strip()
+    if not scan_id and "file" not in request.files:
         return jsonify({"error": "No file uploaded"}), 400
 
     action = request.form.get("action", "").strip().lower()
     if action not in {"redact", "encrypt"}:
         return jsonify({"error": "Action must be redact or encrypt"}), 400
 
-    file = request.files["file"]
-    if file.filename == "":
+    if not scan_id and request.files["file"].filename == "":
         return jsonify({"error": "Empty filename"}), 400
 
     try:
-        path = _save_upload(file, app.config["UPLOAD_FOLDER"])
-        source_text = read_document_text(path)
-        findings = detect_sensitive_data(source_text)
-
-        if action == "redact":
-            protected = redact_text(source_text, findings)
-            out_path = Path(OUTPUT_FOLDER) / f"{path.stem}.redacted.txt"
-            out_path.write_text(protected, encoding="utf-8")
-            quality = verify_redaction_quality(findings, protected)
-            log_audit_event(
-                event_type="protect_redact",
-                actor="web-user",
-                source="web",
-                details={
-                    "filename": path.name,
-                    "output_file": str(out_path),
-                    "quality_status": quality["quality_status"],
-                    "leak_count": quality["leak_count"],
-                },
-            )
-            return jsonify(
-                {
-                    "action": "redact",
-                    "output_file": str(out_path),
-                    "quality": quality,
-                    "preview": protected[:700],
-                }
-            )
-
-        key = generate_encryption_key()
-        key_path = Path(KEY_FOLDER) / f"{path.stem}.key"
-        key_path.write_bytes(key)
-        encrypted = encrypt_text(source_text, key)
-        out_path = Path(OUTPUT_FOLDER) / f"{path.stem}.encrypted.txt"
-        out_path.write_text(encrypted, encoding="utf-8")
-        log_audit_event(
-            event_type="protect_encrypt",
-            actor="web-user",
-            source="web",
-            details={
-                "filename": path.name,
-                "output_file": str(out_path),
-                "key_file": str(key_path),
-            },
-        )
-        return jsonify(
-            {
-                "action": "encrypt",
-                "output_file": str(out_path),
-                "key_file": str(key_path),
-                "preview": encrypted[:220],
-            }
-        )
+        priority = _requested_priority()
+        rejected = _admission_error(priority)
+        if rejected is not None:
+            return rejected
+        if scan_id:
+            document = _scanned_document(scan_id)
+            if document is None:
+                return jsonify({"error": "Scan not found or expired; upload the file again"}), 404
+        else:
+            document = _upload_params(_save_upload(request.files["file"], app.config["UPLOAD_FOLDER"]))
     except Exception as exc:
         return jsonify({"error": str(exc)}), 400
+    return _submit_job_response(
+        "protect",
+        {**document, "action": action, "output_dir": OUTPUT_FOLDER, "key_dir": KEY_FOLDER},
+        priority,
+    )
+
+
+def _visible_job(job_id: str):
+    """Return the job if the current user submitted it (admins see every job)."""
+    job = get_job(job_id)
+    user = current_user()
+    if job is None or (user["role"] != "admin" and job["actor"] != user["username"]):
+        return None
+    return job
+
+
+@app.route("/jobs/<job_id>")
+@require_login
+def job_status(job_id: str):
+    job = _visible_job(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify({**job, **_job_links(job_id)})
+
+
+@app.route("/jobs/<job_id>/events")
+@require_login
+def job_events(job_id: str):
+    """Server-sent events: one ``status`` event per state change, then ``done``/``failed``.
+
+    The job row is polled from SQLite, so the stream works from any worker
+    process, not only the one running the job.
+    """
+    if _visible_job(job_id) is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    if not acquire_stream_slot():
+        return _streams_busy_response()
+
+    def generate():
+        last_status = None
+        ends_at = time.monotonic() + STREAM_MAX_SECONDS
+        while True:
+            if streams_closing() or time.monotonic() >= ends_at:
+                return  # EventSource reconnects and gets the current status
+            job = get_job(job_id)
+            if job is None:
+                yield 'event: failed\ndata: {"error": "Job expired"}\n\n'
+                return
+            if job["status"] in TERMINAL_STATUSES:
+                yield f"event: {job['status']}\ndata: {json.dumps(job)}\n\n"
+                return
+            if job["status"] != last_status:
+                last_status = job["status"]
+                yield f"event: status\ndata: {json.dumps({'status': last_status})}\n\n"
+            else:
+                yield ": keep-alive\n\n"
+            time.sleep(SSE_POLL_INTERVAL)
+
+    return _event_stream_response(generate())
 
 
 @app.route("/verify-redaction", methods=["POST"])
 @require_permission("verify")
 def verify_redaction():
-    if "original" not in request.files or "protected" not in request.files:
+    scan_id = request.form.get("scan_id", "").strip()
+    if "protected" not in request.files or (not scan_id and "original" not in request.files):
         return jsonify({"error": "Upload both original and protected files"}), 400
 
-    original = request.files["original"]
     protected = request.files["protected"]
-    if original.filename == "" or protected.filename == "":
+    if protected.filename == "" or (not scan_id and request.files["original"].filename == ""):
         return jsonify({"error": "Both files must have valid names"}), 400
 
     try:
-        original_path = _save_upload(original, app.config["UPLOAD_FOLDER"])
-        protected_path = _save_upload(protected, app.config["UPLOAD_FOLDER"])
-
-        original_text = read_document_text(original_path)
-        protected_text = read_document_text(protected_path)
-        original_findings = detect_sensitive_data(original_text)
+        if scan_id:
+            original = _scanned_document(scan_id)
+            if original is None:
+                return jsonify({"error": "Scan not found or expired; upload the file again"}), 404
+        else:
+            original = _upload_params(_save_upload(request.files["original"], app.config["UPLOAD_FOLDER"]))
+        protected_upload = _save_upload(protected, app.config["UPLOAD_FOLDER"])
+
+        # The original's text and findings come from the stored scan result when available.
+        _, original_findings, _, _ = analyse_document(original)
+        protected_text = read_document_text(protected_upload.path)
         quality = verify_redaction_quality(original_findings, protected_text)
         log_audit_event(
             event_type="verify_redaction",
             actor="web-user",
             source="web",
             details={
-                "original_file": original_path.name,
-                "protected_file": protected_path.name,
+                "original_file": original.get("filename"),
+                "protected_file": protected_upload.filename,
+                "scan_id": scan_id or None,
                 "quality_status": quality["quality_status"],
                 "leak_count": quality["leak_count"],
             },
@@ -360,7 +547,7 @@ def verify_redaction():
 @require_permission("admin_export")
 def admin_export_audit():
     try:
-        result = export_signed_audit(limit=5000)
+        result = export_signed_audit()
         user = current_user() or {"username": "unknown"}
         log_audit_event(
             event_type="export_audit",
@@ -407,5 +594,88 @@ def admin_ocr_diagnostics():
         return jsonify({"error": str(exc)}), 400
 
 
+@app.route("/admin/profile", methods=["POST"])
+@require_permission("admin_cleanup")
+def admin_profile():
+    """Profile scan + protect for one uploaded document; ``format=text`` returns the tables."""
+    if "file" not in request.files:
+        return jsonify({"error": "No file uploaded"}), 400
+    file = request.files["file"]
+    if file.filename == "":
+        return jsonify({"error": "Empty filename"}), 400
+
+    try:
+        upload = _save_upload(file, app.config["UPLOAD_FOLDER"])
+        top = request.form.get("top")
+        report = profile_document(
+            upload.path,
+            action=request.form.get("action", "redact"),
+            top=int(top) if top else None,
+            sort=request.form.get("sort") or None,
+        )
+    except ProfilerBusy as exc:
+        return jsonify({"error": str(exc)}), 409
+    except Exception as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    user = current_user() or {"username": "unknown"}
+    log_audit_event(
+        event_type="profile_document",
+        actor=user["username"],
+        source="web",
+        details={
+            "filename": upload.filename,
+            "action": report["action"],
+            "wall_ms": report["total"]["wall_ms"],
+        },
+    )
+    report["input_file"] = upload.filename
+    if request.form.get("format") == "text":
+        return Response(format_profile_report(report), content_type="text/plain; charset=utf-8")
+    return jsonify(report)
+
+
+@app.route("/admin/job-stats")
+@require_permission("admin_cleanup")
+def admin_job_stats():
+    """Worker pool counters and per-class queue depth and queue-wait histograms."""
+    return jsonify(get_job_runner().stats())
+
+
+def _metrics_token_presented() -> bool:
+    # Prometheus cannot log in; it may present PRIVGUARD_METRICS_TOKEN instead.
+    token = os.environ.get("PRIVGUARD_METRICS_TOKEN", "")
+    supplied = request.headers.get("Authorization", "")
+    return bool(token) and hmac.compare_digest(supplied.encode(), f"Bearer {token}".encode())
+
+
+def _metrics_response() -> Response:
+    writer = audit_writer_stats()
+    extra = get_job_runner().prometheus_lines()
+    extra += metrics.header_lines(
+        "privguard_audit_queue_depth", "gauge", "Audit events waiting for the background writer."
+    )
+    extra.append(metrics.sample_line("privguard_audit_queue_depth", writer.get("queue_depth", 0)))
+    # Values are per process; the pid tells which server worker answered.
+    extra += metrics.header_lines("privguard_process_info", "gauge", "Process serving this scrape.")
+    extra.append(metrics.sample_line("privguard_process_info", 1, ("pid",), (str(os.getpid()),)))
+    return Response(
+        metrics.render_prometheus(extra), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@require_permission("view_metrics")
+def _admin_metrics() -> Response:
+    return _metrics_response()
+
+
+@app.route("/metrics")
+def metrics_endpoint():
+    """Stage histograms, counters and job-queue gauges in Prometheus text format."""
+    if _metrics_token_presented():
+        return _metrics_response()
+    return _admin_metrics()
+
+
 if __name__ == "__main__":
     app.run(debug=True)
\ No newline at end of file
@@ -1,7 +1,7 @@
 import logging
 import os
 
-LOG_DIR = "logs"
+LOG_DIR = os.environ.get("PRIVGUARD_LOG_DIR", "logs")
 LOG_FILE = "privguard.log"
 
 # Ensure logs directory exists
@@ -5,6 +5,7 @@ from __future__ import annotations
 from typing import Dict, List
 
 from config_loader import load_risk_policy
+from metrics import stage
 
 RISK_POLICY = load_risk_policy()
 WEIGHTS = RISK_POLICY["weights"]
@@ -75,11 +76,12 @@ def compliance_insights(findings: Dict[str, List[dict]], risk_level: str) -> Lis
 
 def build_risk_summary(findings: Dict[str, List[dict]]) -> Dict[str, object]:
     """Create a single risk summary payload for dashboard/CLI output."""
-    score = calculate_risk_score(findings)
-    level = classify_risk_level(score)
-    return {
-        "score": score,
-        "level": level,
-        "counts": {k: len(v) for k, v in findings.items()},
-        "insights": compliance_insights(findings, level),
-    }
+    with stage("classify"):
+        score = calculate_risk_score(findings)
+        level = classify_risk_level(score)
+        return {
+            "score": score,
+            "level": level,
+            "counts": {k: len(v) for k, v in findings.items()},
+            "insights": compliance_insights(findings, level),
+        }
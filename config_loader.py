@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import hashlib
 from functools import lru_cache
 from pathlib import Path
 from typing import Any, Dict
@@ -11,6 +12,9 @@ import yaml
 
 BASE_DIR = Path(__file__).resolve().parent
 CONFIG_DIR = BASE_DIR / "config"
+# Bump whenever a code change (patterns, validators, scoring) can change scan
+# results for the same config; it invalidates reused results like a rule edit.
+DETECTION_ENGINE_VERSION = "1"
 
 
 @lru_cache(maxsize=1)
@@ -29,3 +33,15 @@ def load_risk_policy() -> Dict[str, Any]:
 def load_system_config() -> Dict[str, Any]:
     with (CONFIG_DIR / "system_config.yaml").open("r", encoding="utf-8") as handle:
         return yaml.safe_load(handle)
+
+
+@lru_cache(maxsize=1)
+def rules_version() -> str:
+    """Fingerprint of the detection engine version, rules and risk policy.
+
+    Stored scan results are only reusable while this value is unchanged.
+    """
+    digest = hashlib.sha256(f"engine:{DETECTION_ENGINE_VERSION}\n".encode("utf-8"))
+    for name in ("detection_rules.yaml", "risk_policy.yaml"):
+        digest.update((CONFIG_DIR / name).read_bytes())
+    return digest.hexdigest()[:16]
@@ -10,7 +10,10 @@ import re
 from dataclasses import dataclass, asdict
 from typing import Dict, List
 
+import metrics
+import tracing
 from config_loader import load_detection_config
+from metrics import stage
 
 DETECTION_CONFIG = load_detection_config()
 PATTERNS = DETECTION_CONFIG["patterns"]
@@ -20,10 +23,32 @@ PHONE_PATTERN = re.compile(PATTERNS["phone_numbers"])
 NATIONAL_ID_PATTERN = re.compile(PATTERNS["national_ids"])
 KRA_PIN_PATTERN = re.compile(PATTERNS["kra_pins"])
 
+# Single-pass alternation used by streaming redaction. Order matters: at a
+# given position the first alternative wins, so phones and emails take
+# precedence over the shorter national ID digits they may contain.
+COMBINED_PATTERN_ORDER = ("phone_numbers", "emails", "kra_pins", "national_ids")
+COMBINED_PATTERN = re.compile(
+    "|".join(f"(?P<{key}>{PATTERNS[key]})" for key in COMBINED_PATTERN_ORDER)
+)
+# Optional cheap pattern that every sensitive match contains; text without a
+# prefilter hit cannot contain findings and is skipped by streaming redaction.
+PREFILTER_PATTERN = (
+    re.compile(DETECTION_CONFIG["prefilter"]) if DETECTION_CONFIG.get("prefilter") else None
+)
+
 
 TYPE_KEYWORDS = {
     key: set(values) for key, values in DETECTION_CONFIG["type_keywords"].items()
 }
+ENTITY_PATTERNS = (
+    ("national_ids", NATIONAL_ID_PATTERN, "national_id"),
+    ("phone_numbers", PHONE_PATTERN, "phone"),
+    ("emails", EMAIL_PATTERN, "email"),
+    ("kra_pins", KRA_PIN_PATTERN, "kra_pin"),
+)
+FINDINGS = metrics.counter(
+    "privguard_findings_total", "Sensitive values detected, by entity type.", ("entity",)
+)
 
 
 @dataclass
@@ -89,23 +114,28 @@ def detect_sensitive_data(text: str) -> Dict[str, List[Dict[str, object]]]:
     """Detect sensitive entities from plain text.
 
     Returns a mapping where each key is a sensitive type and each value is a
-    list of serializable match dictionaries.
+    list of serializable match dictionaries. Timed as the ``detect`` stage,
+    with one ``detect_<type>`` stage per entity type.
     """
-    findings = {
-        "national_ids": _build_matches(text, NATIONAL_ID_PATTERN, "national_id"),
-        "phone_numbers": _build_matches(text, PHONE_PATTERN, "phone"),
-        "emails": _build_matches(text, EMAIL_PATTERN, "email"),
-        "kra_pins": _build_matches(text, KRA_PIN_PATTERN, "kra_pin"),
-    }
-
-    # Basic conflict cleanup to avoid phone numbers being interpreted as IDs.
-    phone_values = {match.value for match in findings["phone_numbers"]}
-    filtered_ids = [
-        match for match in findings["national_ids"] if match.value not in phone_values
-    ]
-    findings["national_ids"] = filtered_ids
-
-    return {key: [item.to_dict() for item in items] for key, items in findings.items()}
+    with stage("detect"):
+        findings: Dict[str, List[SensitiveMatch]] = {}
+        for key, pattern, data_type in ENTITY_PATTERNS:
+            with stage(f"detect_{key}"):
+                findings[key] = _build_matches(text, pattern, data_type)
+                tracing.set_attributes(matches=len(findings[key]))
+
+        # Basic conflict cleanup to avoid phone numbers being interpreted as IDs.
+        phone_values = {match.value for match in findings["phone_numbers"]}
+        filtered_ids = [
+            match for match in findings["national_ids"] if match.value not in phone_values
+        ]
+        findings["national_ids"] = filtered_ids
+
+        for key, items in findings.items():
+            if items:
+                FINDINGS.inc(key, amount=len(items))
+        tracing.set_attributes(chars=len(text), matches=sum(len(items) for items in findings.values()))
+        return {key: [item.to_dict() for item in items] for key, items in findings.items()}
 
 
 def count_sensitive_items(findings: Dict[str, List[Dict[str, object]]]) -> int:
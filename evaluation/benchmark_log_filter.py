@@ -0,0 +1,82 @@
+"""Microbenchmark for the in-process logging redaction filter.
+
+Measures per-call logging overhead for clean and dirty records, with and
+without ``RedactingFilter`` attached to the handler.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+from security.log_redaction import RedactingFilter
+
+
+REPORT_PATH = BASE_DIR / "reports" / "log_filter_benchmark.json"
+ITERATIONS = 100_000
+REPEATS = 3
+
+CASES = {
+    "clean_constant": ("request completed", ()),
+    "clean_args": ("GET %s status=%d latency_ms=%d", ("/api/v1/items", 200, 12)),
+    "dirty_args": ("sms sent to %s for user %s", ("0712345678", "person@example.org")),
+    "dirty_constant": ("callback from 0712345678 failed", ()),
+}
+
+
+class _FormattingNullHandler(logging.Handler):
+    """Format every record like a real handler, then discard it."""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.format(record)
+
+
+def _time_case(logger: logging.Logger, msg: str, args: tuple) -> float:
+    """Best-of-N microseconds per logging call."""
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        for _ in range(ITERATIONS):
+            logger.info(msg, *args)
+        best = min(best, time.perf_counter() - start)
+    return best / ITERATIONS * 1_000_000
+
+
+def benchmark() -> dict:
+    handler = _FormattingNullHandler()
+    logger = logging.getLogger("privguard.benchmark")
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+
+    results = {}
+    for name, (msg, args) in CASES.items():
+        baseline = _time_case(logger, msg, args)
+        handler.addFilter(redacting := RedactingFilter())
+        filtered = _time_case(logger, msg, args)
+        handler.removeFilter(redacting)
+        results[name] = {
+            "baseline_us": round(baseline, 3),
+            "filtered_us": round(filtered, 3),
+            "overhead_us": round(filtered - baseline, 3),
+        }
+    return {"iterations": ITERATIONS, "repeats": REPEATS, "cases": results}
+
+
+def main() -> None:
+    REPORT_PATH.parent.mkdir(parents=True, exist_ok=True)
+    report = benchmark()
+    REPORT_PATH.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(json.dumps(report, indent=2))
+    print(f"Wrote log filter benchmark to {REPORT_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Throughput benchmark for ``redact-stream``.
+
+Measures lines per second through ``redact_stream`` for clean and dirty log
+input, for both the redact and mask actions, with audit events disabled.
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+from redaction_stream import redact_stream
+
+
+REPORT_PATH = BASE_DIR / "reports" / "redaction_stream_benchmark.json"
+LINES = 200_000
+REPEATS = 3
+ACTIONS = ("redact", "mask")
+
+CASES = {
+    "clean": (
+        "2024-05-01T12:00:00Z INFO GET /api/v1/items status=200 latency_ms=12\n",
+        "2024-05-01T12:00:01Z DEBUG cache hit key=items:page:3 ttl=300\n",
+    ),
+    "dirty": (
+        "2024-05-01T12:00:00Z INFO sms sent to 0712345678 for person@example.org\n",
+        "2024-05-01T12:00:01Z WARN callback from 0798765432 failed id 12345678\n",
+    ),
+}
+
+
+def _payload(lines: tuple) -> bytes:
+    return "".join(lines[i % len(lines)] for i in range(LINES)).encode("utf-8")
+
+
+def _time_case(payload: bytes, action: str) -> float:
+    """Best-of-N lines per second through the stream."""
+    best = float("inf")
+    for _ in range(REPEATS):
+        sink = io.BytesIO()
+        start = time.perf_counter()
+        redact_stream(io.BytesIO(payload), sink, action=action, emit=None)
+        best = min(best, time.perf_counter() - start)
+    return LINES / best
+
+
+def benchmark() -> dict:
+    results = {}
+    for name, lines in CASES.items():
+        payload = _payload(lines)
+        results[name] = {
+            action: {"lines_per_sec": round(_time_case(payload, action))} for action in ACTIONS
+        }
+    return {"lines": LINES, "repeats": REPEATS, "cases": results}
+
+
+def main() -> None:
+    REPORT_PATH.parent.mkdir(parents=True, exist_ok=True)
+    report = benchmark()
+    REPORT_PATH.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(json.dumps(report, indent=2))
+    print(f"Wrote redaction stream benchmark to {REPORT_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,10 +7,16 @@ from __future__ import annotations
 
 import os
 import shutil
+import threading
 from pathlib import Path
+from typing import Optional
 
 from PIL import Image, ImageOps
 import pytesseract
+
+import metrics
+import tracing
+from metrics import stage
 try:
     from pypdf import PdfReader
 except Exception:  # pragma: no cover - optional dependency import path
@@ -24,6 +30,30 @@ except Exception:  # pragma: no cover - optional dependency import path
 TEXT_SUFFIXES = {".txt", ".md", ".csv", ".log"}
 PDF_SUFFIXES = {".pdf"}
 IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".bmp", ".tiff", ".webp"}
+EXTRACTIONS = metrics.counter(
+    "privguard_extractions_total", "Documents extracted, by method (native or ocr).", ("method",)
+)
+
+_ocr_slots: Optional[threading.BoundedSemaphore] = None
+
+
+def set_ocr_concurrency(limit: Optional[int]) -> None:
+    """Cap concurrent Tesseract runs in this process; None or 0 removes the cap."""
+    global _ocr_slots
+    _ocr_slots = threading.BoundedSemaphore(limit) if limit else None
+
+
+def _run_ocr(image: Image.Image) -> str:
+    # psm 6 assumes a block of text, suitable for forms/documents.
+    slots = _ocr_slots
+    with stage("ocr"):
+        if slots is None:
+            return pytesseract.image_to_string(image, config="--oem 3 --psm 6")
+        with slots:
+            return pytesseract.image_to_string(image, config="--oem 3 --psm 6")
+
+
+_tesseract_resolved = False
 
 
 def _configure_tesseract_cmd() -> None:
@@ -33,15 +63,23 @@ def _configure_tesseract_cmd() -> None:
     1) `TESSERACT_CMD` environment variable
     2) executable discoverable on PATH
     3) common Windows install locations under Program Files
+
+    A resolved path is kept for the life of the process (and inherited by
+    forked server workers); an unresolved one is retried on the next call.
     """
+    global _tesseract_resolved
+    if _tesseract_resolved:
+        return
     env_cmd = os.environ.get("TESSERACT_CMD", "").strip()
     if env_cmd and Path(env_cmd).exists():
         pytesseract.pytesseract.tesseract_cmd = env_cmd
+        _tesseract_resolved = True
         return
 
     on_path = shutil.which("tesseract")
     if on_path:
         pytesseract.pytesseract.tesseract_cmd = on_path
+        _tesseract_resolved = True
         return
 
     common_windows_paths = [
@@ -51,6 +89,7 @@ def _configure_tesseract_cmd() -> None:
     for candidate in common_windows_paths:
         if candidate.exists():
             pytesseract.pytesseract.tesseract_cmd = str(candidate)
+            _tesseract_resolved = True
             return
 
 
@@ -60,8 +99,9 @@ def _extract_text_from_image(path: Path) -> str:
     image = Image.open(path)
     # Improve OCR quality with grayscale and auto contrast.
     processed = ImageOps.autocontrast(ImageOps.grayscale(image))
-    # psm 6 assumes a block of text, suitable for forms/documents.
-    return pytesseract.image_to_string(processed, config="--oem 3 --psm 6")
+    EXTRACTIONS.inc("ocr")
+    tracing.set_attributes(method="ocr", pages=1)
+    return _run_ocr(processed)
 
 
 def _extract_text_from_pdf(path: Path) -> str:
@@ -76,11 +116,14 @@ def _extract_text_from_pdf(path: Path) -> str:
             "PDF support requires 'pypdf'. Install dependencies from requirements.txt."
         )
     reader = PdfReader(str(path))
+    tracing.set_attributes(pages=len(reader.pages))
     chunks = []
     for page in reader.pages:
         chunks.append(page.extract_text() or "")
     text = "\n".join(chunks).strip()
     if text:
+        EXTRACTIONS.inc("native")
+        tracing.set_attributes(method="native")
         return text
 
     if fitz is None:
@@ -91,14 +134,17 @@ def _extract_text_from_pdf(path: Path) -> str:
     try:
         ocr_chunks = []
         _configure_tesseract_cmd()
+        EXTRACTIONS.inc("ocr")
+        tracing.set_attributes(method="ocr")
         with fitz.open(str(path)) as doc:
-            for page in doc:
-                pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
-                image = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-                processed = ImageOps.autocontrast(ImageOps.grayscale(image))
-                ocr_chunks.append(
-                    pytesseract.image_to_string(processed, config="--oem 3 --psm 6")
-                )
+            for number, page in enumerate(doc, start=1):
+                with tracing.span("ocr_page", page=number):
+                    pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
+                    image = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+                    processed = ImageOps.autocontrast(ImageOps.grayscale(image))
+                    page_text = _run_ocr(processed)
+                    tracing.set_attributes(chars=len(page_text))
+                ocr_chunks.append(page_text)
         return "\n".join(ocr_chunks).strip()
     except pytesseract.TesseractNotFoundError as exc:
         raise RuntimeError(
@@ -110,11 +156,20 @@ def _extract_text_from_pdf(path: Path) -> str:
 def read_document_text(path: Path) -> str:
     """Read a supported document path and return extracted text.
 
+    Timed as the ``extract`` stage; OCR time within it is the ``ocr`` stage.
+
     Raises:
         FileNotFoundError: If input path does not exist.
         ValueError: If path is not file or unsupported type.
         RuntimeError: If OCR is unavailable for image extraction.
     """
+    with stage("extract"):
+        text = _read_document_text(path)
+        tracing.set_attributes(bytes=path.stat().st_size, chars=len(text))
+        return text
+
+
+def _read_document_text(path: Path) -> str:
     if not path.exists():
         raise FileNotFoundError(f"Input file not found: {path}")
     if not path.is_file():
@@ -122,6 +177,8 @@ def read_document_text(path: Path) -> str:
 
     suffix = path.suffix.lower()
     if suffix in TEXT_SUFFIXES:
+        EXTRACTIONS.inc("native")
+        tracing.set_attributes(method="native")
         return path.read_text(encoding="utf-8", errors="replace")
 
     if suffix in PDF_SUFFIXES:
@@ -6,18 +6,28 @@ Offline-first CLI for detecting, classifying, and protecting sensitive data.
 from __future__ import annotations
 
 import argparse
+import contextlib
 import json
+import signal
 import sys
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Iterator
 
 from classification import build_risk_summary
 from dashboard import render_dashboard
 from detection import count_sensitive_items, detect_sensitive_data
 from extraction import read_document_text
+import tracing
+from metrics import collect_timings, format_timings
 from ops.audit_export import export_signed_audit
+from ops.audit_integrity import verify_audit_chain
+from ops.audit_segments import export_audit_segment, verify_export_chain
+from ops.corpus_scan import is_corpus_input, scan_corpus
 from ops.ocr_diagnostics import run_ocr_diagnostics
+from ops.profiler import PROFILE_ACTIONS, SORT_KEYS, format_profile_report, profile_document
 from ops.retention import run_retention_cleanup
+from ops.server import serve
+from ops.watcher import DropFolderWatcher, print_watch_status
 from pilot.build_evidence_pack import build_pack
 from protection import (
     decrypt_text,
@@ -30,8 +40,23 @@ from protection import (
     validate_encrypted_token,
     verify_redaction_quality,
 )
+from redaction_stream import redact_stream
+from storage.audit_archive import archive_sealed_months, prune_archive, verify_archive
 from storage.audit_repo import log_audit_event, log_scan_event
 from storage.db import init_db
+from storage.event_query import iter_events
+
+
+@contextlib.contextmanager
+def pipeline_run(command: str, timings: bool) -> Iterator[None]:
+    """Trace the block; with ``--timings`` also print its stage timings to stderr."""
+    with tracing.trace(f"cli.{command}"):
+        if not timings:
+            yield
+            return
+        with collect_timings() as collected:
+            yield
+    print(format_timings(collected), file=sys.stderr)
 
 
 def write_output(path: Path, content: str) -> None:
@@ -59,6 +84,7 @@ def run_scan(input_path: Path, show_dashboard: bool = True) -> Dict[str, object]
         risk_score=int(risk_summary["score"]),
         total_sensitive_items=total_items,
         source="cli",
+        counts=risk_summary["counts"],
     )
     log_audit_event(
         event_type="scan",
@@ -178,18 +204,42 @@ def parser_builder() -> argparse.ArgumentParser:
     scan.add_argument(
         "--input",
         required=True,
-        help="Path to supported file (.txt/.md/.csv/.log or image: .png/.jpg/.jpeg/.bmp/.tiff/.webp).",
+        help=(
+            "Path to supported file (.txt/.md/.csv/.log or image: .png/.jpg/.jpeg/.bmp/.tiff/.webp), "
+            "a directory, or a glob pattern such as 'share/**/*.pdf'."
+        ),
     )
     scan.add_argument(
         "--json-output",
         required=False,
         help="Optional path to save JSON scan report.",
     )
+    scan.add_argument(
+        "--jsonl-output",
+        default="outputs/corpus_scan.jsonl",
+        help="JSONL report path (one record per document) for directory/glob scans.",
+    )
+    scan.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes for directory/glob scans (default: CPU count).",
+    )
+    scan.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Skip documents unchanged since their last scan under the same rules.",
+    )
     scan.add_argument(
         "--extracted-output",
         required=False,
         help="Optional path to save extracted text from the input file.",
     )
+    scan.add_argument(
+        "--timings",
+        action="store_true",
+        help="Print per-stage timings (extract, ocr, detect, classify, ...) to stderr.",
+    )
 
     protect = sub.add_parser(
         "protect",
@@ -216,6 +266,11 @@ def parser_builder() -> argparse.ArgumentParser:
         required=False,
         help="Optional key file location for encrypt action.",
     )
+    protect.add_argument(
+        "--timings",
+        action="store_true",
+        help="Print per-stage timings (extract, ocr, detect, classify, ...) to stderr.",
+    )
 
     decrypt = sub.add_parser("decrypt", help="Decrypt a previously encrypted output file.")
     decrypt.add_argument("--input", required=True, help="Path to encrypted text file.")
@@ -237,10 +292,155 @@ def parser_builder() -> argparse.ArgumentParser:
         required=False,
         help="Optional path to save verification report JSON.",
     )
+    verify.add_argument(
+        "--timings",
+        action="store_true",
+        help="Print per-stage timings (extract, ocr, detect, classify, ...) to stderr.",
+    )
 
-    sub.add_parser(
+    watch = sub.add_parser(
+        "watch",
+        help="Continuously scan or protect files as they land in drop folders.",
+    )
+    watch.add_argument(
+        "--dir",
+        required=True,
+        action="append",
+        help="Directory to watch (repeat for several folders).",
+    )
+    watch.add_argument(
+        "--action",
+        default="scan",
+        choices=["scan", "redact", "mask", "encrypt"],
+        help="Operation to run on each settled file.",
+    )
+    watch.add_argument(
+        "--output-dir",
+        default="outputs",
+        help="Directory where protected output will be written.",
+    )
+    watch.add_argument("--workers", type=int, default=2, help="Concurrent worker threads.")
+    watch.add_argument(
+        "--queue-size",
+        type=int,
+        default=100,
+        help="Maximum files waiting for a worker before back-pressure applies.",
+    )
+    watch.add_argument(
+        "--debounce",
+        type=float,
+        default=2.0,
+        help="Seconds a file must stay unchanged before it is processed.",
+    )
+    watch.add_argument(
+        "--poll-interval",
+        type=float,
+        default=1.0,
+        help="Polling interval in seconds when inotify is unavailable.",
+    )
+    watch.add_argument(
+        "--no-inotify",
+        action="store_true",
+        help="Force the polling backend even if inotify is available.",
+    )
+
+    stream = sub.add_parser(
+        "redact-stream",
+        help="Redact or mask stdin to stdout as a log pipeline stage.",
+    )
+    stream.add_argument(
+        "--action",
+        default="redact",
+        choices=["redact", "mask"],
+        help="Rewrite sensitive values with [REDACTED] or a partial mask.",
+    )
+    stream.add_argument(
+        "--audit-interval",
+        type=float,
+        default=60.0,
+        help="Seconds between aggregated audit events.",
+    )
+
+    events = sub.add_parser(
+        "events",
+        help="Query audit or scan events with filters; prints JSONL, one event per line.",
+    )
+    events.add_argument("kind", choices=["audit", "scan"], help="Which event table to query.")
+    events.add_argument("--since", default=None, help="Only events at or after this ISO time (UTC).")
+    events.add_argument("--until", default=None, help="Only events before this ISO time (UTC).")
+    events.add_argument("--event-type", default=None, help="Audit events: filter by event type.")
+    events.add_argument("--actor", default=None, help="Audit events: filter by actor.")
+    events.add_argument("--source", default=None, help="Filter by source (cli, web, ...).")
+    events.add_argument(
+        "--risk-level",
+        choices=["High", "Medium", "Low"],
+        default=None,
+        help="Scan events: filter by risk level.",
+    )
+    events.add_argument(
+        "--cursor",
+        type=int,
+        default=None,
+        help="Resume after this event id (as printed by a previous --limit run).",
+    )
+    events.add_argument("--limit", type=int, default=None, help="Maximum events to print (default: all).")
+    events.add_argument(
+        "--newest-first", action="store_true", help="Page from the newest event backwards."
+    )
+
+    export = sub.add_parser(
         "export-audit",
-        help="Export signed audit events to JSON and signature files.",
+        help="Export signed audit events to JSONL and signature files.",
+    )
+    export.add_argument(
+        "--after-id",
+        type=int,
+        default=0,
+        help="Only export events with an id greater than this value.",
+    )
+    export.add_argument(
+        "--limit",
+        type=int,
+        default=None,
+        help="Maximum number of events to export (default: all).",
+    )
+    export.add_argument("--gzip", action="store_true", help="Compress the JSONL export.")
+    export.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Export only events since the last checkpoint as the next signed chain segment.",
+    )
+    verify_table = sub.add_parser(
+        "verify-audit-log",
+        help="Verify the hash chain of the audit_events table in one streaming pass.",
+    )
+    verify_table.add_argument(
+        "--from-checkpoint",
+        action="store_true",
+        help="Start at the latest signed checkpoint row instead of the first row.",
+    )
+    verify_chain = sub.add_parser(
+        "verify-audit-chain",
+        help="Verify the chain of incremental audit export segments.",
+    )
+    verify_chain.add_argument(
+        "--dir",
+        default=None,
+        help="Chain directory to verify (default: export.chain_dir).",
+    )
+    verify_chain.add_argument(
+        "--state",
+        default=None,
+        help="JSON file holding the last verified state; only newer segments are checked "
+        "and the file is updated on success.",
+    )
+    sub.add_parser(
+        "archive-audit",
+        help="Seal complete months outside the hot window into signed archive segments.",
+    )
+    sub.add_parser(
+        "verify-archive",
+        help="Verify signatures and the hash chain of sealed audit archive segments.",
     )
     sub.add_parser(
         "retention-cleanup",
@@ -254,6 +454,58 @@ def parser_builder() -> argparse.ArgumentParser:
         "ocr-diagnostics",
         help="Check local OCR readiness and Tesseract availability.",
     )
+
+    serve = sub.add_parser(
+        "serve",
+        help="Run the web dashboard with pre-forked, warmed-up worker processes.",
+    )
+    serve.add_argument("--host", default=None, help="Bind address (default: server.host).")
+    serve.add_argument("--port", type=int, default=None, help="Bind port (default: server.port).")
+    serve.add_argument("--workers", type=int, default=None, help="Worker processes.")
+    serve.add_argument("--threads", type=int, default=None, help="Request threads per worker.")
+    serve.add_argument(
+        "--max-requests",
+        type=int,
+        default=None,
+        help="Recycle a worker after roughly this many requests (0 disables).",
+    )
+    serve.add_argument(
+        "--backend",
+        default=None,
+        choices=["auto", "gunicorn", "builtin"],
+        help="Use gunicorn when installed (auto), require it, or use the built-in server.",
+    )
+
+    profile = sub.add_parser(
+        "profile",
+        help="Profile the scan and protect pipeline for one document (cProfile + tracemalloc).",
+    )
+    profile.add_argument("--input", required=True, help="Path to the document to profile.")
+    profile.add_argument(
+        "--action",
+        default="redact",
+        choices=list(PROFILE_ACTIONS),
+        help="Protection action to run after scanning.",
+    )
+    profile.add_argument(
+        "--top", type=int, default=None, help="Hot functions to list (default: profiling.top_functions)."
+    )
+    profile.add_argument(
+        "--sort",
+        default=None,
+        choices=list(SORT_KEYS),
+        help="Rank hot functions by self time, cumulative time or call count.",
+    )
+    profile.add_argument(
+        "--pstats-output",
+        required=False,
+        help="Optional path to dump raw pstats data (for snakeviz, pstats, ...).",
+    )
+    profile.add_argument(
+        "--json-output",
+        required=False,
+        help="Optional path to save the profile report JSON.",
+    )
     return parser
 
 
@@ -263,8 +515,22 @@ def main() -> int:
     args = parser.parse_args()
 
     try:
+        if args.command == "scan" and is_corpus_input(args.input):
+            result = scan_corpus(
+                args.input,
+                output_path=Path(args.jsonl_output),
+                workers=args.workers,
+                incremental=args.incremental,
+                timings=args.timings,
+            )
+            print(json.dumps(result, indent=2))
+            if args.timings:
+                print(format_timings(result["stage_timings_ms"]), file=sys.stderr)
+            return 0
+
         if args.command == "scan":
-            report = run_scan(Path(args.input))
+            with pipeline_run(args.command, args.timings):
+                report = run_scan(Path(args.input))
             if args.extracted_output:
                 extracted_path = Path(args.extracted_output)
                 extracted_path.parent.mkdir(parents=True, exist_ok=True)
@@ -278,31 +544,33 @@ def main() -> int:
             return 0
 
         if args.command == "protect":
-            result = run_protection(
-                input_path=Path(args.input),
-                action=args.action,
-                output_dir=Path(args.output_dir),
-                key_path=Path(args.key_path) if args.key_path else None,
-            )
+            with pipeline_run(args.command, args.timings):
+                result = run_protection(
+                    input_path=Path(args.input),
+                    action=args.action,
+                    output_dir=Path(args.output_dir),
+                    key_path=Path(args.key_path) if args.key_path else None,
+                )
             print(json.dumps(result, indent=2))
             return 0
 
         if args.command == "verify-redaction":
-            original_text = read_document_text(Path(args.original))
-            protected_text = read_document_text(Path(args.protected))
-            original_findings = detect_sensitive_data(original_text)
-            quality = verify_redaction_quality(original_findings, protected_text)
-            log_audit_event(
-                event_type="verify_redaction",
-                actor="cli-user",
-                source="cli",
-                details={
-                    "original_file": Path(args.original).name,
-                    "protected_file": Path(args.protected).name,
-                    "quality_status": quality["quality_status"],
-                    "leak_count": quality["leak_count"],
-                },
-            )
+            with pipeline_run(args.command, args.timings):
+                original_text = read_document_text(Path(args.original))
+                protected_text = read_document_text(Path(args.protected))
+                original_findings = detect_sensitive_data(original_text)
+                quality = verify_redaction_quality(original_findings, protected_text)
+                log_audit_event(
+                    event_type="verify_redaction",
+                    actor="cli-user",
+                    source="cli",
+                    details={
+                        "original_file": Path(args.original).name,
+                        "protected_file": Path(args.protected).name,
+                        "quality_status": quality["quality_status"],
+                        "leak_count": quality["leak_count"],
+                    },
+                )
             print(json.dumps(quality, indent=2))
             if args.json_output:
                 quality_path = Path(args.json_output)
@@ -320,8 +588,85 @@ def main() -> int:
             print(json.dumps(result, indent=2))
             return 0
 
+        if args.command == "watch":
+            output_dir = Path(args.output_dir)
+
+            def handle(path: Path) -> None:
+                if args.action == "scan":
+                    report = run_scan(path, show_dashboard=False)
+                    summary = {
+                        "input_file": report["input_file"],
+                        "risk_level": report["risk"]["level"],
+                        "risk_score": report["risk"]["score"],
+                    }
+                else:
+                    summary = run_protection(path, args.action, output_dir)
+                print(json.dumps(summary), flush=True)
+
+            watcher = DropFolderWatcher(
+                [Path(d) for d in args.dir],
+                handle,
+                workers=args.workers,
+                queue_size=args.queue_size,
+                debounce_seconds=args.debounce,
+                poll_interval=args.poll_interval,
+                use_inotify=not args.no_inotify,
+                ignore_dirs=[output_dir],
+            )
+            print(
+                f"Watching {', '.join(args.dir)} ({watcher.backend}); press Ctrl-C to stop.",
+                file=sys.stderr,
+            )
+            signal.signal(signal.SIGTERM, lambda *_: watcher.request_stop())
+            try:
+                watcher.run_forever(status=print_watch_status)
+            except KeyboardInterrupt:
+                pass
+            print_watch_status(watcher.stats())
+            return 0
+
+        if args.command == "redact-stream":
+            try:
+                result = redact_stream(
+                    sys.stdin.buffer,
+                    sys.stdout.buffer,
+                    action=args.action,
+                    audit_interval=args.audit_interval,
+                )
+            except (BrokenPipeError, KeyboardInterrupt):
+                return 0
+            print(json.dumps(result), file=sys.stderr)
+            return 0
+
+        if args.command == "events":
+            filters = {"since": args.since, "until": args.until, "source": args.source}
+            if args.kind == "audit":
+                filters.update(event_type=args.event_type, actor=args.actor)
+            else:
+                filters["risk_level"] = args.risk_level
+            count = 0
+            last_id = None
+            for event in iter_events(
+                args.kind,
+                filters,
+                cursor=args.cursor,
+                limit=args.limit,
+                descending=args.newest_first,
+            ):
+                sys.stdout.write(json.dumps(event) + "\n")
+                count += 1
+                last_id = event["id"]
+            if args.limit is not None and count == args.limit:
+                print(json.dumps({"next_cursor": last_id}), file=sys.stderr)
+            return 0
+
         if args.command == "export-audit":
-            result = export_signed_audit(limit=5000)
+            if args.incremental:
+                result = export_audit_segment(compress=args.gzip)
+            else:
+                result = export_signed_audit(
+                    limit=args.limit, after_id=args.after_id, compress=args.gzip
+                )
             log_audit_event(
                 event_type="export_audit",
                 actor="cli-user",
@@ -331,6 +676,39 @@ def main() -> int:
             print(json.dumps(result, indent=2))
             return 0
 
+        if args.command == "verify-audit-log":
+            result = verify_audit_chain(from_checkpoint=args.from_checkpoint)
+            print(json.dumps(result, indent=2))
+            return 0 if result["valid"] else 1
+
+        if args.command == "verify-audit-chain":
+            state_path = Path(args.state) if args.state else None
+            trusted = None
+            if state_path is not None and state_path.exists():
+                trusted = json.loads(state_path.read_text(encoding="utf-8"))
+            result = verify_export_chain(Path(args.dir) if args.dir else None, trusted=trusted)
+            if result["valid"] and state_path is not None:
+                state = {key: result[key] for key in ("sequence", "last_id", "digest")}
+                state_path.write_text(json.dumps(state, indent=2), encoding="utf-8")
+            print(json.dumps(result, indent=2))
+            return 0 if result["valid"] else 1
+
+        if args.command == "archive-audit":
+            result = {**archive_sealed_months(), **prune_archive()}
+            log_audit_event(
+                event_type="archive_audit",
+                actor="cli-user",
+                source="cli",
+                details=result,
+            )
+            print(json.dumps(result, indent=2))
+            return 0
+
+        if args.command == "verify-archive":
+            result = verify_archive()
+            print(json.dumps(result, indent=2))
+            return 0 if result["valid"] else 1
+
         if args.command == "retention-cleanup":
             result = run_retention_cleanup()
             log_audit_event(
@@ -353,6 +731,42 @@ def main() -> int:
             print(json.dumps(result, indent=2))
             return 0
 
+        if args.command == "serve":
+            return serve(
+                host=args.host,
+                port=args.port,
+                workers=args.workers,
+                threads=args.threads,
+                max_requests=args.max_requests,
+                backend=args.backend,
+            )
+
+        if args.command == "profile":
+            report = profile_document(
+                Path(args.input),
+                action=args.action,
+                top=args.top,
+                sort=args.sort,
+                pstats_path=Path(args.pstats_output) if args.pstats_output else None,
+            )
+            log_audit_event(
+                event_type="profile_document",
+                actor="cli-user",
+                source="cli",
+                details={
+                    "filename": Path(args.input).name,
+                    "action": args.action,
+                    "wall_ms": report["total"]["wall_ms"],
+                },
+            )
+            print(format_profile_report(report))
+            if args.json_output:
+                report_path = Path(args.json_output)
+                report_path.parent.mkdir(parents=True, exist_ok=True)
+                report_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+                print(f"Profile report saved to {report_path}")
+            return 0
+
         if args.command == "ocr-diagnostics":
             result = run_ocr_diagnostics()
             log_audit_event(
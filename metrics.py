@@ -0,0 +1,273 @@
+"""Lightweight stage timers, counters and histograms for PRIVGUARD AI.
+
+``with stage("extract"):`` times a block. The duration is recorded in the
+``privguard_stage_seconds`` histogram when ``metrics.enabled`` is set, and it
+is added to the innermost ``collect_timings()`` dict when one is active. The
+CLI ``--timings`` flag and job timings use that dict. With neither active,
+``stage`` returns a shared no-op context manager, so instrumented code pays a
+flag check and two context-variable lookups. Inside a ``tracing.trace`` each
+stage is also recorded as a span.
+
+Values are kept per process and rendered in the Prometheus text format by
+``render_prometheus``.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import itertools
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import tracing
+from config_loader import load_system_config
+
+
+SYSTEM_CONFIG = load_system_config()
+METRICS_CONFIG = SYSTEM_CONFIG.get("metrics", {})
+ENABLED = bool(METRICS_CONFIG.get("enabled", True))
+# Stage histogram bucket upper bounds, in seconds.
+STAGE_BUCKETS: Tuple[float, ...] = tuple(
+    float(bound)
+    for bound in METRICS_CONFIG.get(
+        "stage_buckets", (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+    )
+)
+
+Labels = Tuple[str, ...]
+
+_timings: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar(
+    "privguard_timings", default=None
+)
+_NOOP = contextlib.nullcontext()
+
+
+def set_enabled(enabled: bool) -> None:
+    """Turn registry recording on or off for this process."""
+    global ENABLED
+    ENABLED = enabled
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def header_lines(name: str, kind: str, help_text: str) -> List[str]:
+    return [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+
+
+def sample_line(
+    name: str, value: float, label_names: Sequence[str] = (), label_values: Sequence[str] = ()
+) -> str:
+    return f"{name}{_label_text(label_names, label_values)} {_number(value)}"
+
+
+def histogram_lines(
+    name: str,
+    label_names: Sequence[str],
+    label_values: Sequence[str],
+    buckets: Sequence[float],
+    cumulative_counts: Sequence[int],
+    count: int,
+    total: float,
+) -> List[str]:
+    """Sample lines for one histogram series; ``cumulative_counts`` align with ``buckets``."""
+    lines = []
+    for bound, hits in zip(buckets, cumulative_counts):
+        labels = _label_text(label_names, label_values, f'le="{_number(bound)}"')
+        lines.append(f"{name}_bucket{labels} {hits}")
+    labels = _label_text(label_names, label_values, 'le="+Inf"')
+    lines.append(f"{name}_bucket{labels} {count}")
+    plain = _label_text(label_names, label_values)
+    lines.append(f"{name}_sum{plain} {total!r}")
+    lines.append(f"{name}_count{plain} {count}")
+    return lines
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        if not ENABLED:
+            return
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values: str) -> float:
+        with self._lock:
+            return self._values.get(label_values, 0)
+
+    def lines(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [sample_line(self.name, amount, self.label_names, values) for values, amount in items]
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels (Prometheus layout)."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = STAGE_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (last slot is +Inf), count, sum]
+        self._series: Dict[Labels, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        if not ENABLED:
+            return
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0, 0.0]
+            series[0][index] += 1
+            series[1] += 1
+            series[2] += value
+
+    def snapshot(self) -> Dict[Labels, Dict[str, float]]:
+        with self._lock:
+            return {
+                values: {"count": series[1], "sum_seconds": round(series[2], 6)}
+                for values, series in self._series.items()
+            }
+
+    def lines(self) -> List[str]:
+        with self._lock:
+            items = sorted(
+                (values, (list(itertools.accumulate(series[0][:-1])), series[1], series[2]))
+                for values, series in self._series.items()
+            )
+        lines: List[str] = []
+        for values, (counts, count, total) in items:
+            lines.extend(
+                histogram_lines(self.name, self.label_names, values, self.buckets, counts, count, total)
+            )
+        return lines
+
+
+_registry: Dict[str, Union[Counter, Histogram]] = {}
+_registry_lock = threading.Lock()
+
+
+def counter(name: str, help_text: str, label_names: Sequence[str] = ()) -> Counter:
+    """Return the registered counter called ``name``, creating it on first use."""
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = Counter(name, help_text, label_names)
+        return _registry[name]
+
+
+def histogram(
+    name: str,
+    help_text: str,
+    label_names: Sequence[str] = (),
+    buckets: Sequence[float] = STAGE_BUCKETS,
+) -> Histogram:
+    """Return the registered histogram called ``name``, creating it on first use."""
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = Histogram(name, help_text, label_names, buckets)
+        return _registry[name]
+
+
+STAGE_SECONDS = histogram(
+    "privguard_stage_seconds", "Wall time spent in each pipeline stage.", ("stage",)
+)
+STAGE_ERRORS = counter(
+    "privguard_stage_errors_total", "Pipeline stages that raised an exception.", ("stage",)
+)
+
+
+class _Stage:
+    __slots__ = ("name", "start", "span")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.span = tracing.start_span(self.name)
+        self.start = time.perf_counter()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        elapsed = time.perf_counter() - self.start
+        tracing.end_span(self.span, exc)
+        STAGE_SECONDS.observe(elapsed, self.name)
+        if exc_type is not None:
+            STAGE_ERRORS.inc(self.name)
+        timings = _timings.get()
+        if timings is not None:
+            key = f"{self.name}_ms"
+            timings[key] = round(timings.get(key, 0.0) + elapsed * 1000, 2)
+
+
+def stage(name: str):
+    """Context manager timing one pipeline stage; repeated stages accumulate."""
+    if not ENABLED and _timings.get() is None and tracing.current_trace_id() is None:
+        return _NOOP
+    return _Stage(name)
+
+
+@contextlib.contextmanager
+def collect_timings(into: Optional[Dict[str, float]] = None) -> Iterator[Dict[str, float]]:
+    """Collect ``<stage>_ms`` totals for stages run in this context (thread/task)."""
+    timings = {} if into is None else into
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+def format_timings(timings: Dict[str, float]) -> str:
+    """Render collected timings as an aligned two-column table."""
+    if not timings:
+        return "Stage timings: none recorded"
+    width = max(len(key) for key in timings) - 3
+    rows = [f"  {key[:-3]:<{width}}  {value:>10.2f} ms" for key, value in timings.items()]
+    return "\n".join(["Stage timings:", *rows])
+
+
+def render_prometheus(extra: Iterable[str] = ()) -> str:
+    """Render every registered metric, followed by ``extra`` pre-formatted lines."""
+    with _registry_lock:
+        metrics = list(_registry.values())
+    lines: List[str] = []
+    for metric in metrics:
+        lines.extend(header_lines(metric.name, metric.kind, metric.help_text))
+        lines.extend(metric.lines())
+    lines.extend(extra)
+    return "\n".join(lines) + "\n"
@@ -1,65 +1,134 @@
-"""Signed audit export utilities."""
+"""Signed audit export utilities.
+
+Exports are streamed as canonical JSONL: a header line followed by one
+``sort_keys``/compact-separator JSON object per event in ascending id order.
+Rows are read in keyset-paginated pages (``id > last_id``) and the HMAC is
+updated as each line is written, so memory use does not depend on the size
+of the export. The signature always covers the uncompressed JSONL bytes.
+"""
 
 from __future__ import annotations
 
+import gzip
 import hashlib
 import hmac
 import json
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List
+from typing import BinaryIO, Dict, Iterator, Optional
 
 from config_loader import load_system_config
 from security.keys import get_or_create_signing_key
-from storage.db import get_conn, init_db
+from storage.audit_repo import flush_audit_writer
+from storage.event_query import iter_events
 
 
 SYSTEM_CONFIG = load_system_config()
 EXPORT_DIR = Path(SYSTEM_CONFIG["export"]["export_dir"])
+PAGE_SIZE = int(SYSTEM_CONFIG["export"].get("page_size", 1000))
+EXPORT_FORMAT = "privguard-audit-jsonl/1"
 
 
-def _fetch_audit_events(limit: int = 1000) -> List[Dict[str, object]]:
-    init_db()
-    with get_conn() as conn:
-        rows = conn.execute(
-            """
-            SELECT id, created_at, event_type, actor, source, details_json
-            FROM audit_events
-            ORDER BY id DESC
-            LIMIT ?
-            """,
-            (limit,),
-        ).fetchall()
-    events = []
-    for row in rows:
-        events.append(
-            {
-                "id": row[0],
-                "created_at": row[1],
-                "event_type": row[2],
-                "actor": row[3],
-                "source": row[4],
-                "details": json.loads(row[5]),
-            }
-        )
-    return events
-
-
-def export_signed_audit(limit: int = 1000) -> Dict[str, str]:
-    EXPORT_DIR.mkdir(parents=True, exist_ok=True)
-    events = _fetch_audit_events(limit=limit)
-    payload = {
-        "exported_at": datetime.utcnow().isoformat() + "Z",
-        "event_count": len(events),
-        "events": events,
+def canonical_line(payload: Dict[str, object]) -> bytes:
+    return json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def iter_audit_events(
+    after_id: int = 0, limit: Optional[int] = None, page_size: int = PAGE_SIZE
+) -> Iterator[Dict[str, object]]:
+    """Yield audit events with ``id > after_id`` in ascending id order, page by page.
+
+    Sealed archive segments are read first, then the hot table.
+    """
+    flush_audit_writer()
+    return iter_events("audit", cursor=after_id, limit=limit, page_size=page_size)
+
+
+@contextmanager
+def _open_export(path: Path, compress: bool) -> Iterator[BinaryIO]:
+    with path.open("wb") as raw:
+        if not compress:
+            yield raw
+            return
+        # mtime=0 keeps compressed bytes reproducible for identical input.
+        with gzip.GzipFile(filename="", mode="wb", fileobj=raw, mtime=0) as handle:
+            yield handle
+
+
+def write_signed_jsonl(
+    path: Path,
+    header: Dict[str, object],
+    after_id: int,
+    limit: Optional[int],
+    compress: bool,
+) -> Dict[str, object]:
+    """Write ``header`` plus events after ``after_id`` as signed canonical JSONL.
+
+    Shared by full exports and the incremental segment chain. Returns the
+    ``signature`` (HMAC over the uncompressed bytes), ``event_count``,
+    ``first_id`` and ``last_id``.
+    """
+    signer = hmac.new(get_or_create_signing_key(), digestmod=hashlib.sha256)
+    event_count = 0
+    first_id: Optional[int] = None
+    last_id: Optional[int] = None
+    with _open_export(path, compress) as handle:
+        line = canonical_line(header)
+        handle.write(line)
+        signer.update(line)
+        for event in iter_audit_events(after_id=after_id, limit=limit):
+            line = canonical_line(event)
+            handle.write(line)
+            signer.update(line)
+            event_count += 1
+            last_id = int(event["id"])
+            if first_id is None:
+                first_id = last_id
+    return {
+        "signature": signer.hexdigest(),
+        "event_count": event_count,
+        "first_id": first_id,
+        "last_id": last_id,
     }
-    serialized = json.dumps(payload, sort_keys=True, indent=2).encode("utf-8")
-    timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-    export_path = EXPORT_DIR / f"audit_export_{timestamp}.json"
+
+
+def export_signed_audit(
+    limit: Optional[int] = None, after_id: int = 0, compress: bool = False
+) -> Dict[str, object]:
+    """Stream audit events to a signed JSONL export.
+
+    ``limit=None`` exports every event after ``after_id``.
+    """
+    EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+    exported_at = datetime.utcnow()
+    timestamp = exported_at.strftime("%Y%m%d_%H%M%S")
+    suffix = ".jsonl.gz" if compress else ".jsonl"
+    export_path = EXPORT_DIR / f"audit_export_{timestamp}{suffix}"
     sig_path = EXPORT_DIR / f"audit_export_{timestamp}.sig"
-    export_path.write_bytes(serialized)
 
-    key = get_or_create_signing_key()
-    signature = hmac.new(key, serialized, hashlib.sha256).hexdigest()
-    sig_path.write_text(signature, encoding="utf-8")
-    return {"export_file": str(export_path), "signature_file": str(sig_path)}
+    header = {
+        "format": EXPORT_FORMAT,
+        "exported_at": exported_at.isoformat() + "Z",
+        "after_id": after_id,
+    }
+    written = write_signed_jsonl(export_path, header, after_id, limit, compress)
+    sig_path.write_text(written["signature"], encoding="utf-8")
+    return {
+        "export_file": str(export_path),
+        "signature_file": str(sig_path),
+        "event_count": written["event_count"],
+        "first_id": written["first_id"],
+        "last_id": written["last_id"],
+    }
+
+
+def verify_signed_export(export_path: Path, sig_path: Path) -> bool:
+    """Recompute the HMAC of an export in a single streaming pass."""
+    signer = hmac.new(get_or_create_signing_key(), digestmod=hashlib.sha256)
+    opener = gzip.open if export_path.suffix == ".gz" else open
+    with opener(export_path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(1024 * 1024), b""):
+            signer.update(chunk)
+    expected = sig_path.read_text(encoding="utf-8").strip()
+    return hmac.compare_digest(signer.hexdigest(), expected)
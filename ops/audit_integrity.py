@@ -0,0 +1,107 @@
+"""Verification of the audit_events hash chain.
+
+The table is streamed in keyset-paginated pages, so memory stays bounded
+however large it grows. Verification may start at the first row, or at the
+latest signed checkpoint row when only recent rows need checking.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Dict, Optional
+
+from ops.audit_export import PAGE_SIZE
+from storage.audit_chain import (
+    CHECKPOINT_EVENT_TYPE,
+    GENESIS_HASH,
+    checkpoint_is_valid,
+    compute_row_hash,
+)
+from storage.audit_archive import archive_head_hash, archived_through_id
+from storage.audit_repo import flush_audit_writer
+from storage.db import get_conn, init_db
+
+
+def _latest_checkpoint_id() -> Optional[int]:
+    with get_conn() as conn:
+        return conn.execute(
+            "SELECT MAX(id) FROM audit_events WHERE event_type = ?",
+            (CHECKPOINT_EVENT_TYPE,),
+        ).fetchone()[0]
+
+
+def verify_audit_chain(from_checkpoint: bool = False, page_size: int = PAGE_SIZE) -> Dict[str, object]:
+    """Check every row's hash and link in a single ascending pass.
+
+    The first hashed row must link to the genesis hash or to the newest
+    archived row, or be a checkpoint whose signature covers its
+    ``prev_hash``. Rows logged before chaining was enabled (no ``row_hash``)
+    are only allowed before the first hashed row.
+    """
+    flush_audit_writer()
+    init_db()
+    floor = archived_through_id()
+    start_id = (_latest_checkpoint_id() or 0) if from_checkpoint else 0
+    start_id = max(start_id, floor + 1 if floor else 0)
+    # Once months are archived, the hot chain continues from the archive head.
+    anchors = {GENESIS_HASH}
+    if floor:
+        anchors.add(archive_head_hash())
+    report: Dict[str, object] = {
+        "valid": True,
+        "start_id": start_id,
+        "rows_verified": 0,
+        "legacy_rows": 0,
+        "checkpoints_verified": 0,
+        "last_id": None,
+        "head_hash": None,
+        "error": None,
+        "error_id": None,
+    }
+    expected_prev: Optional[str] = None
+    last_id = start_id - 1
+    while True:
+        with get_conn() as conn:
+            rows = conn.execute(
+                """
+                SELECT id, created_at, event_type, actor, source, details_json, prev_hash, row_hash
+                FROM audit_events
+                WHERE id > ?
+                ORDER BY id
+                LIMIT ?
+                """,
+                (last_id, page_size),
+            ).fetchall()
+        for row_id, created_at, event_type, actor, source, details_json, prev_hash, row_hash in rows:
+            error = None
+            is_checkpoint = event_type == CHECKPOINT_EVENT_TYPE
+            if row_hash is None:
+                if expected_prev is None:
+                    report["legacy_rows"] = int(report["legacy_rows"]) + 1
+                    continue
+                error = "row is missing its hash"
+            elif expected_prev is None and prev_hash not in anchors and not is_checkpoint:
+                error = "chain does not start at genesis, the archive head or a signed checkpoint"
+            elif expected_prev is not None and prev_hash != expected_prev:
+                error = "prev_hash does not match the previous row (row deleted or reordered)"
+            elif compute_row_hash(prev_hash, created_at, event_type, actor, source, details_json) != row_hash:
+                error = "row_hash does not match row contents"
+            elif is_checkpoint:
+                try:
+                    signed = checkpoint_is_valid(prev_hash, json.loads(details_json))
+                except ValueError:
+                    signed = False
+                if not signed:
+                    error = "checkpoint signature is invalid"
+                else:
+                    report["checkpoints_verified"] = int(report["checkpoints_verified"]) + 1
+            if error is not None:
+                report.update(valid=False, error=error, error_id=row_id)
+                return report
+            expected_prev = row_hash
+            report["rows_verified"] = int(report["rows_verified"]) + 1
+            report["last_id"] = row_id
+            report["head_hash"] = row_hash
+        if len(rows) < page_size:
+            return report
+        last_id = rows[-1][0]
@@ -0,0 +1,219 @@
+"""Incremental, hash-chained audit export segments.
+
+Each call to ``export_audit_segment`` writes only the events added since the
+previous segment. A checkpoint file records the last exported id and the
+chain head digest. Every segment header carries the previous segment's
+signature, so each signature commits to the whole chain before it. A verifier
+can check the chain from the start or resume from a state it trusted before.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import hmac
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+from config_loader import load_system_config
+from ops.audit_export import write_signed_jsonl
+from security.keys import get_or_create_signing_key
+
+
+SYSTEM_CONFIG = load_system_config()
+CHAIN_DIR = Path(SYSTEM_CONFIG["export"].get("chain_dir", "exports/chain"))
+SEGMENT_FORMAT = "privguard-audit-segment/1"
+GENESIS_DIGEST = "0" * 64
+CHECKPOINT_NAME = "checkpoint.json"
+
+
+def _segment_paths(directory: Path, sequence: int) -> Optional[Dict[str, Path]]:
+    stem = f"audit_segment_{sequence:06d}"
+    for suffix in (".jsonl", ".jsonl.gz"):
+        segment = directory / f"{stem}{suffix}"
+        if segment.exists():
+            return {"segment": segment, "signature": directory / f"{stem}.sig"}
+    return None
+
+
+def _genesis_state() -> Dict[str, object]:
+    return {"sequence": 0, "last_id": 0, "digest": GENESIS_DIGEST}
+
+
+def load_checkpoint(directory: Optional[Path] = None) -> Dict[str, object]:
+    path = (directory or CHAIN_DIR) / CHECKPOINT_NAME
+    if not path.exists():
+        return _genesis_state()
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _save_checkpoint(directory: Path, state: Dict[str, object]) -> None:
+    checkpoint = {
+        "sequence": state["sequence"],
+        "last_id": state["last_id"],
+        "digest": state["digest"],
+        "updated_at": datetime.utcnow().isoformat() + "Z",
+    }
+    tmp_path = directory / f".{CHECKPOINT_NAME}.tmp"
+    tmp_path.write_text(json.dumps(checkpoint, indent=2), encoding="utf-8")
+    os.replace(tmp_path, directory / CHECKPOINT_NAME)
+
+
+def verify_segment(
+    segment_path: Path, sig_path: Path, state: Dict[str, object]
+) -> Dict[str, object]:
+    """Check one segment against the chain state that precedes it.
+
+    Streams the segment once and returns the state after it. Raises
+    ``ValueError`` if the segment does not link to ``state`` or its
+    signature does not match.
+    """
+    if not sig_path.exists():
+        raise ValueError(f"{segment_path.name}: signature file is missing")
+    signer = hmac.new(get_or_create_signing_key(), digestmod=hashlib.sha256)
+    opener = gzip.open if segment_path.suffix == ".gz" else open
+    with opener(segment_path, "rb") as handle:
+        header_line = handle.readline()
+        signer.update(header_line)
+        header = json.loads(header_line)
+        expected = {
+            "format": SEGMENT_FORMAT,
+            "sequence": int(state["sequence"]) + 1,
+            "prev_digest": state["digest"],
+            "after_id": state["last_id"],
+        }
+        for key, value in expected.items():
+            if header.get(key) != value:
+                raise ValueError(f"{segment_path.name}: header {key} does not chain to previous segment")
+        last_id = int(state["last_id"])
+        for line in handle:
+            signer.update(line)
+            event_id = int(json.loads(line)["id"])
+            if event_id <= last_id:
+                raise ValueError(f"{segment_path.name}: event ids are not strictly increasing")
+            last_id = event_id
+    digest = signer.hexdigest()
+    if not hmac.compare_digest(digest, sig_path.read_text(encoding="utf-8").strip()):
+        raise ValueError(f"{segment_path.name}: signature mismatch")
+    return {"sequence": expected["sequence"], "last_id": last_id, "digest": digest}
+
+
+def _recover_published_segments(directory: Path, state: Dict[str, object]) -> Dict[str, object]:
+    """Advance a checkpoint that lags behind segments already on disk.
+
+    This covers a crash between publishing a segment and saving the checkpoint.
+    """
+    advanced = False
+    while (paths := _segment_paths(directory, int(state["sequence"]) + 1)) is not None:
+        state = verify_segment(paths["segment"], paths["signature"], state)
+        advanced = True
+    if advanced:
+        _save_checkpoint(directory, state)
+    return state
+
+
+def export_audit_segment(compress: bool = False) -> Dict[str, object]:
+    """Export events added since the last checkpoint as the next chain segment.
+
+    If there are no new events, no segment is written and the current chain
+    head is returned.
+    """
+    directory = CHAIN_DIR
+    directory.mkdir(parents=True, exist_ok=True)
+    state = _recover_published_segments(directory, load_checkpoint(directory))
+    sequence = int(state["sequence"]) + 1
+    stem = f"audit_segment_{sequence:06d}"
+    suffix = ".jsonl.gz" if compress else ".jsonl"
+    segment_path = directory / f"{stem}{suffix}"
+    sig_path = directory / f"{stem}.sig"
+    tmp_segment = directory / f".{stem}{suffix}.{os.getpid()}.tmp"
+    tmp_sig = directory / f".{stem}.sig.{os.getpid()}.tmp"
+
+    header = {
+        "format": SEGMENT_FORMAT,
+        "exported_at": datetime.utcnow().isoformat() + "Z",
+        "sequence": sequence,
+        "prev_digest": state["digest"],
+        "after_id": state["last_id"],
+    }
+    try:
+        written = write_signed_jsonl(tmp_segment, header, int(state["last_id"]), None, compress)
+        if written["event_count"] == 0:
+            return {
+                "export_file": None,
+                "signature_file": None,
+                "event_count": 0,
+                "first_id": None,
+                "last_id": state["last_id"],
+                "sequence": state["sequence"],
+                "digest": state["digest"],
+            }
+        tmp_sig.write_text(str(written["signature"]), encoding="utf-8")
+        try:
+            # link() refuses to overwrite, so concurrent exporters cannot fork the chain.
+            os.link(tmp_segment, segment_path)
+        except FileExistsError as exc:
+            raise RuntimeError(f"segment {sequence} was published by another export") from exc
+        os.replace(tmp_sig, sig_path)
+    finally:
+        tmp_segment.unlink(missing_ok=True)
+        tmp_sig.unlink(missing_ok=True)
+
+    new_state = {
+        "sequence": sequence,
+        "last_id": written["last_id"],
+        "digest": written["signature"],
+    }
+    _save_checkpoint(directory, new_state)
+    return {
+        "export_file": str(segment_path),
+        "signature_file": str(sig_path),
+        "event_count": written["event_count"],
+        "first_id": written["first_id"],
+        "last_id": written["last_id"],
+        "sequence": sequence,
+        "prev_digest": header["prev_digest"],
+        "digest": written["signature"],
+    }
+
+
+def verify_export_chain(
+    directory: Optional[Path] = None, trusted: Optional[Dict[str, object]] = None
+) -> Dict[str, object]:
+    """Verify chain segments in order, starting after ``trusted`` (or from genesis).
+
+    Passing the state returned by an earlier successful run verifies only
+    the segments added since that run.
+    """
+    directory = directory or CHAIN_DIR
+    state = dict(trusted) if trusted else _genesis_state()
+    verified = 0
+    error: Optional[str] = None
+    while (paths := _segment_paths(directory, int(state["sequence"]) + 1)) is not None:
+        try:
+            state = verify_segment(paths["segment"], paths["signature"], state)
+        except (ValueError, OSError, KeyError) as exc:
+            error = str(exc)
+            break
+        verified += 1
+
+    checkpoint_path = directory / CHECKPOINT_NAME
+    if error is None and checkpoint_path.exists():
+        checkpoint = load_checkpoint(directory)
+        # A checkpoint may lag after a crash (the next export recovers it),
+        # but one ahead of the chain means segments are missing.
+        if int(checkpoint["sequence"]) > int(state["sequence"]):
+            error = f"checkpoint is at segment {checkpoint['sequence']} but the chain ends at {state['sequence']}"
+        elif checkpoint["sequence"] == state["sequence"] and checkpoint["digest"] != state["digest"]:
+            error = "checkpoint digest does not match the verified chain head"
+    return {
+        "valid": error is None,
+        "segments_verified": verified,
+        "sequence": state["sequence"],
+        "last_id": state["last_id"],
+        "digest": state["digest"],
+        "error": error,
+    }
@@ -0,0 +1,190 @@
+"""Multi-file web scans streamed back as NDJSON.
+
+Every file in a batch becomes a ``batch``-priority scan job, so bulk work
+shares the worker pool with interactive uploads without starving them.
+Results are streamed one line per file, in completion order. Audit and scan
+events are written in one transaction per ``jobs.batch.event_batch_size``
+results as they arrive. If the client disconnects, files not yet started are
+cancelled; events for files already scanned or running are still recorded.
+"""
+
+from __future__ import annotations
+
+import json
+import queue
+import zipfile
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from config_loader import load_system_config
+from extraction import IMAGE_SUFFIXES, PDF_SUFFIXES, TEXT_SUFFIXES
+from ops.jobs import JobQueueFull, JobRunner, scan_events
+from storage.audit_repo import log_event_batch
+from storage.job_store import get_job
+from storage.upload_store import StoredUpload, store_stream, store_upload
+
+
+SYSTEM_CONFIG = load_system_config()
+BATCH_CONFIG = SYSTEM_CONFIG.get("jobs", {}).get("batch", {})
+MAX_FILES = int(BATCH_CONFIG.get("max_files", 500))
+MAX_MEMBER_BYTES = int(BATCH_CONFIG.get("max_member_mb", 50)) * 1024 * 1024
+EVENT_BATCH_SIZE = max(1, int(BATCH_CONFIG.get("event_batch_size", 50)))
+SUPPORTED_SUFFIXES = TEXT_SUFFIXES | PDF_SUFFIXES | IMAGE_SUFFIXES
+
+
+def _zip_members(archive: zipfile.ZipFile) -> Iterator[zipfile.ZipInfo]:
+    for info in archive.infolist():
+        name = Path(info.filename)
+        if info.is_dir() or name.name.startswith(".") or "__MACOSX" in name.parts:
+            continue
+        if name.suffix.lower() in SUPPORTED_SUFFIXES:
+            yield info
+
+
+def store_batch_uploads(
+    files: Iterable[Any], directory: str, max_files: int = MAX_FILES
+) -> Tuple[List[StoredUpload], List[Dict[str, Any]]]:
+    """Store uploaded files and the supported members of uploaded zips.
+
+    Returns ``(stored, skipped)``. Skipped entries are reported per file
+    instead of failing the batch. Raises ValueError when the batch holds
+    more than ``max_files`` documents.
+    """
+    stored: List[StoredUpload] = []
+    skipped: List[Dict[str, Any]] = []
+
+    def admit() -> None:
+        if len(stored) >= max_files:
+            raise ValueError(f"A batch may contain at most {max_files} files")
+
+    for file_obj in files:
+        if not file_obj.filename:
+            continue
+        if Path(file_obj.filename).suffix.lower() != ".zip":
+            admit()
+            stored.append(store_upload(file_obj, directory))
+            continue
+        try:
+            archive = zipfile.ZipFile(file_obj.stream)
+        except zipfile.BadZipFile:
+            skipped.append({"filename": file_obj.filename, "error": "Not a valid zip archive"})
+            continue
+        with archive:
+            for info in _zip_members(archive):
+                if info.file_size > MAX_MEMBER_BYTES:
+                    skipped.append({"filename": info.filename, "error": "File too large"})
+                    continue
+                admit()
+                with archive.open(info) as member:
+                    stored.append(store_stream(member, Path(info.filename).name, directory))
+    return stored, skipped
+
+
+def _finished(
+    job_id: str, upload: StoredUpload, trace_id: Optional[str] = None
+) -> Tuple[Dict[str, Any], Optional[Tuple[Dict[str, Any], Dict[str, Any]]]]:
+    """Return the NDJSON record for a finished job and its events, if it succeeded."""
+    job = get_job(job_id) or {"status": "failed", "error": "Job expired", "timings_ms": None}
+    record: Dict[str, Any] = {
+        "job_id": job_id,
+        "filename": upload.filename,
+        "status": job["status"],
+        "timings_ms": job["timings_ms"],
+    }
+    if job["status"] != "done":
+        record["error"] = job["error"]
+        return record, None
+    record.update(job["result"])
+    return record, scan_events(
+        job["result"], {"content_hash": upload.content_hash, "trace_id": trace_id}
+    )
+
+
+def stream_batch(
+    runner: JobRunner,
+    uploads: List[StoredUpload],
+    skipped: List[Dict[str, Any]],
+    actor: str,
+    trace_id: Optional[str] = None,
+) -> Iterator[str]:
+    """Queue ``uploads`` and yield one JSON line per file as each finishes.
+
+    The last line is a ``batch_complete`` summary. ``trace_id`` ties every
+    job and audit event of the batch to the request's trace; it is passed
+    explicitly because the body is generated after the request returns.
+    Closing the generator early cancels the files that have not started.
+    """
+    completions: "queue.Queue[str]" = queue.Queue()
+    pending: Dict[str, Tuple[int, StoredUpload]] = {}
+    audit_events: List[Dict[str, Any]] = []
+    scan_rows: List[Dict[str, Any]] = []
+    totals = {"done": 0, "failed": 0, "rejected": 0, "skipped": len(skipped)}
+
+    def write_events() -> None:
+        log_event_batch(audit_events, scan_rows)
+        audit_events.clear()
+        scan_rows.clear()
+
+    def collect(job_id: str) -> Dict[str, Any]:
+        index, upload = pending.pop(job_id)
+        record, events = _finished(job_id, upload, trace_id)
+        record["index"] = index
+        totals["done" if events else "failed"] += 1
+        if events:
+            audit_events.append(events[0])
+            scan_rows.append(events[1])
+            if len(scan_rows) >= EVENT_BATCH_SIZE:
+                write_events()
+        return record
+
+    try:
+        for entry in skipped:
+            yield json.dumps({"status": "skipped", **entry}) + "\n"
+        for index, upload in enumerate(uploads):
+            params = {
+                "path": str(upload.path),
+                "filename": upload.filename,
+                "content_hash": upload.content_hash,
+                "defer_events": True,
+            }
+            if trace_id:
+                params["trace_id"] = trace_id
+            try:
+                job_id = runner.submit("scan", actor, params, priority="batch", notify=completions)
+            except JobQueueFull as exc:
+                totals["rejected"] += 1
+                yield json.dumps(
+                    {
+                        "index": index,
+                        "filename": upload.filename,
+                        "status": "rejected",
+                        "error": str(exc),
+                        "retry_after": exc.retry_after,
+                    }
+                ) + "\n"
+                continue
+            pending[job_id] = (index, upload)
+        while pending:
+            yield json.dumps(collect(completions.get())) + "\n"
+        yield json.dumps({"batch_complete": True, "files": len(uploads), **totals}) + "\n"
+    finally:
+        if pending:
+            # The client went away: drop files that have not started, but wait
+            # for running ones so no finished scan is left unaudited.
+            cancelled = runner.cancel(list(pending), "Cancelled: client disconnected")
+            for job_id in cancelled:
+                pending.pop(job_id)
+            totals["cancelled"] = len(cancelled)
+        while pending:
+            collect(completions.get())
+        audit_events.append(
+            {
+                "event_type": "scan_batch",
+                "actor": "web-user",
+                "source": "web",
+                "details": {"requested_by": actor, "files": len(uploads), **totals},
+            }
+        )
+        if trace_id:
+            audit_events[-1]["details"]["trace_id"] = trace_id
+        write_events()
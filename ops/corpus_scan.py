@@ -0,0 +1,409 @@
+"""Corpus scanning across directories and glob patterns.
+
+Walks an input tree, spreads extraction and detection across a process pool
+and streams one JSONL record per document so reports never hold the whole
+corpus in memory.
+"""
+
+from __future__ import annotations
+
+import fnmatch
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from classification import build_risk_summary
+from config_loader import rules_version
+from detection import count_sensitive_items, detect_sensitive_data
+from extraction import IMAGE_SUFFIXES, PDF_SUFFIXES, TEXT_SUFFIXES, read_document_text
+import tracing
+from metrics import collect_timings
+from storage.audit_repo import log_audit_events, log_scan_events
+from storage.scan_state import ScanStateStore, hash_file
+
+
+SUPPORTED_SUFFIXES = TEXT_SUFFIXES | PDF_SUFFIXES | IMAGE_SUFFIXES
+DB_BATCH_SIZE = 500
+PROGRESS_INTERVAL_SECONDS = 2.0
+
+
+def is_corpus_input(spec: str) -> bool:
+    """Return True when the input names a directory or a glob pattern."""
+    return glob.has_magic(spec) or Path(spec).is_dir()
+
+
+def iter_input_paths(spec: str) -> Iterator[Path]:
+    """Yield supported files under a directory, matching a glob, or a single file."""
+    if glob.has_magic(spec):
+        for match in glob.iglob(spec, recursive=True):
+            path = Path(match)
+            if path.is_file() and path.suffix.lower() in SUPPORTED_SUFFIXES:
+                yield path
+        return
+
+    root = Path(spec)
+    if root.is_dir():
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            for name in sorted(filenames):
+                if Path(name).suffix.lower() in SUPPORTED_SUFFIXES:
+                    yield Path(dirpath) / name
+        return
+
+    yield root
+
+
+def _glob_matches(path: str, pattern: str) -> bool:
+    # fnmatch's ``*`` also matches ``/``; compare part by part unless ``**`` is used.
+    if Path(path).is_absolute() != Path(pattern).is_absolute():
+        return False
+    if "**" in pattern:
+        return fnmatch.fnmatchcase(path, pattern)
+    parts, pattern_parts = Path(path).parts, Path(pattern).parts
+    return len(parts) == len(pattern_parts) and all(
+        fnmatch.fnmatchcase(part, expected) for part, expected in zip(parts, pattern_parts)
+    )
+
+
+def _in_scope(spec: str) -> Tuple[str, Callable[[str], bool]]:
+    """Path prefix and predicate for the recorded paths ``spec`` would yield."""
+    if glob.has_magic(spec):
+        base: List[str] = []
+        for part in Path(spec).parts:
+            if glob.has_magic(part):
+                break
+            base.append(part)
+        prefix = os.path.join(*base, "") if base else ""
+        return prefix, lambda path: _glob_matches(path, spec)
+    root = Path(spec)
+    if root.is_dir():
+        return os.path.join(str(root), ""), lambda path: Path(path).suffix.lower() in SUPPORTED_SUFFIXES
+    return str(root), lambda path: False
+
+
+def prune_scan_state(store: ScanStateStore, spec: str, seen: Set[str]) -> int:
+    """Forget files under ``spec`` that the run just completed did not find."""
+    prefix, matches = _in_scope(spec)
+    return store.delete(
+        path for path in store.paths_under(prefix) if path not in seen and matches(path)
+    )
+
+
+def scan_document(
+    path: str,
+    track_state: bool = False,
+    known_hash: Optional[str] = None,
+    timings: bool = False,
+) -> Dict[str, object]:
+    """Extract, detect and classify one document.
+
+    Runs inside pool workers, so it returns a plain serializable record and
+    never raises: failures are reported in the record itself. With
+    ``track_state`` the record also carries the file size, mtime and content
+    hash; when the hash equals ``known_hash`` extraction is skipped and the
+    record status is ``unchanged``. With ``timings`` the record carries
+    per-stage ``timings_ms``. Each document is its own trace; its id is
+    recorded as ``trace_id``.
+    """
+    with tracing.trace("corpus.document", path=path) as trace_id:
+        if not timings:
+            record = _scan_document(path, track_state, known_hash)
+        else:
+            with collect_timings() as stage_timings:
+                record = _scan_document(path, track_state, known_hash)
+            record["timings_ms"] = stage_timings
+        tracing.set_attributes(status=record["status"])
+    if trace_id:
+        record["trace_id"] = trace_id
+    return record
+
+
+def _scan_document(path: str, track_state: bool, known_hash: Optional[str]) -> Dict[str, object]:
+    start = time.perf_counter()
+    record: Dict[str, object] = {"input_file": path}
+    try:
+        source = Path(path)
+        if track_state:
+            stat = source.stat()
+            content_hash = hash_file(source)
+            record.update(
+                {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "content_hash": content_hash}
+            )
+            if known_hash is not None and content_hash == known_hash:
+                record["status"] = "unchanged"
+                return record
+        text = read_document_text(source)
+        findings = detect_sensitive_data(text)
+        risk = build_risk_summary(findings)
+    except Exception as exc:
+        record.update(
+            {
+                "status": "error",
+                "error": str(exc),
+                "elapsed_ms": round((time.perf_counter() - start) * 1000, 2),
+            }
+        )
+        return record
+    record.update(
+        {
+            "status": "ok",
+            "findings": findings,
+            "risk": {"score": risk["score"], "level": risk["level"], "counts": risk["counts"]},
+            "total_sensitive_items": count_sensitive_items(findings),
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 2),
+        }
+    )
+    return record
+
+
+def _plan(
+    paths: Iterator[Path],
+    store: Optional[ScanStateStore],
+    version: str,
+    seen: Optional[Set[str]] = None,
+) -> Iterator[Tuple[str, object]]:
+    """Yield ``("skip", record)`` for unchanged files and ``("scan", args)`` otherwise.
+
+    Every planned path is added to ``seen``.
+    """
+    for path in paths:
+        if seen is not None:
+            seen.add(str(path))
+        if store is None:
+            yield "scan", (str(path), False, None)
+            continue
+        state = store.get(str(path))
+        if state is None or state["status"] != "ok" or state["rules_version"] != version:
+            yield "scan", (str(path), True, None)
+            continue
+        try:
+            stat = path.stat()
+        except OSError:
+            yield "scan", (str(path), True, None)
+            continue
+        if stat.st_size == state["size"] and stat.st_mtime_ns == state["mtime_ns"]:
+            yield "skip", {"input_file": str(path), "status": "unchanged", **state["summary"]}
+        else:
+            # Metadata changed; let the worker compare content hashes before
+            # paying for extraction again.
+            yield "scan", (str(path), True, state["content_hash"])
+
+
+class _EventBatcher:
+    """Buffer scan/audit rows and write them in one transaction per batch."""
+
+    def __init__(
+        self, batch_size: int = DB_BATCH_SIZE, store: Optional[ScanStateStore] = None
+    ) -> None:
+        self.batch_size = batch_size
+        self.store = store
+        self.scan_events: List[Dict[str, object]] = []
+        self.audit_events: List[Dict[str, object]] = []
+
+    def add(self, record: Dict[str, object], version: str = "") -> None:
+        if self.store is not None and "content_hash" in record and record["status"] == "ok":
+            self.store.record(
+                str(record["input_file"]),
+                int(record["size"]),
+                int(record["mtime_ns"]),
+                str(record["content_hash"]),
+                version,
+                "ok",
+                {"risk": record["risk"], "total_sensitive_items": record["total_sensitive_items"]},
+            )
+        if record["status"] != "ok":
+            return
+        risk = record["risk"]
+        filename = Path(str(record["input_file"])).name
+        self.scan_events.append(
+            {
+                "filename": filename,
+                "risk_level": risk["level"],
+                "risk_score": risk["score"],
+                "total_sensitive_items": record["total_sensitive_items"],
+                "source": "cli",
+                "counts": risk["counts"],
+            }
+        )
+        self.audit_events.append(
+            {
+                "event_type": "scan",
+                "actor": "cli-user",
+                "source": "cli",
+                "details": {
+                    "filename": filename,
+                    "risk_level": risk["level"],
+                    "risk_score": risk["score"],
+                    "total_sensitive_items": record["total_sensitive_items"],
+                },
+            }
+        )
+        if record.get("trace_id"):
+            self.audit_events[-1]["details"]["trace_id"] = record["trace_id"]
+        if len(self.scan_events) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        log_scan_events(self.scan_events)
+        log_audit_events(self.audit_events)
+        self.scan_events = []
+        self.audit_events = []
+        if self.store is not None:
+            self.store.flush()
+
+
+def _print_progress(stats: Dict[str, object]) -> None:
+    print(
+        f"[scan] {stats['files_scanned']} files "
+        f"({stats['files_skipped']} unchanged, {stats['files_failed']} failed) "
+        f"- {stats['files_per_second']} files/s",
+        file=sys.stderr,
+        flush=True,
+    )
+
+
+def _iter_results(
+    plan: Iterator[Tuple[str, object]], workers: int, timings: bool = False
+) -> Iterator[Dict[str, object]]:
+    if workers <= 1:
+        for kind, payload in plan:
+            yield payload if kind == "skip" else scan_document(*payload, timings)
+        return
+
+    # Keep a bounded number of in-flight tasks so a huge tree never turns
+    # into a huge pending-futures list.
+    max_in_flight = workers * 4
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        pending: set[Future] = set()
+        for kind, payload in plan:
+            if kind == "skip":
+                yield payload
+                continue
+            pending.add(pool.submit(scan_document, *payload, timings))
+            if len(pending) >= max_in_flight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    except BaseException:
+        # Ctrl-C or a consumer error: drop queued work instead of draining it.
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    pool.shutdown()
+
+
+def scan_corpus(
+    spec: str,
+    output_path: Path,
+    workers: Optional[int] = None,
+    progress: Optional[Callable[[Dict[str, object]], None]] = _print_progress,
+    incremental: bool = False,
+    timings: bool = False,
+) -> Dict[str, object]:
+    """Scan every supported document under ``spec`` and write JSONL records.
+
+    With ``incremental`` the scan-state manifest is consulted so that only
+    new, modified or rule-affected documents are extracted again; state is
+    committed with each event batch, so an interrupted run resumes where it
+    stopped. A completed incremental run drops manifest rows for files in
+    its scope that no longer exist (``files_pruned``). With ``timings`` each
+    record carries its stage timings and the result sums them across
+    documents in ``stage_timings_ms``.
+    """
+    workers = workers or os.cpu_count() or 1
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    version = rules_version()
+    store = ScanStateStore() if incremental else None
+    batcher = _EventBatcher(store=store)
+    risk_distribution = {"High": 0, "Medium": 0, "Low": 0}
+    scanned = 0
+    skipped = 0
+    failed = 0
+    pruned = 0
+    seen: Set[str] = set()
+    stage_totals: Dict[str, float] = {}
+    start = time.perf_counter()
+    last_report = start
+
+    def _stats() -> Dict[str, object]:
+        elapsed = time.perf_counter() - start
+        return {
+            "files_scanned": scanned,
+            "files_skipped": skipped,
+            "files_failed": failed,
+            "elapsed_seconds": round(elapsed, 2),
+            "files_per_second": round((scanned + skipped) / elapsed, 2) if elapsed > 0 else 0.0,
+        }
+
+    try:
+        with output_path.open("w", encoding="utf-8") as handle:
+            plan = _plan(iter_input_paths(spec), store, version, seen if store else None)
+            for record in _iter_results(plan, workers, timings):
+                if record["status"] == "unchanged" and "risk" not in record and store is not None:
+                    # Content hash matched: refresh stat data, reuse the summary.
+                    state = store.get(str(record["input_file"])) or {}
+                    record.update(state.get("summary", {}))
+                    store.record(
+                        str(record["input_file"]),
+                        int(record["size"]),
+                        int(record["mtime_ns"]),
+                        str(record["content_hash"]),
+                        version,
+                        "ok",
+                        state.get("summary", {}),
+                    )
+                handle.write(json.dumps(record) + "\n")
+                for key, value in record.get("timings_ms", {}).items():
+                    stage_totals[key] = round(stage_totals.get(key, 0.0) + value, 2)
+                if record["status"] == "unchanged":
+                    skipped += 1
+                else:
+                    scanned += 1
+                    if record["status"] == "ok":
+                        risk_distribution[str(record["risk"]["level"])] += 1
+                    else:
+                        failed += 1
+                    batcher.add(record, version)
+                if store is not None and store.pending_count >= DB_BATCH_SIZE:
+                    # Events are flushed before state so a crash never marks a
+                    # file as scanned without its audit trail.
+                    batcher.flush()
+
+                now = time.perf_counter()
+                if progress and now - last_report >= PROGRESS_INTERVAL_SECONDS:
+                    progress(_stats())
+                    last_report = now
+        if store is not None:
+            pruned = prune_scan_state(store, spec, seen)
+    finally:
+        batcher.flush()
+        if store is not None:
+            store.close()
+
+    result = _stats()
+    if progress:
+        progress(result)
+    result.update(
+        {
+            "input": spec,
+            "workers": workers,
+            "incremental": incremental,
+            "rules_version": version,
+            "output_file": str(output_path),
+            "risk_distribution": risk_distribution,
+        }
+    )
+    if incremental:
+        result["files_pruned"] = pruned
+    if timings:
+        result["stage_timings_ms"] = stage_totals
+    return result
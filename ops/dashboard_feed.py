@@ -0,0 +1,245 @@
+"""Live dashboard deltas over server-sent events.
+
+One poller thread per process reads scan_events rows newer than the last one
+it saw (a keyset read on the primary key). It turns each batch into a delta
+of the new scans plus counter increments, and fans that delta out to every
+connected dashboard. Database work therefore scales with the number of scans
+and processes, not with the number of open dashboards. Clients apply deltas
+to the snapshot from ``/api/dashboard-data``. A client that falls too far
+behind is told to reload the snapshot.
+
+Every open stream holds a request thread, so each process serves at most
+``dashboard.max_streams`` of them. Streams also end after
+``dashboard.stream_max_seconds`` and when the server shuts down. Before
+ending, a stream sends its last event id, so the browser reconnects (to any
+worker) with ``Last-Event-ID`` and misses nothing.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import queue
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Set
+
+from config_loader import load_system_config
+from storage.db import ENTITY_COLUMNS
+from storage.event_query import iter_events
+from storage.scan_rollups import RISK_LEVELS, latest_scan_id
+
+
+SYSTEM_CONFIG = load_system_config()
+FEED_CONFIG = SYSTEM_CONFIG.get("dashboard", {})
+POLL_INTERVAL = int(FEED_CONFIG.get("feed_poll_interval_ms", 500)) / 1000
+KEEPALIVE_SECONDS = float(FEED_CONFIG.get("keepalive_seconds", 15))
+REPLAY_LIMIT = int(FEED_CONFIG.get("replay_limit", 500))
+MAX_STREAMS = int(FEED_CONFIG.get("max_streams", 8))
+STREAM_MAX_SECONDS = float(FEED_CONFIG.get("stream_max_seconds", 300))
+SUBSCRIBER_BACKLOG = 100
+
+_streams_lock = threading.Lock()
+_open_streams = 0
+_closing = threading.Event()
+
+
+def acquire_stream_slot() -> bool:
+    """Reserve one of this process's ``MAX_STREAMS`` event-stream slots (0 = no cap)."""
+    global _open_streams
+    with _streams_lock:
+        if _closing.is_set() or (MAX_STREAMS and _open_streams >= MAX_STREAMS):
+            return False
+        _open_streams += 1
+        return True
+
+
+def release_stream_slot() -> None:
+    global _open_streams
+    with _streams_lock:
+        _open_streams = max(0, _open_streams - 1)
+
+
+def streams_closing() -> bool:
+    return _closing.is_set()
+
+
+def close_event_streams() -> None:
+    """End every event stream in this process (server shutdown) and refuse new ones."""
+    _closing.set()
+    with _feed_lock:
+        feed = _feed if _feed_pid == os.getpid() else None
+    if feed is not None:
+        feed.wake_all()
+
+
+def scan_delta(scans: List[Dict[str, object]]) -> Dict[str, object]:
+    """New scan rows (ascending ids) plus the counter increments they add."""
+    risk_distribution = {level: 0 for level in RISK_LEVELS}
+    entity_totals = {column: 0 for column in ENTITY_COLUMNS}
+    score_sum = 0
+    for scan in scans:
+        level = str(scan["risk_level"])
+        risk_distribution[level] = risk_distribution.get(level, 0) + 1
+        score_sum += int(scan["risk_score"])
+        for column, count in dict(scan["counts"]).items():
+            entity_totals[column] += int(count or 0)
+    return {
+        "last_id": scans[-1]["id"],
+        "scans": [
+            {key: scan[key] for key in ("id", "filename", "risk_level", "risk_score", "counts")}
+            for scan in scans
+        ],
+        "counters": {
+            "documents_scanned": len(scans),
+            "risk_score_sum": score_sum,
+            "risk_distribution": risk_distribution,
+            "entity_totals": entity_totals,
+        },
+    }
+
+
+class Subscription:
+    def __init__(self) -> None:
+        self.deltas: "queue.Queue[Dict[str, object]]" = queue.Queue(maxsize=SUBSCRIBER_BACKLOG)
+        self.overflowed = False
+
+
+class DashboardFeed:
+    """Polls for new scans while anyone is subscribed and fans deltas out."""
+
+    def __init__(self, poll_interval: float = POLL_INTERVAL) -> None:
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._subscribers: Set[Subscription] = set()
+        self._last_id: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription()
+        with self._lock:
+            if not self._subscribers:
+                # Nobody was listening, so start from the current head.
+                self._last_id = latest_scan_id()
+            self._subscribers.add(subscription)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="dashboard-feed", daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def wake_all(self) -> None:
+        """Wake every waiting stream so it notices shutdown."""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.deltas.put_nowait({})
+            except queue.Full:
+                subscription.overflowed = True
+
+    def poll_once(self) -> Optional[Dict[str, object]]:
+        """Read scans past the last seen id and publish them; return the delta."""
+        with self._lock:
+            subscribers = list(self._subscribers)
+            last_id = self._last_id
+        if not subscribers:
+            return None
+        scans = list(iter_events("scan", cursor=last_id, limit=REPLAY_LIMIT))
+        if not scans:
+            return None
+        delta = scan_delta(scans)
+        with self._lock:
+            self._last_id = int(delta["last_id"])
+        for subscription in subscribers:
+            try:
+                subscription.deltas.put_nowait(delta)
+            except queue.Full:
+                subscription.overflowed = True
+        return delta
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                self.poll_once()
+            except Exception:
+                # A transient database error must not kill the feed for every viewer.
+                continue
+
+
+def _event(name: str, payload: Dict[str, object], event_id: Optional[object] = None) -> str:
+    prefix = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{prefix}event: {name}\ndata: {json.dumps(payload)}\n\n"
+
+
+def sse_stream(
+    feed: DashboardFeed,
+    after: Optional[int],
+    keepalive: float = KEEPALIVE_SECONDS,
+    max_seconds: float = STREAM_MAX_SECONDS,
+) -> Iterator[str]:
+    """Yield SSE messages: missed scans since ``after``, then live ``scans`` deltas.
+
+    Sends ``reset`` (reload the snapshot) when the gap is too large to
+    replay or the client fell behind the live feed. After ``max_seconds``,
+    or on shutdown, ends with the last id sent so the client resumes there.
+    """
+    subscription = feed.subscribe()
+    ends_at = time.monotonic() + max_seconds
+    try:
+        sent = after if after is not None else latest_scan_id()
+        if after is not None:
+            missed = list(iter_events("scan", cursor=after, limit=REPLAY_LIMIT + 1))
+            if len(missed) > REPLAY_LIMIT:
+                yield _event("reset", {"reason": "too many missed scans"})
+                return
+            if missed:
+                delta = scan_delta(missed)
+                sent = int(delta["last_id"])
+                yield _event("scans", delta, sent)
+        while True:
+            if subscription.overflowed:
+                yield _event("reset", {"reason": "client fell behind"})
+                return
+            remaining = ends_at - time.monotonic()
+            if remaining <= 0 or _closing.is_set():
+                # An id-only message updates Last-Event-ID without an event.
+                yield f"id: {sent}\nretry: 1000\n\n"
+                return
+            try:
+                delta = subscription.deltas.get(timeout=min(keepalive, remaining))
+            except queue.Empty:
+                if time.monotonic() < ends_at:
+                    yield ": keep-alive\n\n"
+                continue
+            if not delta:
+                continue  # woken by close_event_streams
+            # The subscription may overlap the replay; skip what was already sent.
+            fresh = [scan for scan in delta["scans"] if int(scan["id"]) > sent]
+            if not fresh:
+                continue
+            if len(fresh) != len(delta["scans"]):
+                delta = scan_delta(fresh)
+            sent = int(delta["last_id"])
+            yield _event("scans", delta, sent)
+    finally:
+        feed.unsubscribe(subscription)
+
+
+_feed: Optional[DashboardFeed] = None
+_feed_pid: Optional[int] = None
+_feed_lock = threading.Lock()
+
+
+def get_dashboard_feed() -> DashboardFeed:
+    """Return this process's feed; poller threads do not survive a fork."""
+    global _feed, _feed_pid
+    with _feed_lock:
+        if _feed is None or _feed_pid != os.getpid():
+            _feed = DashboardFeed()
+            _feed_pid = os.getpid()
+        return _feed
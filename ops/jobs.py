@@ -0,0 +1,553 @@
+"""Background job runner for web scan/protect requests.
+
+Uploads are saved by the request thread and the extraction -> detection ->
+classification pipeline runs on a fixed pool of worker threads, fed by the
+priority scheduler in ``ops.scheduler``. Job state, results and per-stage
+timings are persisted through ``storage.job_store`` so any web worker can
+answer status polls and event streams.
+"""
+
+from __future__ import annotations
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import metrics
+import tracing
+from classification import build_risk_summary
+from config_loader import load_system_config, rules_version
+from detection import count_sensitive_items, detect_sensitive_data
+from extraction import read_document_text, set_ocr_concurrency
+from metrics import collect_timings, stage
+from protection import encrypt_text, generate_encryption_key, redact_text, verify_redaction_quality
+from ops.scheduler import PriorityScheduler, SchedulerFull, retry_after_seconds
+from storage import job_store
+from storage.audit_repo import log_audit_event, log_scan_event
+from storage.db import close_thread_conns
+from storage.scan_results import get_scan_result, purge_scan_results, save_scan_result
+
+
+SYSTEM_CONFIG = load_system_config()
+JOBS_CONFIG = SYSTEM_CONFIG.get("jobs", {})
+WORKERS = int(JOBS_CONFIG.get("workers", 2))
+MAX_CONCURRENT_OCR = int(JOBS_CONFIG.get("scheduler", {}).get("max_concurrent_ocr", 2))
+SYNC_WAIT_SECONDS = float(JOBS_CONFIG.get("sync_wait_seconds", 20))
+RESULT_TTL_SECONDS = int(JOBS_CONFIG.get("result_ttl_seconds", 3600))
+SSE_POLL_INTERVAL = int(JOBS_CONFIG.get("sse_poll_interval_ms", 250)) / 1000
+# How often a runner looks for queued jobs released by stopped workers and
+# fails jobs left queued or running by workers that died.
+ADOPT_INTERVAL_SECONDS = float(JOBS_CONFIG.get("adopt_interval_seconds", 2))
+SCAN_RESULT_TTL_SECONDS = int(SYSTEM_CONFIG.get("uploads", {}).get("result_ttl_seconds", 86400))
+PURGE_INTERVAL_SECONDS = 60.0
+
+Timings = Dict[str, float]
+Handler = Callable[[Dict[str, Any], Timings], Dict[str, Any]]
+
+JOBS_TOTAL = metrics.counter("privguard_jobs_total", "Finished jobs, by kind and status.", ("kind", "status"))
+JOB_SECONDS = metrics.histogram(
+    "privguard_job_seconds", "Job run time after leaving the queue.", ("kind",)
+)
+
+
+class JobQueueFull(Exception):
+    """Raised when admission control refuses a job; ``retry_after`` is in seconds."""
+
+    def __init__(self, message: str, retry_after: int) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def analyse_document(params: Dict[str, Any]) -> Tuple[str, Dict[str, Any], Dict[str, Any], bool]:
+    """Return ``(text, findings, risk, reused)`` for an upload.
+
+    Content-addressed uploads reuse the stored result for identical bytes
+    with the same suffix scanned under the current rules, skipping
+    extraction and OCR entirely.
+    The pipeline functions record their own stage timings.
+    """
+    path = Path(params["path"])
+    content_hash = params.get("content_hash")
+    version = rules_version()
+    if content_hash:
+        stored = get_scan_result(content_hash, path.suffix, version)
+        tracing.set_attributes(cache_hit=stored is not None)
+        if stored is not None:
+            return stored["text"], stored["findings"], stored["risk"], True
+    text = read_document_text(path)
+    findings = detect_sensitive_data(text)
+    risk = build_risk_summary(findings)
+    if content_hash:
+        save_scan_result(content_hash, path.suffix, version, text, findings, risk)
+    return text, findings, risk, False
+
+
+def _display_name(params: Dict[str, Any]) -> str:
+    return params.get("filename") or Path(params["path"]).name
+
+
+def _output_stem(params: Dict[str, Any]) -> str:
+    # Include part of the digest so different documents uploaded under the
+    # same name do not overwrite each other's outputs.
+    stem = Path(_display_name(params)).stem
+    content_hash = params.get("content_hash")
+    return f"{stem}-{content_hash[:8]}" if content_hash else stem
+
+
+def scan_events(
+    result: Dict[str, Any], params: Dict[str, Any]
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Return the ``(audit_event, scan_event)`` pair recorded for a scan result."""
+    total_items = count_sensitive_items(result["findings"])
+    audit_event = {
+        "event_type": "scan",
+        "actor": "web-user",
+        "source": "web",
+        "details": {
+            "filename": result["filename"],
+            "risk_level": result["risk_level"],
+            "risk_score": result["risk_score"],
+            "total_sensitive_items": total_items,
+            "content_hash": params.get("content_hash"),
+            "reused_result": result["reused_result"],
+        },
+    }
+    if params.get("trace_id"):
+        audit_event["details"]["trace_id"] = params["trace_id"]
+    scan_event = {
+        "filename": result["filename"],
+        "risk_level": result["risk_level"],
+        "risk_score": result["risk_score"],
+        "total_sensitive_items": total_items,
+        "source": "web",
+        "counts": result["counts"],
+    }
+    return audit_event, scan_event
+
+
+def run_scan_job(params: Dict[str, Any], timings: Timings) -> Dict[str, Any]:
+    """Scan an upload and return the result reported to the client.
+
+    The job id doubles as the scan id that /protect and /verify-redaction
+    accept instead of a second upload. With ``defer_events`` the caller
+    records the events itself (batch scans write them in batches).
+    """
+    extracted_text, findings, risk, reused = analyse_document(params)
+    result = {
+        "filename": _display_name(params),
+        "findings": findings,
+        "risk_score": risk["score"],
+        "risk_level": risk["level"],
+        "counts": risk["counts"],
+        "insights": risk["insights"],
+        "extracted_preview": extracted_text[:700],
+        "reused_result": reused,
+        "scan_id": params.get("job_id"),
+    }
+    if not params.get("defer_events"):
+        audit_event, scan_event = scan_events(result, params)
+        log_scan_event(
+            scan_event["filename"],
+            scan_event["risk_level"],
+            scan_event["risk_score"],
+            scan_event["total_sensitive_items"],
+            source="web",
+            counts=scan_event["counts"],
+        )
+        log_audit_event(**audit_event)
+    return result
+
+
+def run_protect_job(params: Dict[str, Any], timings: Timings) -> Dict[str, Any]:
+    filename = _display_name(params)
+    stem = _output_stem(params)
+    output_dir = Path(params["output_dir"])
+    source_text, findings, _, reused = analyse_document(params)
+
+    if params["action"] == "redact":
+        with stage("protect"):
+            protected = redact_text(source_text, findings)
+            out_path = output_dir / f"{stem}.redacted.txt"
+            out_path.write_text(protected, encoding="utf-8")
+            quality = verify_redaction_quality(findings, protected)
+        log_audit_event(
+            event_type="protect_redact",
+            actor="web-user",
+            source="web",
+            details={
+                "filename": filename,
+                "output_file": str(out_path),
+                "quality_status": quality["quality_status"],
+                "leak_count": quality["leak_count"],
+                "reused_result": reused,
+            },
+        )
+        return {
+            "action": "redact",
+            "output_file": str(out_path),
+            "quality": quality,
+            "preview": protected[:700],
+        }
+
+    with stage("protect"):
+        key = generate_encryption_key()
+        key_path = Path(params["key_dir"]) / f"{stem}.key"
+        key_path.write_bytes(key)
+        encrypted = encrypt_text(source_text, key)
+        out_path = output_dir / f"{stem}.encrypted.txt"
+        out_path.write_text(encrypted, encoding="utf-8")
+    log_audit_event(
+        event_type="protect_encrypt",
+        actor="web-user",
+        source="web",
+        details={
+            "filename": filename,
+            "output_file": str(out_path),
+            "key_file": str(key_path),
+            "reused_result": reused,
+        },
+    )
+    return {
+        "action": "encrypt",
+        "output_file": str(out_path),
+        "key_file": str(key_path),
+        "preview": encrypted[:220],
+    }
+
+
+JOB_HANDLERS: Dict[str, Handler] = {"scan": run_scan_job, "protect": run_protect_job}
+
+
+class JobRunner:
+    """Fixed pool of worker threads draining a ``PriorityScheduler``."""
+
+    def __init__(
+        self,
+        workers: int = WORKERS,
+        scheduler: Optional[PriorityScheduler] = None,
+        handlers: Optional[Dict[str, Handler]] = None,
+        max_concurrent_ocr: Optional[int] = MAX_CONCURRENT_OCR,
+    ) -> None:
+        self.handlers = handlers or JOB_HANDLERS
+        self.scheduler = scheduler or PriorityScheduler()
+        set_ocr_concurrency(max_concurrent_ocr)
+        self._lock = threading.Lock()
+        self._done_events: Dict[str, threading.Event] = {}
+        self._notify: "Dict[str, queue.Queue[str]]" = {}
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        # Moving average of job run time, used to estimate Retry-After.
+        self._avg_service_seconds = 1.0
+        self._last_purge = 0.0
+        self._released = False
+        self._stopped = threading.Event()
+        self._threads = [
+            threading.Thread(target=self._work, name=f"job-worker-{index}", daemon=True)
+            for index in range(max(1, workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+        self._adopter = threading.Thread(target=self._adopt_loop, name="job-adopter", daemon=True)
+        self._adopter.start()
+
+    def submit(
+        self,
+        kind: str,
+        actor: str,
+        params: Dict[str, Any],
+        priority: str = "interactive",
+        notify: "Optional[queue.Queue[str]]" = None,
+    ) -> str:
+        """Queue a job and return its id; ``notify`` receives the id when it finishes.
+
+        A job submitted inside a trace (a traced web request) carries its
+        trace id, so the job's spans and audit events share it.
+        """
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        trace_id = tracing.current_trace_id()
+        if trace_id and "trace_id" not in params:
+            params = {**params, "trace_id": trace_id}
+        # Refuse before touching the database so overload stays cheap to reject.
+        self.check_admission(priority, actor)
+        self._maybe_purge()
+        job_id = job_store.create_job(kind, actor, params, priority)
+        rejected: Optional[SchedulerFull] = None
+        with self._lock:
+            released = self._released
+            if not released:
+                self._done_events[job_id] = threading.Event()
+                if notify is not None:
+                    self._notify[job_id] = notify
+                try:
+                    self.scheduler.put_nowait((job_id, kind, params), priority, actor)
+                except SchedulerFull as exc:
+                    rejected = exc
+        if released:
+            # This worker is stopping; a sibling (or the next server) runs it.
+            job_store.release_jobs([job_id])
+            return job_id
+        if rejected is not None:
+            job_store.delete_job(job_id)
+            with self._lock:
+                self._done_events.pop(job_id, None)
+                self._notify.pop(job_id, None)
+            raise self._rejection(rejected) from None
+        return job_id
+
+    def check_admission(self, priority: str, actor: str) -> None:
+        """Raise ``JobQueueFull`` if a ``priority`` job from ``actor`` would be refused."""
+        try:
+            self.scheduler.check_admission(priority, actor)
+        except SchedulerFull as exc:
+            raise self._rejection(exc) from None
+
+    def _rejection(self, exc: SchedulerFull) -> JobQueueFull:
+        with self._lock:
+            self._rejected += 1
+            service = self._avg_service_seconds
+        backlog = self.scheduler.ahead_of(exc.priority)
+        return JobQueueFull(str(exc), retry_after_seconds(backlog, service, len(self._threads)))
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> bool:
+        """Block until a job submitted by this process finishes; False on timeout."""
+        with self._lock:
+            done = self._done_events.get(job_id)
+        return True if done is None else done.wait(timeout)
+
+    def cancel(self, job_ids: List[str], reason: str = "Cancelled") -> List[str]:
+        """Cancel jobs that have not started; returns the ids actually cancelled.
+
+        Jobs already running finish normally and still notify their waiters.
+        Jobs queued by another runner are cancelled through the job row.
+        """
+        wanted = set(job_ids)
+        self.scheduler.remove(lambda item: item[0] in wanted)
+        cancelled = job_store.cancel_queued_jobs(job_ids, reason)
+        with self._lock:
+            waiters = [self._done_events.pop(job_id, None) for job_id in cancelled]
+            for job_id in cancelled:
+                self._notify.pop(job_id, None)
+        for done in waiters:
+            if done is not None:
+                done.set()
+        return cancelled
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            totals = {
+                "workers": len(self._threads),
+                "running": self._running,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "avg_service_seconds": round(self._avg_service_seconds, 4),
+            }
+        return {**totals, "queued": self.scheduler.depth(), "classes": self.scheduler.stats()}
+
+    def prometheus_lines(self) -> List[str]:
+        """Pool and queue gauges plus per-class queue-wait histograms."""
+        stats = self.stats()
+        lines = metrics.header_lines("privguard_job_workers", "gauge", "Job worker threads.")
+        lines.append(metrics.sample_line("privguard_job_workers", stats["workers"]))
+        lines += metrics.header_lines("privguard_jobs_running", "gauge", "Jobs currently running.")
+        lines.append(metrics.sample_line("privguard_jobs_running", stats["running"]))
+        lines += metrics.header_lines(
+            "privguard_job_queue_depth", "gauge", "Jobs waiting, by priority class."
+        )
+        for name, cls in stats["classes"].items():
+            lines.append(metrics.sample_line("privguard_job_queue_depth", cls["queued"], ("priority",), (name,)))
+        lines += metrics.header_lines(
+            "privguard_job_queue_wait_seconds", "histogram", "Time jobs waited in the queue."
+        )
+        for name, cls in stats["classes"].items():
+            wait = cls["queue_wait"]
+            lines += metrics.histogram_lines(
+                "privguard_job_queue_wait_seconds",
+                ("priority",),
+                (name,),
+                self.scheduler.wait_histograms[name].buckets,
+                list(wait["buckets"].values()),
+                wait["count"],
+                wait["sum_seconds"],
+            )
+        return lines
+
+    def adopt_released_jobs(self) -> int:
+        """Queue jobs released by stopped workers here; returns how many were taken."""
+        with self._lock:
+            if self._released:
+                return 0
+        adopted = 0
+        for job in job_store.claim_released_jobs():
+            item = (job["job_id"], job["kind"], job["params"])
+            try:
+                with self._lock:
+                    if self._released:
+                        raise SchedulerFull("runner released", job["priority"])
+                    self.scheduler.put_nowait(item, job["priority"], job["actor"])
+            except (SchedulerFull, ValueError):
+                job_store.release_jobs([job["job_id"]])
+                continue
+            adopted += 1
+        return adopted
+
+    def release_queue(self) -> int:
+        """Stop taking work and hand every queued job back to the shared queue.
+
+        Running jobs carry on. Jobs submitted from now on are released as
+        soon as they are created. Returns the number of jobs handed back.
+        """
+        with self._lock:
+            self._released = True
+            pending = self.scheduler.close(discard=True)
+        self._stopped.set()
+        job_ids = [job_id for job_id, _, _ in pending]
+        released = job_store.release_jobs(job_ids)
+        # Local waiters stop waiting and answer with job links instead.
+        with self._lock:
+            waiters = [self._done_events.pop(job_id, None) for job_id in job_ids]
+            notify = [(job_id, self._notify.pop(job_id, None)) for job_id in job_ids]
+        for done in waiters:
+            if done is not None:
+                done.set()
+        for job_id, target in notify:
+            if target is not None:
+                target.put(job_id)
+        return released
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """Finish queued jobs (unless released) and stop the worker threads.
+
+        Waits at most ``timeout`` seconds when given; returns False if jobs
+        were still running then.
+        """
+        self._stopped.set()
+        self.scheduler.close()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in [*self._threads, self._adopter]:
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        return not any(thread.is_alive() for thread in self._threads)
+
+    def _adopt_loop(self) -> None:
+        try:
+            while not self._stopped.is_set():
+                try:
+                    # A sibling killed mid-job, or one that crashed, never
+                    # finishes its rows; waiting clients would poll forever.
+                    job_store.fail_interrupted_jobs()
+                    self.adopt_released_jobs()
+                except sqlite3.Error:
+                    pass
+                self._stopped.wait(ADOPT_INTERVAL_SECONDS)
+        finally:
+            close_thread_conns()
+
+    def _maybe_purge(self) -> None:
+        now = time.monotonic()
+        if now - self._last_purge < PURGE_INTERVAL_SECONDS:
+            return
+        self._last_purge = now
+        job_store.purge_finished_jobs(RESULT_TTL_SECONDS, SCAN_RESULT_TTL_SECONDS)
+        purge_scan_results(SCAN_RESULT_TTL_SECONDS)
+
+    def _work(self) -> None:
+        while True:
+            entry = self.scheduler.get()
+            if entry is None:
+                close_thread_conns()
+                return
+            (job_id, kind, params), priority, waited = entry
+            if not job_store.mark_running(job_id):
+                # Cancelled while queued; the row already says so.
+                self._finish_waiters(job_id)
+                continue
+            started = time.perf_counter()
+            timings: Timings = {"queue_wait_ms": round(waited * 1000, 2)}
+            with self._lock:
+                self._running += 1
+            result = None
+            error = None
+            try:
+                with tracing.trace(
+                    f"job.{kind}",
+                    trace_id=params.get("trace_id"),
+                    job_id=job_id,
+                    priority=priority,
+                    queue_wait_ms=timings["queue_wait_ms"],
+                ), collect_timings(timings):
+                    result = self.handlers[kind]({**params, "job_id": job_id}, timings)
+            except Exception as exc:
+                error = str(exc)
+            elapsed = time.perf_counter() - started
+            timings["total_ms"] = round(elapsed * 1000, 2)
+            JOBS_TOTAL.inc(kind, "failed" if error is not None else "done")
+            JOB_SECONDS.observe(elapsed, kind)
+            try:
+                job_store.mark_finished(job_id, result, error, timings)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._avg_service_seconds += 0.2 * (elapsed - self._avg_service_seconds)
+                    if error is None:
+                        self._completed += 1
+                    else:
+                        self._failed += 1
+                self._finish_waiters(job_id)
+
+    def _finish_waiters(self, job_id: str) -> None:
+        with self._lock:
+            done = self._done_events.pop(job_id, None)
+            notify = self._notify.pop(job_id, None)
+        if done is not None:
+            done.set()
+        if notify is not None:
+            notify.put(job_id)
+
+
+_runner: Optional[JobRunner] = None
+_runner_pid: Optional[int] = None
+_runner_lock = threading.Lock()
+
+
+def get_job_runner() -> JobRunner:
+    """Return this process's runner, starting it (and failing orphaned jobs) on first use."""
+    global _runner, _runner_pid
+    if _runner is not None and _runner_pid == os.getpid():
+        return _runner
+    with _runner_lock:
+        if _runner is None or _runner_pid != os.getpid():
+            job_store.fail_interrupted_jobs()
+            _runner = JobRunner()
+            _runner_pid = os.getpid()
+        return _runner
+
+
+def release_queued_jobs() -> int:
+    """Hand this process's queued jobs back to the shared queue (see ``JobRunner.release_queue``)."""
+    with _runner_lock:
+        runner = _runner if _runner_pid == os.getpid() else None
+    return runner.release_queue() if runner is not None else 0
+
+
+def shutdown_job_runner(timeout: Optional[float] = None) -> bool:
+    """Stop this process's runner, if it was started.
+
+    Queued jobs are released for other workers (or the next server start) to
+    claim; running jobs get up to ``timeout`` seconds to finish. Returns
+    False if some were still running then.
+    """
+    global _runner
+    with _runner_lock:
+        runner = _runner if _runner_pid == os.getpid() else None
+        _runner = None
+    if runner is None:
+        return True
+    runner.release_queue()
+    return runner.close(timeout)
@@ -0,0 +1,250 @@
+"""Profile the scan and protect pipeline for one document.
+
+``profile_document`` runs extract -> detect -> classify -> protect -> verify
+under cProfile and tracemalloc. It reports:
+
+* the hottest functions, ranked by self time, cumulative time or call count;
+* wall, CPU and memory per top-level stage;
+* the nested ``metrics.stage`` timings (``ocr``, ``detect_<type>``, ...).
+
+Nothing is written to disk except the optional pstats dump. Both profilers
+add overhead, so compare wall times between profiles rather than against
+``--timings`` or ``/metrics``. CPU time is the calling thread's only, so it
+excludes Tesseract, which runs as a subprocess.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import pstats
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from classification import build_risk_summary
+from config_loader import load_system_config
+from detection import count_sensitive_items, detect_sensitive_data
+from extraction import read_document_text
+from metrics import collect_timings, format_timings
+from protection import (
+    encrypt_text,
+    generate_encryption_key,
+    mask_text,
+    redact_text,
+    verify_redaction_quality,
+)
+
+
+SYSTEM_CONFIG = load_system_config()
+PROFILING_CONFIG = SYSTEM_CONFIG.get("profiling", {})
+TOP_FUNCTIONS = int(PROFILING_CONFIG.get("top_functions", 25))
+DEFAULT_SORT = str(PROFILING_CONFIG.get("sort", "tottime"))
+
+PROFILE_ACTIONS = ("redact", "mask", "encrypt")
+# Sort key -> index into a pstats entry (primitive calls, calls, tottime, cumtime, callers).
+SORT_KEYS = {"calls": 1, "tottime": 2, "cumulative": 3}
+
+ROOT = Path(__file__).resolve().parents[1]
+# cProfile and tracemalloc are process-wide; one profile runs at a time.
+_profile_lock = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    """Raised when another profile is already running in this process."""
+
+
+class _StageUsage:
+    """Wall, thread CPU and tracemalloc deltas for one block.
+
+    Each stage resets the tracemalloc peak, so stages report their absolute
+    peak to ``parent`` to keep the enclosing total correct.
+    """
+
+    def __init__(
+        self, name: str, rows: List[Dict[str, Any]], parent: Optional["_StageUsage"] = None
+    ) -> None:
+        self.name = name
+        self.rows = rows
+        self.parent = parent
+        self.peak = 0
+
+    def __enter__(self) -> "_StageUsage":
+        tracemalloc.reset_peak()
+        self.memory = tracemalloc.get_traced_memory()[0]
+        self.cpu = time.thread_time()
+        self.wall = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        wall = time.perf_counter() - self.wall
+        cpu = time.thread_time() - self.cpu
+        current, peak = tracemalloc.get_traced_memory()
+        self.peak = max(self.peak, peak)
+        if self.parent is not None:
+            self.parent.peak = max(self.parent.peak, self.peak)
+        self.rows.append(
+            {
+                "stage": self.name,
+                "wall_ms": round(wall * 1000, 2),
+                "cpu_ms": round(cpu * 1000, 2),
+                "alloc_kb": round((current - self.memory) / 1024, 1),
+                "peak_kb": round((self.peak - self.memory) / 1024, 1),
+            }
+        )
+
+
+def _protect(action: str, text: str, findings: Dict[str, List[dict]]) -> str:
+    if action == "redact":
+        return redact_text(text, findings)
+    if action == "mask":
+        return mask_text(text, findings)
+    return encrypt_text(text, generate_encryption_key())
+
+
+def _function_label(func: tuple) -> str:
+    label = pstats.func_std_string(func)
+    prefix = str(ROOT) + "/"
+    return label[len(prefix):] if label.startswith(prefix) else label
+
+
+def hot_functions(stats: pstats.Stats, sort: str, top: int) -> List[Dict[str, Any]]:
+    """Top ``top`` entries of ``stats`` ranked by ``sort``, excluding this module."""
+    index = SORT_KEYS[sort]
+    own_file = str(Path(__file__).resolve())
+    entries = [
+        (func, entry)
+        for func, entry in stats.stats.items()
+        if str(Path(func[0]).resolve()) != own_file
+    ]
+    entries.sort(key=lambda item: item[1][index], reverse=True)
+    ranked = []
+    for rank, (func, (primitive, calls, self_time, cumulative, _callers)) in enumerate(
+        entries[:top], start=1
+    ):
+        ranked.append(
+            {
+                "rank": rank,
+                "function": _function_label(func),
+                "calls": calls,
+                "primitive_calls": primitive,
+                "self_ms": round(self_time * 1000, 3),
+                "cumulative_ms": round(cumulative * 1000, 3),
+                "per_call_ms": round(cumulative * 1000 / calls, 4) if calls else 0.0,
+            }
+        )
+    return ranked
+
+
+def profile_document(
+    path: Path,
+    action: str = "redact",
+    top: Optional[int] = None,
+    sort: Optional[str] = None,
+    pstats_path: Optional[Path] = None,
+) -> Dict[str, Any]:
+    """Run the pipeline for ``path`` under cProfile and tracemalloc and report hot spots.
+
+    Raises:
+        ValueError: If ``action`` or ``sort`` is not supported.
+        ProfilerBusy: If another profile is running in this process.
+    """
+    if action not in PROFILE_ACTIONS:
+        raise ValueError(f"Unsupported protection action: {action}")
+    sort = sort or DEFAULT_SORT
+    if sort not in SORT_KEYS:
+        raise ValueError(f"Unsupported sort key: {sort}")
+    top = TOP_FUNCTIONS if top is None else max(1, int(top))
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusy("Another profile is already running; try again shortly.")
+
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    profiler = cProfile.Profile()
+    stages: List[Dict[str, Any]] = []
+    try:
+        with collect_timings() as timings, _StageUsage("total", stages) as total_usage:
+            profiler.enable()
+            try:
+                with _StageUsage("extract", stages, total_usage):
+                    text = read_document_text(path)
+                with _StageUsage("detect", stages, total_usage):
+                    findings = detect_sensitive_data(text)
+                with _StageUsage("classify", stages, total_usage):
+                    risk = build_risk_summary(findings)
+                with _StageUsage(action, stages, total_usage):
+                    protected = _protect(action, text, findings)
+                if action != "encrypt":
+                    with _StageUsage("verify_redaction", stages, total_usage):
+                        quality = verify_redaction_quality(findings, protected)
+            finally:
+                profiler.disable()
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+        _profile_lock.release()
+
+    stats = pstats.Stats(profiler)
+    if pstats_path is not None:
+        pstats_path.parent.mkdir(parents=True, exist_ok=True)
+        stats.dump_stats(str(pstats_path))
+
+    total = stages.pop()
+    report: Dict[str, Any] = {
+        "input_file": str(path),
+        "action": action,
+        "bytes": path.stat().st_size,
+        "chars": len(text),
+        "total_sensitive_items": count_sensitive_items(findings),
+        "risk_level": risk["level"],
+        "total": {key: value for key, value in total.items() if key != "stage"},
+        "stages": stages,
+        "stage_timings_ms": timings,
+        "sort": sort,
+        "hot_functions": hot_functions(stats, sort, top),
+    }
+    if action != "encrypt":
+        report["quality_status"] = quality["quality_status"]
+    if pstats_path is not None:
+        report["pstats_file"] = str(pstats_path)
+    return report
+
+
+def format_profile_report(report: Dict[str, Any]) -> str:
+    """Render a profile report as plain-text tables."""
+    total = report["total"]
+    lines = [
+        f"Profile: {report['input_file']} ({report['action']}, {report['bytes']} bytes, "
+        f"{report['total_sensitive_items']} findings, risk {report['risk_level']})",
+        f"Total: wall {total['wall_ms']:.2f} ms, cpu {total['cpu_ms']:.2f} ms, "
+        f"peak {total['peak_kb']:.1f} KiB",
+        "",
+        f"{'stage':<18}{'wall ms':>12}{'cpu ms':>12}{'alloc KiB':>12}{'peak KiB':>12}",
+    ]
+    for row in report["stages"]:
+        lines.append(
+            f"{row['stage']:<18}{row['wall_ms']:>12.2f}{row['cpu_ms']:>12.2f}"
+            f"{row['alloc_kb']:>12.1f}{row['peak_kb']:>12.1f}"
+        )
+    top_level = {f"{row['stage']}_ms" for row in report["stages"]}
+    nested = {key: value for key, value in report["stage_timings_ms"].items() if key not in top_level}
+    if nested:
+        lines += ["", format_timings(nested)]
+    lines += [
+        "",
+        f"Hot functions (by {report['sort']}):",
+        f"{'#':>3}{'calls':>10}{'self ms':>12}{'cum ms':>12}  function",
+    ]
+    for item in report["hot_functions"]:
+        calls = str(item["calls"])
+        if item["primitive_calls"] != item["calls"]:
+            calls = f"{item['calls']}/{item['primitive_calls']}"
+        lines.append(
+            f"{item['rank']:>3}{calls:>10}{item['self_ms']:>12.3f}{item['cumulative_ms']:>12.3f}"
+            f"  {item['function']}"
+        )
+    if "pstats_file" in report:
+        lines += ["", f"pstats written to {report['pstats_file']}"]
+    return "\n".join(lines)
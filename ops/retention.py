@@ -3,11 +3,14 @@
 from __future__ import annotations
 
 import os
+import time
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Optional
 
 from config_loader import load_system_config
+from storage import audit_archive, audit_chain
+from storage.audit_repo import flush_audit_writer
 from storage.db import get_conn, init_db
 
 
@@ -37,32 +40,73 @@ def _cleanup_files(days: int) -> Dict[str, int]:
     return {"files_scanned": scanned, "files_deleted": deleted}
 
 
+def _delete_in_batches(
+    table: str, cutoff: str, batch_size: int, pause: float, before_id: Optional[int] = None
+) -> int:
+    """Delete rows older than ``cutoff`` in short, index-driven transactions.
+
+    Each batch commits on its own so concurrent audit writers only wait for
+    one small transaction at a time. Counts come from ``changes()`` via
+    ``rowcount`` rather than COUNT(*) scans. ``before_id`` additionally
+    keeps every row with ``id >= before_id``.
+    """
+    id_bound = "" if before_id is None else "AND id < ?"
+    params = (cutoff,) if before_id is None else (cutoff, before_id)
+    deleted = 0
+    while True:
+        with get_conn() as conn:
+            cursor = conn.execute(
+                f"""
+                DELETE FROM {table}
+                WHERE id IN (
+                    SELECT id FROM {table}
+                    WHERE created_at < ? {id_bound}
+                    LIMIT ?
+                )
+                """,
+                (*params, batch_size),
+            )
+            batch_deleted = cursor.rowcount
+        deleted += batch_deleted
+        if batch_deleted < batch_size:
+            return deleted
+        if pause:
+            time.sleep(pause)
+
+
+def _audit_chain_anchor(cutoff: str) -> Optional[int]:
+    """Return the id of the oldest audit row retention must keep.
+
+    Pruning stops at the newest signed checkpoint older than the cutoff so the
+    remaining chain still starts at a verifiable row. With no such checkpoint,
+    only rows from before hash chaining was enabled may be removed.
+    """
+    with get_conn() as conn:
+        anchor = conn.execute(
+            "SELECT MAX(id) FROM audit_events WHERE event_type = ? AND created_at < ?",
+            (audit_chain.CHECKPOINT_EVENT_TYPE, cutoff),
+        ).fetchone()[0]
+        if anchor is None:
+            anchor = conn.execute(
+                "SELECT MIN(id) FROM audit_events WHERE row_hash IS NOT NULL AND id > ?",
+                (audit_archive.archived_through_id(),),
+            ).fetchone()[0]
+    return anchor
+
+
 def _cleanup_audit(days: int) -> Dict[str, int]:
+    flush_audit_writer()
     init_db()
+    batch_size = int(RETENTION.get("delete_batch_size", 5000))
+    pause = int(RETENTION.get("delete_pause_ms", 10)) / 1000
     with get_conn() as conn:
-        before = conn.execute("SELECT COUNT(*) FROM audit_events").fetchone()[0]
-        conn.execute(
-            """
-            DELETE FROM audit_events
-            WHERE created_at < datetime('now', ?)
-            """,
-            (f"-{days} day",),
-        )
-        after = conn.execute("SELECT COUNT(*) FROM audit_events").fetchone()[0]
-
-        before_scan = conn.execute("SELECT COUNT(*) FROM scan_events").fetchone()[0]
-        conn.execute(
-            """
-            DELETE FROM scan_events
-            WHERE created_at < datetime('now', ?)
-            """,
-            (f"-{days} day",),
-        )
-        after_scan = conn.execute("SELECT COUNT(*) FROM scan_events").fetchone()[0]
+        # Fix the cutoff once so every batch applies the same boundary.
+        cutoff = conn.execute("SELECT datetime('now', ?)", (f"-{days} day",)).fetchone()[0]
+    anchor = _audit_chain_anchor(cutoff) if audit_chain.CHAIN_ENABLED else None
 
     return {
-        "audit_deleted": int(before - after),
-        "scan_events_deleted": int(before_scan - after_scan),
+        "audit_deleted": _delete_in_batches("audit_events", cutoff, batch_size, pause, anchor),
+        "scan_events_deleted": _delete_in_batches("scan_events", cutoff, batch_size, pause),
     }
 
 
@@ -70,10 +114,18 @@ def run_retention_cleanup() -> Dict[str, object]:
     audit_days = int(RETENTION["audit_retention_days"])
     file_days = int(RETENTION["file_retention_days"])
     file_report = _cleanup_files(file_days)
-    audit_report = _cleanup_audit(audit_days)
-    return {
+    report: Dict[str, object] = {
         "audit_retention_days": audit_days,
         "file_retention_days": file_days,
         "file_cleanup": file_report,
-        "audit_cleanup": audit_report,
     }
+    if audit_archive.ARCHIVE_ENABLED:
+        # Seal old months before hot-table retention runs so nothing is lost
+        # that the archive is meant to keep.
+        flush_audit_writer()
+        report["audit_archive"] = {
+            **audit_archive.archive_sealed_months(),
+            **audit_archive.prune_archive(),
+        }
+    report["audit_cleanup"] = _cleanup_audit(audit_days)
+    return report
@@ -0,0 +1,197 @@
+"""Priority scheduling and admission control for background jobs.
+
+Jobs belong to one of three classes, served in strict priority order:
+``interactive`` (a reviewer waiting on one upload), ``batch`` (bulk
+submissions) and ``background`` (maintenance work). Within a class, users are
+served round-robin, so one user's 10,000-file batch cannot starve another
+user's upload in the same class. Each class has a bounded queue, and each
+user has a per-class cap. Admission fails fast instead of growing an
+unbounded backlog.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from config_loader import load_system_config
+
+
+SYSTEM_CONFIG = load_system_config()
+SCHEDULER_CONFIG = SYSTEM_CONFIG.get("jobs", {}).get("scheduler", {})
+PRIORITY_CLASSES: Tuple[str, ...] = ("interactive", "batch", "background")
+DEFAULT_CLASS_CAPACITY = {"interactive": 100, "batch": 10000, "background": 1000}
+CLASS_CAPACITY: Dict[str, int] = {
+    name: int(SCHEDULER_CONFIG.get("queue_size", {}).get(name, DEFAULT_CLASS_CAPACITY[name]))
+    for name in PRIORITY_CLASSES
+}
+MAX_QUEUED_PER_USER = int(SCHEDULER_CONFIG.get("max_queued_per_user", 5000))
+# Queue-wait histogram bucket upper bounds, in seconds.
+WAIT_BUCKETS: Tuple[float, ...] = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+class SchedulerFull(Exception):
+    """Raised when a class queue, or a user's share of it, is full."""
+
+    def __init__(self, message: str, priority: str) -> None:
+        super().__init__(message)
+        self.priority = priority
+
+
+class WaitHistogram:
+    """Cumulative-bucket histogram of queue wait times (Prometheus layout)."""
+
+    def __init__(self, buckets: Tuple[float, ...] = WAIT_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        for index, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[index] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum_seconds": round(self.total, 6),
+            "buckets": {str(bound): hits for bound, hits in zip(self.buckets, self.counts)},
+        }
+
+
+class PriorityScheduler:
+    """Blocking queue: strict priority across classes, round-robin across users."""
+
+    def __init__(
+        self,
+        capacity: Optional[Dict[str, int]] = None,
+        max_per_user: int = MAX_QUEUED_PER_USER,
+    ) -> None:
+        self.capacity = dict(capacity or CLASS_CAPACITY)
+        self.max_per_user = max_per_user
+        self._cond = threading.Condition()
+        # class -> user -> queued (enqueued_at, item); OrderedDict order is the
+        # round-robin rotation.
+        self._queues: Dict[str, "OrderedDict[str, Deque[Tuple[float, Any]]]"] = {
+            name: OrderedDict() for name in PRIORITY_CLASSES
+        }
+        self._sizes = {name: 0 for name in PRIORITY_CLASSES}
+        self._closed = False
+        self.wait_histograms = {name: WaitHistogram() for name in PRIORITY_CLASSES}
+
+    def check_admission(self, priority: str, user: str) -> None:
+        """Raise ``SchedulerFull`` if ``put_nowait`` would currently be refused."""
+        with self._cond:
+            self._check(priority, user)
+
+    def _check(self, priority: str, user: str) -> None:
+        if priority not in self._queues:
+            raise ValueError(f"Unknown priority class: {priority}")
+        if self._sizes[priority] >= self.capacity[priority]:
+            raise SchedulerFull(f"The {priority} queue is full; retry shortly", priority)
+        pending = self._queues[priority].get(user)
+        if pending is not None and len(pending) >= self.max_per_user:
+            raise SchedulerFull(f"Too many queued {priority} jobs for {user}; retry shortly", priority)
+
+    def put_nowait(self, item: Any, priority: str, user: str) -> None:
+        with self._cond:
+            self._check(priority, user)
+            self._queues[priority].setdefault(user, deque()).append((time.perf_counter(), item))
+            self._sizes[priority] += 1
+            self._cond.notify()
+
+    def get(self) -> Optional[Tuple[Any, str, float]]:
+        """Block for the next item; return ``(item, priority, wait_seconds)``.
+
+        Returns None once the scheduler is closed and drained.
+        """
+        with self._cond:
+            while True:
+                for priority in PRIORITY_CLASSES:
+                    users = self._queues[priority]
+                    if not users:
+                        continue
+                    user, pending = next(iter(users.items()))
+                    enqueued_at, item = pending.popleft()
+                    if pending:
+                        users.move_to_end(user)
+                    else:
+                        del users[user]
+                    self._sizes[priority] -= 1
+                    waited = time.perf_counter() - enqueued_at
+                    self.wait_histograms[priority].observe(waited)
+                    return item, priority, waited
+                if self._closed:
+                    return None
+                self._cond.wait()
+
+    def close(self, discard: bool = False) -> List[Any]:
+        """Stop accepting work and wake consumers once the queue is empty.
+
+        With ``discard``, queued items are removed and returned instead of
+        being served.
+        """
+        with self._cond:
+            self._closed = True
+            dropped: List[Any] = []
+            if discard:
+                for priority in PRIORITY_CLASSES:
+                    for pending in self._queues[priority].values():
+                        dropped.extend(item for _, item in pending)
+                    self._queues[priority].clear()
+                    self._sizes[priority] = 0
+            self._cond.notify_all()
+            return dropped
+
+    def remove(self, match: Callable[[Any], bool]) -> List[Any]:
+        """Remove and return the queued items for which ``match`` is true."""
+        removed: List[Any] = []
+        with self._cond:
+            for priority in PRIORITY_CLASSES:
+                users = self._queues[priority]
+                for user in list(users):
+                    kept: Deque[Tuple[float, Any]] = deque()
+                    for entry in users[user]:
+                        (removed if match(entry[1]) else kept).append(entry)
+                    if kept:
+                        users[user] = kept
+                    else:
+                        del users[user]
+                self._sizes[priority] = sum(len(pending) for pending in users.values())
+        return [item for _, item in removed]
+
+    def depth(self, priority: Optional[str] = None) -> int:
+        with self._cond:
+            if priority is not None:
+                return self._sizes[priority]
+            return sum(self._sizes.values())
+
+    def ahead_of(self, priority: str) -> int:
+        """Items that would be served before a new ``priority`` submission."""
+        with self._cond:
+            classes: List[str] = list(PRIORITY_CLASSES[: PRIORITY_CLASSES.index(priority) + 1])
+            return sum(self._sizes[name] for name in classes)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._cond:
+            return {
+                name: {
+                    "queued": self._sizes[name],
+                    "capacity": self.capacity[name],
+                    "users": len(self._queues[name]),
+                    "queue_wait": self.wait_histograms[name].snapshot(),
+                }
+                for name in PRIORITY_CLASSES
+            }
+
+
+def retry_after_seconds(backlog: int, avg_service_seconds: float, workers: int) -> int:
+    """Rough time until ``backlog`` jobs drain through ``workers`` workers."""
+    estimate = backlog * max(avg_service_seconds, 0.1) / max(1, workers)
+    return max(1, min(300, math.ceil(estimate)))
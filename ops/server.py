@@ -0,0 +1,411 @@
+"""Production serving for the web dashboard: ``python main.py serve``.
+
+The parent process warms up once before forking. It parses configs, compiles
+the detection patterns, resolves the Tesseract path, verifies the database
+schema and imports the Flask app, so every worker starts ready to serve.
+Gunicorn is used when it is installed. Otherwise a built-in pre-fork server
+takes over:
+
+* the parent binds one listening socket and forks ``workers`` children;
+* each child serves it with a fixed pool of ``threads`` handler threads;
+* a child stops accepting after about ``max_requests`` requests, which
+  bounds memory growth. It tells the parent at once, so a replacement starts
+  while the old child is still draining;
+* SIGHUP replaces every worker one at a time (graceful reload); SIGTERM or
+  SIGINT stops the workers.
+
+A stopping child ends its event streams, which reconnect to another worker,
+and hands its queued jobs back to the shared job queue for other workers to
+claim. In-flight requests and running jobs then get ``graceful_timeout``
+seconds; connections still open after that are closed. Under gunicorn,
+streams end at ``dashboard.stream_max_seconds`` or when the worker is killed.
+
+Systems without ``os.fork`` (Windows) run a single threaded process.
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import select
+import signal
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Set
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+from config_loader import load_detection_config, load_risk_policy, load_system_config, rules_version
+
+
+SYSTEM_CONFIG = load_system_config()
+SERVER_CONFIG = SYSTEM_CONFIG.get("server", {})
+DEFAULTS: Dict[str, Any] = {
+    "host": SERVER_CONFIG.get("host", "127.0.0.1"),
+    "port": int(SERVER_CONFIG.get("port", 5000)),
+    "workers": int(SERVER_CONFIG.get("workers", 2)),
+    "threads": int(SERVER_CONFIG.get("threads", 16)),
+    "max_requests": int(SERVER_CONFIG.get("max_requests", 1000)),
+    "max_requests_jitter": int(SERVER_CONFIG.get("max_requests_jitter", 100)),
+    "graceful_timeout": float(SERVER_CONFIG.get("graceful_timeout", 30)),
+    "backend": SERVER_CONFIG.get("backend", "auto"),
+}
+
+WSGIApp = Callable[..., Any]
+
+
+def warm_up() -> WSGIApp:
+    """Load everything workers would otherwise load lazily; return the Flask app."""
+    load_detection_config()
+    load_risk_policy()
+    rules_version()
+    from detection import detect_sensitive_data
+    from extraction import _configure_tesseract_cmd
+    from storage.db import init_db
+
+    # First calls compile and cache the regex patterns.
+    detect_sensitive_data("warm-up 0712345678 warm@example.com")
+    _configure_tesseract_cmd()
+    init_db()
+    from app import app
+
+    return app
+
+
+def _release_queued_jobs() -> None:
+    from ops.jobs import release_queued_jobs
+
+    release_queued_jobs()
+
+
+def _close_event_streams() -> None:
+    from ops.dashboard_feed import close_event_streams
+
+    close_event_streams()
+
+
+def _drain_background_work(timeout: float) -> None:
+    from ops.jobs import shutdown_job_runner
+    from storage.audit_repo import flush_audit_writer
+    from storage.db import close_thread_conns
+
+    shutdown_job_runner(timeout)
+    flush_audit_writer()
+    close_thread_conns()
+
+
+class _RequestHandler(WSGIRequestHandler):
+    # One request per connection: an idle keep-alive client would otherwise
+    # hold one of the worker's fixed handler threads.
+    protocol_version = "HTTP/1.0"
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Werkzeug server that hands connections to a fixed-size thread pool."""
+
+    multithread = True
+
+    def __init__(self, host: str, port: int, app: WSGIApp, threads: int, fd: Optional[int] = None) -> None:
+        super().__init__(host, port, app, handler=_RequestHandler, fd=fd)
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="http")
+        # Accepted connections not yet finished, queued or in progress.
+        self._connections: Set[socket.socket] = set()
+        self._idle = threading.Condition()
+
+    def process_request(self, request, client_address) -> None:
+        with self._idle:
+            self._connections.add(request)
+        self._pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address) -> None:
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            with self._idle:
+                self._connections.discard(request)
+                self._idle.notify_all()
+
+    def drain(self, timeout: float) -> bool:
+        """After ``serve_forever`` returns, wait up to ``timeout`` seconds for open connections.
+
+        Connections still open then (event streams, stuck clients) are shut
+        down, so their handlers fail on the next write. Returns True if
+        every connection finished in time.
+        """
+        self._pool.shutdown(wait=False)
+        deadline = time.monotonic() + timeout
+        with self._idle:
+            while self._connections:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._idle.wait(remaining)
+            leftover = list(self._connections)
+        for request in leftover:
+            try:
+                request.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        return not leftover
+
+
+def _serve_worker(app: WSGIApp, fd: int, options: Dict[str, Any], notify_fd: Optional[int] = None) -> None:
+    """Child process body: serve until told to stop or the request budget is spent.
+
+    Once it stops accepting, the child writes to ``notify_fd`` so the parent
+    can start its replacement straight away, then drains for at most
+    ``graceful_timeout`` seconds.
+    """
+    server = PooledWSGIServer(options["host"], options["port"], app, options["threads"], fd=fd)
+    budget = options["max_requests"]
+    if budget:
+        budget += random.randint(0, options["max_requests_jitter"])
+    served = 0
+    stopping = threading.Event()
+    lock = threading.Lock()
+
+    def stop(*_: Any) -> None:
+        if not stopping.is_set():
+            stopping.set()
+            # shutdown() blocks until serve_forever returns, so call it off-thread.
+            threading.Thread(target=server.shutdown, daemon=True).start()
+
+    def counted(environ, start_response):
+        nonlocal served
+        with lock:
+            served += 1
+            spent = budget and served >= budget
+        if spent:
+            stop()
+        return app(environ, start_response)
+
+    server.app = counted
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    server.serve_forever(poll_interval=0.2)
+    deadline = time.monotonic() + options["graceful_timeout"]
+    if notify_fd is not None:
+        try:
+            os.write(notify_fd, b"x")
+        except OSError:
+            pass  # the parent already knows (reload) or has gone
+        os.close(notify_fd)
+    _close_event_streams()
+    _release_queued_jobs()
+    server.drain(options["graceful_timeout"])
+    _drain_background_work(max(0.0, deadline - time.monotonic()))
+
+
+class PreforkServer:
+    """Parent process: owns the socket, keeps ``workers`` children alive."""
+
+    def __init__(self, app: WSGIApp, **options: Any) -> None:
+        self.app = app
+        self.options = {**DEFAULTS, **{key: value for key, value in options.items() if value is not None}}
+        self.children: Dict[int, float] = {}
+        # Children that stopped accepting and are draining: pid -> since.
+        self.retiring: Dict[int, float] = {}
+        # Read end of each accepting child's "stopped accepting" pipe.
+        self._notify: Dict[int, int] = {}
+        self._stopping = False
+        self._reload = False
+
+    def _spawn(self, sock: socket.socket) -> int:
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                os.close(read_fd)
+                for fd in self._notify.values():
+                    os.close(fd)
+                _serve_worker(self.app, sock.fileno(), self.options, write_fd)
+            except BaseException:
+                import traceback
+
+                traceback.print_exc()
+                code = 1
+            finally:
+                os._exit(code)
+        os.close(write_fd)
+        self.children[pid] = time.monotonic()
+        self._notify[pid] = read_fd
+        return pid
+
+    def _retire(self, pid: int) -> None:
+        self.retiring.setdefault(pid, time.monotonic())
+        fd = self._notify.pop(pid, None)
+        if fd is not None:
+            os.close(fd)
+
+    def _check_retiring(self) -> None:
+        """Note children that stopped accepting (a byte or EOF on their pipe)."""
+        if self._notify:
+            ready, _, _ = select.select(list(self._notify.values()), [], [], 0)
+            for pid, fd in list(self._notify.items()):
+                if fd in ready:
+                    self._retire(pid)
+        # Children enforce graceful_timeout themselves; this is a backstop.
+        limit = self.options["graceful_timeout"] + 10
+        for pid, since in list(self.retiring.items()):
+            if time.monotonic() - since > limit:
+                self._signal(pid, signal.SIGKILL)
+
+    def _accepting(self) -> int:
+        return len(self.children) - len(self.retiring)
+
+    def _reap(self) -> int:
+        exited = 0
+        while self.children:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                for pid in list(self.children):
+                    self._forget(pid)
+                break
+            if pid == 0:
+                break
+            self._forget(pid)
+            exited += 1
+        return exited
+
+    def _forget(self, pid: int) -> None:
+        self.children.pop(pid, None)
+        self.retiring.pop(pid, None)
+        fd = self._notify.pop(pid, None)
+        if fd is not None:
+            os.close(fd)
+
+    def _on_stop(self, *_: Any) -> None:
+        self._stopping = True
+
+    def _on_reload(self, *_: Any) -> None:
+        self._reload = True
+
+    def run(self) -> int:
+        sock = socket.create_server((self.options["host"], self.options["port"]), backlog=1024)
+        sock.set_inheritable(True)
+        host, port = sock.getsockname()[:2]
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_reload)
+        for _ in range(self.options["workers"]):
+            self._spawn(sock)
+        print(
+            f"Serving on http://{host}:{port} with {self.options['workers']} workers x "
+            f"{self.options['threads']} threads (pid {os.getpid()})",
+            file=sys.stderr,
+            flush=True,
+        )
+        try:
+            while not self._stopping:
+                self._reap()
+                self._check_retiring()
+                if self._reload:
+                    self._reload = False
+                    self._rolling_restart(sock)
+                # Replace workers that stopped accepting (recycling) or crashed,
+                # without waiting for draining ones to exit.
+                while self._accepting() < self.options["workers"] and not self._stopping:
+                    self._spawn(sock)
+                time.sleep(0.2)
+        finally:
+            self._shutdown()
+            sock.close()
+        return 0
+
+    def _rolling_restart(self, sock: socket.socket) -> None:
+        for old_pid in [pid for pid in self.children if pid not in self.retiring]:
+            self._spawn(sock)
+            self._retire(old_pid)
+            self._signal(old_pid, signal.SIGTERM)
+        print("Reloaded workers", file=sys.stderr, flush=True)
+
+    def _signal(self, pid: int, signum: int) -> None:
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            self._forget(pid)
+
+    def _shutdown(self) -> None:
+        for pid in list(self.children):
+            self._signal(pid, signal.SIGTERM)
+        # Children drain for graceful_timeout; allow a little for their exit.
+        deadline = time.monotonic() + self.options["graceful_timeout"] + 5
+        while self.children and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.05)
+        for pid in list(self.children):
+            self._signal(pid, signal.SIGKILL)
+        while self.children:
+            self._reap()
+            time.sleep(0.05)
+
+
+def _serve_gunicorn(app: WSGIApp, options: Dict[str, Any]) -> int:
+    from gunicorn.app.base import BaseApplication
+
+    class _Application(BaseApplication):
+        def load_config(self) -> None:
+            settings = {
+                "bind": f"{options['host']}:{options['port']}",
+                "workers": options["workers"],
+                "threads": options["threads"],
+                "worker_class": "gthread",
+                "max_requests": options["max_requests"],
+                "max_requests_jitter": options["max_requests_jitter"],
+                "graceful_timeout": options["graceful_timeout"],
+                # The app is already imported and warm; workers fork from it.
+                "preload_app": True,
+                "worker_exit": lambda server, worker: _drain_background_work(
+                    options["graceful_timeout"]
+                ),
+            }
+            for key, value in settings.items():
+                self.cfg.set(key, value)
+
+        def load(self) -> WSGIApp:
+            return app
+
+    _Application().run()
+    return 0
+
+
+def _gunicorn_available() -> bool:
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def serve(**options: Any) -> int:
+    """Warm up, then serve with gunicorn, the pre-fork server or a single process."""
+    settings = {**DEFAULTS, **{key: value for key, value in options.items() if value is not None}}
+    backend = settings["backend"]
+    if backend not in {"auto", "gunicorn", "builtin"}:
+        raise ValueError("backend must be auto, gunicorn or builtin")
+    if backend == "gunicorn" and not _gunicorn_available():
+        raise RuntimeError("gunicorn is not installed; use --backend builtin")
+    app = warm_up()
+    if backend == "gunicorn" or (backend == "auto" and _gunicorn_available()):
+        return _serve_gunicorn(app, settings)
+    if not hasattr(os, "fork"):
+        server = PooledWSGIServer(settings["host"], settings["port"], app, settings["threads"])
+        print(f"Serving on http://{settings['host']}:{settings['port']} (single process)", file=sys.stderr)
+        try:
+            server.serve_forever()
+        finally:
+            _close_event_streams()
+            _release_queued_jobs()
+            server.drain(settings["graceful_timeout"])
+            _drain_background_work(settings["graceful_timeout"])
+        return 0
+    return PreforkServer(app, **settings).run()
@@ -0,0 +1,316 @@
+"""Continuous ingestion of drop folders.
+
+Files landing in watched directories are debounced until their size and
+mtime settle, then handed to a bounded pool of worker threads running the
+regular scan or protection logic. Linux hosts use inotify when the optional
+``inotify_simple`` package is installed; everywhere else a ``scandir``-based
+poller compares cached stat data between passes.
+"""
+
+from __future__ import annotations
+
+import os
+import queue
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from ops.corpus_scan import SUPPORTED_SUFFIXES
+
+try:
+    from inotify_simple import INotify, flags
+except Exception:  # pragma: no cover - optional dependency import path
+    INotify = None
+    flags = None
+
+
+STATUS_INTERVAL_SECONDS = 10.0
+
+
+class _PollingSource:
+    """Detect new/changed files by comparing stat snapshots between passes."""
+
+    def __init__(self, directories: List[Path], interval: float) -> None:
+        self.directories = directories
+        self.interval = interval
+        self._last_poll = 0.0
+        # Files already present at startup are not treated as new arrivals.
+        self._snapshot: Dict[str, Tuple[int, int]] = self._take_snapshot()
+
+    def _take_snapshot(self) -> Dict[str, Tuple[int, int]]:
+        snapshot: Dict[str, Tuple[int, int]] = {}
+        stack = [str(d) for d in self.directories]
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            stat = entry.stat(follow_symlinks=False)
+                            snapshot[entry.path] = (stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                continue
+        return snapshot
+
+    def read(self, timeout: float) -> List[Path]:
+        wait = self._last_poll + self.interval - time.monotonic()
+        if wait > 0:
+            time.sleep(min(wait, timeout))
+            if self._last_poll + self.interval > time.monotonic():
+                return []
+        self._last_poll = time.monotonic()
+        current = self._take_snapshot()
+        changed = [
+            Path(path)
+            for path, signature in current.items()
+            if self._snapshot.get(path) != signature
+        ]
+        self._snapshot = current
+        return changed
+
+    def close(self) -> None:
+        return None
+
+
+class _InotifySource:
+    """Translate inotify events into changed file paths, watching subdirectories too."""
+
+    def __init__(self, directories: List[Path]) -> None:
+        self._inotify = INotify()
+        self._mask = flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE | flags.MODIFY
+        self._dirs: Dict[int, Path] = {}
+        # Files already present at startup are not treated as new arrivals.
+        for directory in directories:
+            self._add_tree(directory)
+
+    def _add_tree(self, root: Path) -> List[Path]:
+        """Watch ``root`` and every directory below it; return the files inside.
+
+        Each directory is watched before it is listed, so a file written while
+        the tree is walked shows up in the listing, an event, or both.
+        """
+        files: List[Path] = []
+        stack = [str(root)]
+        while stack:
+            current = stack.pop()
+            try:
+                wd = self._inotify.add_watch(current, self._mask)
+                self._dirs[wd] = Path(current)
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            files.append(Path(entry.path))
+            except OSError:
+                continue
+        return files
+
+    def read(self, timeout: float) -> List[Path]:
+        changed: List[Path] = []
+        for event in self._inotify.read(timeout=int(timeout * 1000)):
+            parent = self._dirs.get(event.wd)
+            if parent is None or not event.name:
+                continue
+            path = parent / event.name
+            if event.mask & flags.ISDIR:
+                if event.mask & (flags.CREATE | flags.MOVED_TO):
+                    # A directory moved in arrives with its files and no
+                    # events for them; a new one may fill before it is watched.
+                    changed.extend(self._add_tree(path))
+                continue
+            changed.append(path)
+        return changed
+
+    def close(self) -> None:
+        self._inotify.close()
+
+
+class DropFolderWatcher:
+    """Debounce file arrivals and process them on a bounded worker pool."""
+
+    def __init__(
+        self,
+        directories: Iterable[Path],
+        handler: Callable[[Path], object],
+        workers: int = 2,
+        queue_size: int = 100,
+        debounce_seconds: float = 2.0,
+        poll_interval: float = 1.0,
+        use_inotify: bool = True,
+        ignore_dirs: Iterable[Path] = (),
+    ) -> None:
+        self.directories = [Path(d) for d in directories]
+        for directory in self.directories:
+            if not directory.is_dir():
+                raise ValueError(f"Watch path is not a directory: {directory}")
+        self.handler = handler
+        # Outputs written inside a watched folder must not be picked up again.
+        self.ignore_dirs = [Path(d).resolve() for d in ignore_dirs]
+        self.workers = max(1, workers)
+        self.debounce_seconds = debounce_seconds
+        self.poll_interval = poll_interval
+        if use_inotify and INotify is not None:
+            self.source = _InotifySource(self.directories)
+            self.backend = "inotify"
+        else:
+            self.source = _PollingSource(self.directories, poll_interval)
+            self.backend = "polling"
+
+        self._queue: "queue.Queue[Optional[Tuple[Path, float]]]" = queue.Queue(maxsize=queue_size)
+        # path -> (first_seen, last_change, (size, mtime_ns))
+        self._pending: Dict[Path, Tuple[float, float, Tuple[int, int]]] = {}
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._dropped: List[Path] = []
+        self._processed = 0
+        self._failed = 0
+        self._last_lag = 0.0
+        self._total_lag = 0.0
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            processed = self._processed
+            return {
+                "backend": self.backend,
+                "queue_depth": self._queue.qsize(),
+                "debouncing": len(self._pending),
+                "processed": processed,
+                "failed": self._failed,
+                "dropped": len(self._dropped),
+                "last_lag_seconds": round(self._last_lag, 3),
+                "avg_lag_seconds": round(self._total_lag / processed, 3) if processed else 0.0,
+            }
+
+    def _is_candidate(self, path: Path) -> bool:
+        if path.name.startswith(".") or path.suffix.lower() not in SUPPORTED_SUFFIXES:
+            return False
+        resolved = path.resolve()
+        return not any(resolved.is_relative_to(ignored) for ignored in self.ignore_dirs)
+
+    def _worker(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            path, first_seen = item
+            if self._stop.is_set():
+                with self._lock:
+                    self._dropped.append(path)
+                continue
+            failed = False
+            try:
+                self.handler(path)
+            except Exception as exc:
+                failed = True
+                print(f"[watch] failed {path}: {exc}", file=sys.stderr, flush=True)
+            lag = time.monotonic() - first_seen
+            with self._lock:
+                self._processed += 1
+                self._failed += int(failed)
+                self._last_lag = lag
+                self._total_lag += lag
+
+    def _note_changes(self, paths: List[Path]) -> None:
+        now = time.monotonic()
+        for path in paths:
+            if not self._is_candidate(path):
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                self._pending.pop(path, None)
+                continue
+            signature = (stat.st_size, stat.st_mtime_ns)
+            first_seen = self._pending.get(path, (now, now, signature))[0]
+            self._pending[path] = (first_seen, now, signature)
+
+    def _dispatch_settled(self) -> None:
+        if self._stop.is_set():
+            return
+        now = time.monotonic()
+        for path, (first_seen, last_change, signature) in list(self._pending.items()):
+            if now - last_change < self.debounce_seconds:
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                del self._pending[path]
+                continue
+            current = (stat.st_size, stat.st_mtime_ns)
+            if current != signature:
+                # Still being written without emitting events (e.g. network shares).
+                self._pending[path] = (first_seen, now, current)
+                continue
+            try:
+                self._queue.put_nowait((path, first_seen))
+            except queue.Full:
+                # Back-pressure: keep it pending until a worker frees a slot.
+                return
+            del self._pending[path]
+
+    def start(self) -> None:
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"watch-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def run_once(self, timeout: float = 0.5) -> None:
+        self._note_changes(self.source.read(timeout))
+        self._dispatch_settled()
+
+    def run_forever(self, status: Optional[Callable[[Dict[str, object]], None]] = None) -> None:
+        self.start()
+        last_status = time.monotonic()
+        try:
+            while not self._stop.is_set():
+                self.run_once(timeout=min(0.5, self.debounce_seconds))
+                if status and time.monotonic() - last_status >= STATUS_INTERVAL_SECONDS:
+                    status(self.stats())
+                    last_status = time.monotonic()
+        finally:
+            self.stop()
+
+    def request_stop(self) -> None:
+        """Ask ``run_forever`` to exit after the current pass (signal-safe)."""
+        self._stop.set()
+
+    def stop(self) -> List[Path]:
+        """Stop once the files being handled are done; return unprocessed files.
+
+        Queued and still-debouncing files are dropped rather than drained, so
+        shutdown waits for at most one file per worker.
+        """
+        self._stop.set()
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self.source.close()
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                self._dropped.append(item[0])
+        with self._lock:
+            self._dropped.extend(self._pending)
+            self._pending.clear()
+            return list(self._dropped)
+
+
+def print_watch_status(stats: Dict[str, object]) -> None:
+    print(
+        f"[watch] queue={stats['queue_depth']} debouncing={stats['debouncing']} "
+        f"processed={stats['processed']} failed={stats['failed']} dropped={stats['dropped']} "
+        f"lag={stats['last_lag_seconds']}s avg_lag={stats['avg_lag_seconds']}s",
+        file=sys.stderr,
+        flush=True,
+    )
@@ -1,4 +1,4 @@
-"""Build pilot evidence pack from KPI reports, docs, and audit export."""
+"""Build pilot evidence pack from KPI reports, docs, and the audit export chain."""
 
 from __future__ import annotations
 
@@ -7,7 +7,7 @@ import shutil
 from datetime import datetime
 from pathlib import Path
 
-from ops.audit_export import export_signed_audit
+from ops.audit_segments import CHAIN_DIR, export_audit_segment
 
 
 BASE_DIR = Path(__file__).resolve().parents[1]
@@ -34,18 +34,23 @@ def build_pack() -> dict:
         shutil.copy2(compliance_doc, target)
         copied_docs.append(compliance_doc.name)
 
-    export_result = export_signed_audit(limit=5000)
-    audit_export = Path(export_result["export_file"])
-    audit_sig = Path(export_result["signature_file"])
-    shutil.copy2(audit_export, pack_dir / audit_export.name)
-    shutil.copy2(audit_sig, pack_dir / audit_sig.name)
+    # Only events since the previous pack are serialized; earlier segments
+    # are already signed and are copied as-is.
+    export_result = export_audit_segment()
+    chain_target = pack_dir / "audit_chain"
+    shutil.copytree(CHAIN_DIR, chain_target, ignore=shutil.ignore_patterns(".*"))
 
     manifest = {
         "generated_at": datetime.utcnow().isoformat() + "Z",
         "reports": copied_reports,
         "docs": copied_docs,
-        "audit_export": audit_export.name,
-        "audit_signature": audit_sig.name,
+        "audit_chain": {
+            "directory": chain_target.name,
+            "segments": export_result["sequence"],
+            "last_id": export_result["last_id"],
+            "head_digest": export_result["digest"],
+            "new_events": export_result["event_count"],
+        },
     }
     manifest_path = pack_dir / "manifest.json"
     manifest_path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
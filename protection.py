@@ -9,6 +9,8 @@ from typing import Dict, List, Set
 
 from cryptography.fernet import Fernet, InvalidToken
 
+from metrics import stage
+
 
 def generate_encryption_key() -> bytes:
     """Generate a secure symmetric key."""
@@ -33,9 +35,10 @@ def load_encryption_key(key_path: Path) -> bytes:
 
 def encrypt_text(text: str, key: bytes) -> str:
     """Encrypt plain text and return a URL-safe token."""
-    fernet = Fernet(key)
-    encrypted = fernet.encrypt(text.encode("utf-8"))
-    return encrypted.decode("utf-8")
+    with stage("encrypt"):
+        fernet = Fernet(key)
+        encrypted = fernet.encrypt(text.encode("utf-8"))
+        return encrypted.decode("utf-8")
 
 
 def decrypt_text(token: str, key: bytes) -> str:
@@ -57,10 +60,11 @@ def _collect_unique_values(findings: Dict[str, List[dict]]) -> Set[str]:
 
 def redact_text(text: str, findings: Dict[str, List[dict]]) -> str:
     """Replace detected sensitive values with a fixed redaction token."""
-    output = text
-    for value in sorted(_collect_unique_values(findings), key=len, reverse=True):
-        output = output.replace(value, "[REDACTED]")
-    return output
+    with stage("redact"):
+        output = text
+        for value in sorted(_collect_unique_values(findings), key=len, reverse=True):
+            output = output.replace(value, "[REDACTED]")
+        return output
 
 
 def mask_value(value: str) -> str:
@@ -72,10 +76,11 @@ def mask_value(value: str) -> str:
 
 def mask_text(text: str, findings: Dict[str, List[dict]]) -> str:
     """Mask sensitive values in text while preserving some structure."""
-    output = text
-    for value in sorted(_collect_unique_values(findings), key=len, reverse=True):
-        output = output.replace(value, mask_value(value))
-    return output
+    with stage("mask"):
+        output = text
+        for value in sorted(_collect_unique_values(findings), key=len, reverse=True):
+            output = output.replace(value, mask_value(value))
+        return output
 
 
 def validate_encrypted_token(token: str) -> bool:
@@ -91,6 +96,13 @@ def verify_redaction_quality(
     original_findings: Dict[str, List[dict]], protected_text: str
 ) -> Dict[str, object]:
     """Verify whether protected output still contains original sensitive values."""
+    with stage("verify_redaction"):
+        return _verify_redaction_quality(original_findings, protected_text)
+
+
+def _verify_redaction_quality(
+    original_findings: Dict[str, List[dict]], protected_text: str
+) -> Dict[str, object]:
     leaked = []
     for data_type, entries in original_findings.items():
         for entry in entries:
@@ -0,0 +1,169 @@
+"""Streaming redaction for log pipelines.
+
+Applies the detection patterns with ``redact_text``/``mask_text`` semantics to
+an unbounded byte stream, e.g. ``tail -F app.log | python main.py
+redact-stream``. Input is consumed in whatever chunks the pipe delivers, every
+complete line in a chunk is rewritten with one pass of a precompiled pattern,
+and output is flushed before blocking on the next read so latency stays
+bounded without a syscall per line. Audit events are aggregated per interval
+instead of per line.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import BinaryIO, Callable, Dict, Optional
+
+from detection import COMBINED_PATTERN, COMBINED_PATTERN_ORDER, PREFILTER_PATTERN
+from protection import mask_value
+from storage.audit_repo import log_audit_event
+
+
+REDACTION_TOKEN = "[REDACTED]"
+CHUNK_SIZE = 64 * 1024
+# Partial lines longer than this are emitted without waiting for a newline.
+MAX_PENDING_BYTES = 1024 * 1024
+
+
+def _redact(match) -> str:
+    return REDACTION_TOKEN
+
+
+def _mask(match) -> str:
+    return mask_value(match.group(0))
+
+
+class LineRedactor:
+    """Rewrite sensitive values in text using the combined detection pattern.
+
+    The redactor holds no per-call state, so one instance can be shared
+    between threads. Callers that want counts of rewritten values per finding
+    type pass their own ``counts`` dict to ``rewrite``/``apply``.
+    """
+
+    def __init__(self, action: str = "redact") -> None:
+        if action not in {"redact", "mask"}:
+            raise ValueError(f"Unsupported stream action: {action}")
+        self.action = action
+        self._sub = COMBINED_PATTERN.sub
+        self._replace = _redact if action == "redact" else _mask
+
+    def rewrite(self, text: str, counts: Optional[Dict[str, int]] = None) -> str:
+        """Rewrite ``text`` without prefiltering (caller already checked it)."""
+        if counts is None:
+            return self._sub(self._replace, text)
+        replace = self._replace
+
+        def _counted(match) -> str:
+            counts[match.lastgroup] = counts.get(match.lastgroup, 0) + 1
+            return replace(match)
+
+        return self._sub(_counted, text)
+
+    def apply(self, text: str, counts: Optional[Dict[str, int]] = None) -> str:
+        """Rewrite ``text``; multi-line input is handled line by line.
+
+        The combined pattern only runs on lines containing a prefilter hit,
+        which keeps clean log lines on the fast path.
+        """
+        if PREFILTER_PATTERN is None:
+            return self.rewrite(text, counts)
+        parts = []
+        pos = 0
+        for hit in PREFILTER_PATTERN.finditer(text):
+            if hit.start() < pos:
+                continue
+            line_start = text.rfind("\n", 0, hit.start()) + 1
+            line_end = text.find("\n", hit.end())
+            if line_end < 0:
+                line_end = len(text)
+            parts.append(text[pos:line_start])
+            parts.append(self.rewrite(text[line_start:line_end], counts))
+            pos = line_end
+        if not parts:
+            return text
+        parts.append(text[pos:])
+        return "".join(parts)
+
+
+def _log_stream_audit(details: Dict[str, object]) -> None:
+    log_audit_event(event_type="redact_stream", actor="cli-user", source="cli", details=details)
+
+
+def redact_stream(
+    source: BinaryIO,
+    sink: BinaryIO,
+    action: str = "redact",
+    audit_interval: float = 60.0,
+    emit: Optional[Callable[[Dict[str, object]], None]] = _log_stream_audit,
+) -> Dict[str, object]:
+    """Copy ``source`` to ``sink`` with sensitive values redacted or masked.
+
+    Bytes are decoded with ``surrogateescape`` so non-UTF-8 log lines pass
+    through unchanged apart from the rewritten values. One audit event is
+    emitted per ``audit_interval`` seconds of activity, plus a final one when
+    the stream ends.
+    """
+    redactor = LineRedactor(action)
+    counts: Dict[str, int] = {key: 0 for key in COMBINED_PATTERN_ORDER}
+    read = getattr(source, "read1", source.read)
+    totals = {"lines": 0, "bytes_in": 0}
+    window = {"lines": 0, "counts": dict(counts), "started": time.time()}
+    last_emit = time.monotonic()
+
+    def _process(data: bytes) -> None:
+        text = data.decode("utf-8", "surrogateescape")
+        sink.write(redactor.apply(text, counts).encode("utf-8", "surrogateescape"))
+
+    def _emit_window() -> None:
+        if emit is None or window["lines"] == 0:
+            return
+        emit(
+            {
+                "action": action,
+                "window_start": window["started"],
+                "window_end": time.time(),
+                "lines": window["lines"],
+                "values_rewritten": {
+                    key: counts[key] - window["counts"][key] for key in counts
+                },
+            }
+        )
+        window.update({"lines": 0, "counts": dict(counts), "started": time.time()})
+
+    pending = b""
+    try:
+        while True:
+            chunk = read(CHUNK_SIZE)
+            if not chunk:
+                break
+            totals["bytes_in"] += len(chunk)
+            data = pending + chunk
+            cut = data.rfind(b"\n")
+            if cut < 0:
+                pending = data
+                if len(pending) > MAX_PENDING_BYTES:
+                    _process(pending)
+                    pending = b""
+                    sink.flush()
+                continue
+            complete, pending = data[: cut + 1], data[cut + 1 :]
+            line_count = complete.count(b"\n")
+            totals["lines"] += line_count
+            window["lines"] += line_count
+            _process(complete)
+            sink.flush()
+
+            now = time.monotonic()
+            if now - last_emit >= audit_interval:
+                _emit_window()
+                last_emit = now
+        if pending:
+            totals["lines"] += 1
+            window["lines"] += 1
+            _process(pending)
+            sink.flush()
+    finally:
+        _emit_window()
+
+    return {"action": action, **totals, "values_rewritten": dict(counts)}
@@ -18,14 +18,16 @@ USERS = AUTH_CONFIG.get("users", {})
 
 ROLE_PERMISSIONS: Dict[str, Set[str]] = {
     "reviewer": {"scan", "verify", "view_dashboard"},
-    "officer": {"scan", "verify", "protect", "view_dashboard"},
+    "officer": {"scan", "verify", "protect", "view_dashboard", "view_audit"},
     "admin": {
         "scan",
         "verify",
         "protect",
         "view_dashboard",
+        "view_audit",
         "admin_export",
         "admin_cleanup",
+        "view_metrics",
     },
 }
 
@@ -61,7 +63,7 @@ def require_login(view: Callable):
     def wrapper(*args, **kwargs):
         user = current_user()
         if not user:
-            if request.path.startswith("/api") or request.path.startswith("/scan") or request.path.startswith("/protect"):
+            if request.path.startswith(("/api", "/scan", "/protect", "/jobs")):
                 return jsonify({"error": "Authentication required"}), 401
             return redirect(url_for("login"))
         return view(*args, **kwargs)
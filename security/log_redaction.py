@@ -0,0 +1,89 @@
+"""In-process PII redaction for Python logging.
+
+``RedactingFilter`` rewrites log records with the same detection patterns and
+``[REDACTED]``/mask semantics as the ``redact-stream`` CLI before any handler
+formats or writes them. Records are checked with the cheap literal prefilter
+first, and the outcome for argument-less messages is cached per format string,
+so clean records cost little more than a dict lookup or a single search.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Dict, Optional
+
+from detection import PREFILTER_PATTERN
+from redaction_stream import LineRedactor
+
+
+MESSAGE_CACHE_SIZE = 4096
+_formatter = logging.Formatter()
+
+
+class RedactingFilter(logging.Filter):
+    """Logging filter that scrubs sensitive values from records in place.
+
+    Attach it to handlers (not loggers) so records propagated from child
+    loggers are covered too. The filter never drops records.
+    """
+
+    def __init__(self, action: str = "redact", name: str = "") -> None:
+        super().__init__(name)
+        self._redactor = LineRedactor(action)
+        self._search = PREFILTER_PATTERN.search if PREFILTER_PATTERN is not None else None
+        # format string -> redacted text, or None when the text is clean
+        self._cache: Dict[str, Optional[str]] = {}
+
+    def _scrub(self, text: str) -> Optional[str]:
+        """Return redacted text, or None when ``text`` holds nothing sensitive."""
+        if self._search is not None and self._search(text) is None:
+            return None
+        redacted = self._redactor.rewrite(text)
+        return None if redacted == text else redacted
+
+    def _scrub_cached(self, text: str) -> Optional[str]:
+        try:
+            return self._cache[text]
+        except KeyError:
+            pass
+        result = self._scrub(text)
+        if len(self._cache) >= MESSAGE_CACHE_SIZE:
+            self._cache.clear()
+        self._cache[text] = result
+        return result
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.args:
+            message = record.getMessage()
+            # Freeze the formatted message so handlers do not format twice.
+            record.msg = self._scrub(message) or message
+            record.args = None
+        elif isinstance(record.msg, str):
+            redacted = self._scrub_cached(record.msg)
+            if redacted is not None:
+                record.msg = redacted
+        else:
+            message = str(record.msg)
+            record.msg = self._scrub(message) or message
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = _formatter.formatException(record.exc_info)
+        if record.exc_text:
+            record.exc_text = self._scrub(record.exc_text) or record.exc_text
+        if record.stack_info:
+            record.stack_info = self._scrub(record.stack_info) or record.stack_info
+        return True
+
+
+def install_redaction_filter(
+    logger: Optional[logging.Logger] = None, action: str = "redact"
+) -> RedactingFilter:
+    """Attach one shared ``RedactingFilter`` to every handler of ``logger``.
+
+    Defaults to the root logger, which covers everything that propagates.
+    """
+    target = logger or logging.getLogger()
+    redacting = RedactingFilter(action)
+    for handler in target.handlers:
+        handler.addFilter(redacting)
+    return redacting
@@ -0,0 +1,380 @@
+"""Monthly cold archive for audit_events.
+
+Complete months older than ``audit.archive.hot_months`` are sealed into one
+gzip-compressed, HMAC-signed JSONL segment per month. Each segment is
+indexed in ``audit_archive_segments`` by id and time range, and its rows are
+then removed from the hot table. Segment rows keep their raw
+``details_json`` and chain hashes, so the hash chain stays verifiable across
+the archive/hot boundary.
+
+Reads go through ``iter_archived_events``, which prunes segments by id and
+time range using the index. ``storage.event_query`` and
+``ops.audit_export`` call it so queries and exports span both tiers.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import hmac
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from config_loader import load_system_config
+from security.keys import get_or_create_signing_key
+from storage.audit_chain import compute_row_hash
+from storage.db import get_conn, init_db
+
+
+SYSTEM_CONFIG = load_system_config()
+ARCHIVE_CONFIG = SYSTEM_CONFIG["audit"].get("archive", {})
+ARCHIVE_ENABLED = bool(ARCHIVE_CONFIG.get("enabled", False))
+ARCHIVE_DIR = Path(ARCHIVE_CONFIG.get("archive_dir", "archive/audit"))
+HOT_MONTHS = int(ARCHIVE_CONFIG.get("hot_months", 1))
+ARCHIVE_RETENTION_DAYS = int(ARCHIVE_CONFIG.get("retention_days", 2555))
+ARCHIVE_FORMAT = "privguard-audit-archive/1"
+SEAL_PAGE_SIZE = 1000
+DELETE_BATCH_SIZE = 5000
+
+_COLUMNS = (
+    "id",
+    "created_at",
+    "event_type",
+    "actor",
+    "source",
+    "details_json",
+    "prev_hash",
+    "row_hash",
+)
+
+
+def _month_start(year: int, month: int) -> datetime:
+    return datetime(year + (month - 1) // 12, (month - 1) % 12 + 1, 1)
+
+
+def _period_bounds(period: str) -> tuple:
+    year, month = (int(part) for part in period.split("-"))
+    return _month_start(year, month), _month_start(year, month + 1)
+
+
+def sealable_before(now: Optional[datetime] = None) -> str:
+    """Timestamp before which every complete month may be sealed."""
+    now = now or datetime.utcnow()
+    return _month_start(now.year, now.month - HOT_MONTHS).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _line(row: tuple) -> bytes:
+    payload = dict(zip(_COLUMNS, row))
+    return json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def list_segments() -> List[Dict[str, object]]:
+    init_db()
+    with get_conn() as conn:
+        rows = conn.execute(
+            """
+            SELECT period, path, first_id, last_id, start_at, end_at, event_count,
+                   last_row_hash, signature
+            FROM audit_archive_segments
+            ORDER BY first_id
+            """
+        ).fetchall()
+    keys = (
+        "period",
+        "path",
+        "first_id",
+        "last_id",
+        "start_at",
+        "end_at",
+        "event_count",
+        "last_row_hash",
+        "signature",
+    )
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def archived_through_id() -> int:
+    """Highest archived id; hot-table reads start above it."""
+    init_db()
+    with get_conn() as conn:
+        value = conn.execute("SELECT MAX(last_id) FROM audit_archive_segments").fetchone()[0]
+    return int(value or 0)
+
+
+def archive_head_hash() -> Optional[str]:
+    """``row_hash`` of the newest archived row; the hot chain continues from it."""
+    init_db()
+    with get_conn() as conn:
+        row = conn.execute(
+            "SELECT last_row_hash FROM audit_archive_segments ORDER BY last_id DESC LIMIT 1"
+        ).fetchone()
+    return row[0] if row else None
+
+
+def _delete_archived_rows(first_id: int, last_id: int) -> int:
+    """Remove archived ids from the hot table in short transactions."""
+    deleted = 0
+    while True:
+        with get_conn() as conn:
+            cursor = conn.execute(
+                """
+                DELETE FROM audit_events
+                WHERE id IN (
+                    SELECT id FROM audit_events WHERE id BETWEEN ? AND ? LIMIT ?
+                )
+                """,
+                (first_id, last_id, DELETE_BATCH_SIZE),
+            )
+            batch = cursor.rowcount
+        deleted += batch
+        if batch < DELETE_BATCH_SIZE:
+            return deleted
+        time.sleep(0.01)
+
+
+def seal_month(period: str) -> Optional[Dict[str, object]]:
+    """Seal hot rows up to the end of ``period`` (``YYYY-MM``) into a signed segment.
+
+    The segment covers every hot id from the current archive floor up to
+    the last row created before the month ends. Id ranges therefore never
+    overlap and no row can be stranded below the floor. Returns the index
+    entry, or None when there is nothing to seal.
+    """
+    init_db()
+    _, end = _period_bounds(period)
+    end_at = end.strftime("%Y-%m-%d %H:%M:%S")
+    with get_conn() as conn:
+        if conn.execute(
+            "SELECT 1 FROM audit_archive_segments WHERE period = ?", (period,)
+        ).fetchone():
+            raise ValueError(f"Audit period {period} is already sealed")
+        boundary_id = conn.execute(
+            "SELECT MAX(id) FROM audit_events WHERE created_at < ?", (end_at,)
+        ).fetchone()[0]
+    floor = archived_through_id()
+    if boundary_id is None or boundary_id <= floor:
+        return None
+
+    ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+    segment_path = ARCHIVE_DIR / f"audit_{period}.jsonl.gz"
+    sig_path = ARCHIVE_DIR / f"audit_{period}.sig"
+    tmp_path = ARCHIVE_DIR / f".audit_{period}.jsonl.gz.{os.getpid()}.tmp"
+    signer = hmac.new(get_or_create_signing_key(), digestmod=hashlib.sha256)
+    count = 0
+    first_id = last_id = None
+    start_at = end_seen = None
+    last_row_hash = None
+    try:
+        with tmp_path.open("wb") as raw, gzip.GzipFile(
+            filename="", mode="wb", fileobj=raw, mtime=0
+        ) as handle:
+            header = json.dumps(
+                {"format": ARCHIVE_FORMAT, "period": period}, sort_keys=True, separators=(",", ":")
+            ).encode("utf-8") + b"\n"
+            handle.write(header)
+            signer.update(header)
+            cursor_id = floor
+            while True:
+                with get_conn() as conn:
+                    rows = conn.execute(
+                        f"""
+                        SELECT {", ".join(_COLUMNS)} FROM audit_events
+                        WHERE id > ? AND id <= ?
+                        ORDER BY id
+                        LIMIT ?
+                        """,
+                        (cursor_id, boundary_id, SEAL_PAGE_SIZE),
+                    ).fetchall()
+                for row in rows:
+                    line = _line(row)
+                    handle.write(line)
+                    signer.update(line)
+                    count += 1
+                    if first_id is None:
+                        first_id = row[0]
+                    last_id, last_row_hash = row[0], row[7]
+                    start_at = row[1] if start_at is None else min(start_at, row[1])
+                    end_seen = row[1] if end_seen is None else max(end_seen, row[1])
+                if len(rows) < SEAL_PAGE_SIZE:
+                    break
+                cursor_id = rows[-1][0]
+        if count == 0:
+            return None
+        signature = signer.hexdigest()
+        os.replace(tmp_path, segment_path)
+        sig_path.write_text(signature, encoding="utf-8")
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+    entry = {
+        "period": period,
+        "path": str(segment_path),
+        "first_id": first_id,
+        "last_id": last_id,
+        "start_at": start_at,
+        "end_at": end_seen,
+        "event_count": count,
+        "last_row_hash": last_row_hash,
+        "signature": signature,
+    }
+    with get_conn() as conn:
+        conn.execute(
+            """
+            INSERT INTO audit_archive_segments
+            (period, path, first_id, last_id, start_at, end_at, event_count, last_row_hash, signature)
+            VALUES (:period, :path, :first_id, :last_id, :start_at, :end_at, :event_count,
+                    :last_row_hash, :signature)
+            """,
+            entry,
+        )
+    # Hot reads already skip ids <= last_id, so deleting in small batches is safe.
+    _delete_archived_rows(int(first_id), int(last_id))
+    return entry
+
+
+def archive_sealed_months(now: Optional[datetime] = None) -> Dict[str, object]:
+    """Seal, oldest first, every complete month that has left the hot window."""
+    init_db()
+    cutoff = sealable_before(now)
+    # Every id at or below the floor is archived; finish any interrupted delete.
+    _delete_archived_rows(0, archived_through_id())
+    sealed: List[Dict[str, object]] = []
+    while True:
+        floor = archived_through_id()
+        with get_conn() as conn:
+            oldest = conn.execute(
+                "SELECT created_at FROM audit_events WHERE id > ? ORDER BY id LIMIT 1", (floor,)
+            ).fetchone()
+            last_period = conn.execute("SELECT MAX(period) FROM audit_archive_segments").fetchone()[0]
+        if oldest is None or oldest[0] >= cutoff:
+            break
+        period = str(oldest[0])[:7]
+        if last_period is not None and period <= last_period:
+            # A late row stamped inside an already sealed month joins the next one.
+            start, _ = _period_bounds(last_period)
+            period = _month_start(start.year, start.month + 1).strftime("%Y-%m")
+            if _period_bounds(period)[1].strftime("%Y-%m-%d %H:%M:%S") > cutoff:
+                break
+        entry = seal_month(period)
+        if entry is None:
+            break
+        sealed.append(entry)
+    return {
+        "sealed_periods": [entry["period"] for entry in sealed],
+        "events_archived": sum(int(entry["event_count"]) for entry in sealed),
+        "hot_cutoff": cutoff,
+    }
+
+
+def prune_archive(days: int = ARCHIVE_RETENTION_DAYS) -> Dict[str, object]:
+    """Delete sealed segments whose newest event is older than ``days``."""
+    init_db()
+    with get_conn() as conn:
+        cutoff = conn.execute("SELECT datetime('now', ?)", (f"-{days} day",)).fetchone()[0]
+        expired = conn.execute(
+            "SELECT period, path FROM audit_archive_segments WHERE end_at < ?", (cutoff,)
+        ).fetchall()
+        conn.execute("DELETE FROM audit_archive_segments WHERE end_at < ?", (cutoff,))
+    for _, path in expired:
+        segment = Path(path)
+        segment.unlink(missing_ok=True)
+        segment.with_name(segment.name.replace(".jsonl.gz", ".sig")).unlink(missing_ok=True)
+    return {"archive_segments_deleted": [period for period, _ in expired]}
+
+
+def _segment_rows(segment: Dict[str, object]) -> Iterator[Dict[str, object]]:
+    with gzip.open(str(segment["path"]), "rb") as handle:
+        handle.readline()
+        for line in handle:
+            yield json.loads(line)
+
+
+def iter_archived_events(
+    after_id: int = 0,
+    before_id: Optional[int] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    descending: bool = False,
+) -> Iterator[Dict[str, object]]:
+    """Yield archived rows with ``after_id < id < before_id``, in id order.
+
+    ``since``/``until`` only prune whole segments via the index; callers
+    filter individual rows. Each row keeps ``details_json`` and the chain
+    hashes. Descending reads walk segments newest-first and hold at most
+    one segment's rows, so a consumer that stops early never opens older
+    segments.
+    """
+    segments = list_segments()
+    for segment in reversed(segments) if descending else segments:
+        if int(segment["last_id"]) <= after_id:
+            if descending:
+                break
+            continue
+        if before_id is not None and int(segment["first_id"]) >= before_id:
+            if descending:
+                continue
+            break
+        # Rows can be written late, so time ranges are not ordered by id.
+        if since is not None and str(segment["end_at"]) < since:
+            continue
+        if until is not None and str(segment["start_at"]) >= until:
+            continue
+        rows = (
+            row
+            for row in _segment_rows(segment)
+            if row["id"] > after_id and (before_id is None or row["id"] < before_id)
+        )
+        if descending:
+            yield from reversed(list(rows))
+        else:
+            yield from rows
+
+
+def verify_archive() -> Dict[str, object]:
+    """Check every segment's signature, its index entry and the hash chain across segments."""
+    key = get_or_create_signing_key()
+    report: Dict[str, object] = {"valid": True, "segments_verified": 0, "events_verified": 0, "error": None}
+    expected_prev: Optional[str] = None
+    for segment in list_segments():
+        signer = hmac.new(key, digestmod=hashlib.sha256)
+        path = Path(str(segment["path"]))
+        count = 0
+        last_id = None
+        try:
+            with gzip.open(path, "rb") as handle:
+                for index, line in enumerate(handle):
+                    signer.update(line)
+                    if index == 0:
+                        continue
+                    row = json.loads(line)
+                    count += 1
+                    last_id = row["id"]
+                    if row["row_hash"] is None:
+                        continue
+                    if expected_prev is not None and row["prev_hash"] != expected_prev:
+                        raise ValueError(f"id {row['id']}: chain link broken")
+                    recomputed = compute_row_hash(
+                        row["prev_hash"],
+                        row["created_at"],
+                        row["event_type"],
+                        row["actor"],
+                        row["source"],
+                        row["details_json"],
+                    )
+                    if recomputed != row["row_hash"]:
+                        raise ValueError(f"id {row['id']}: row_hash does not match contents")
+                    expected_prev = row["row_hash"]
+            if not hmac.compare_digest(signer.hexdigest(), str(segment["signature"])):
+                raise ValueError("signature mismatch")
+            if count != segment["event_count"] or last_id != segment["last_id"]:
+                raise ValueError("segment contents do not match the archive index")
+        except (OSError, ValueError, KeyError) as exc:
+            report.update(valid=False, error=f"{segment['period']}: {exc}")
+            return report
+        report["segments_verified"] = int(report["segments_verified"]) + 1
+        report["events_verified"] = int(report["events_verified"]) + count
+    return report
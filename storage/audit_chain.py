@@ -0,0 +1,80 @@
+"""Row-level hash chain for the audit_events table.
+
+Every row stores ``prev_hash`` (the previous row's ``row_hash``) and a
+``row_hash`` over that value plus the row's stored fields. Every
+``checkpoint_interval`` rows the writer inserts a ``chain_checkpoint`` row
+whose details hold an HMAC of its ``prev_hash``. The signature lets
+verification start at a checkpoint, for example after retention has
+pruned the rows before it.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import hmac
+import json
+from datetime import datetime
+from typing import Dict, List, Sequence, Tuple
+
+from config_loader import load_system_config
+from security.keys import get_or_create_signing_key
+
+
+SYSTEM_CONFIG = load_system_config()
+CHAIN_CONFIG = SYSTEM_CONFIG["audit"].get("hash_chain", {})
+CHAIN_ENABLED = bool(CHAIN_CONFIG.get("enabled", False))
+CHECKPOINT_INTERVAL = int(CHAIN_CONFIG.get("checkpoint_interval", 1000))
+CHECKPOINT_EVENT_TYPE = "chain_checkpoint"
+GENESIS_HASH = "0" * 64
+
+ChainedAuditRow = Tuple[str, str, str, str, str, str, str]
+
+
+def compute_row_hash(
+    prev_hash: str, created_at: str, event_type: str, actor: str, source: str, details_json: str
+) -> str:
+    payload = json.dumps(
+        [prev_hash, created_at, event_type, actor, source, details_json],
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def sign_checkpoint(prev_hash: str) -> str:
+    return hmac.new(get_or_create_signing_key(), prev_hash.encode("ascii"), hashlib.sha256).hexdigest()
+
+
+def checkpoint_is_valid(prev_hash: str, details: Dict[str, object]) -> bool:
+    signature = str(details.get("signature", ""))
+    return details.get("prev_hash") == prev_hash and hmac.compare_digest(
+        sign_checkpoint(prev_hash), signature
+    )
+
+
+def chain_rows(
+    rows: Sequence[Tuple[str, str, str, str]],
+    prev_hash: str,
+    rows_since_checkpoint: int,
+) -> List[ChainedAuditRow]:
+    """Attach timestamps and hashes to ``rows`` and interleave checkpoint rows.
+
+    ``created_at`` uses the same format as SQLite's CURRENT_TIMESTAMP so
+    hashed and legacy rows sort and filter identically.
+    """
+    created_at = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+    chained: List[ChainedAuditRow] = []
+
+    def append(event_type: str, actor: str, source: str, details_json: str) -> None:
+        nonlocal prev_hash
+        row_hash = compute_row_hash(prev_hash, created_at, event_type, actor, source, details_json)
+        chained.append((created_at, event_type, actor, source, details_json, prev_hash, row_hash))
+        prev_hash = row_hash
+
+    for event_type, actor, source, details_json in rows:
+        if rows_since_checkpoint >= CHECKPOINT_INTERVAL:
+            details = {"prev_hash": prev_hash, "signature": sign_checkpoint(prev_hash)}
+            append(CHECKPOINT_EVENT_TYPE, "system", "audit", json.dumps(details))
+            rows_since_checkpoint = 0
+        append(event_type, actor, source, details_json)
+        rows_since_checkpoint += 1
+    return chained
@@ -1,39 +1,538 @@
-"""Audit repository helpers."""
+"""Audit repository helpers.
+
+Audit and scan events are handed to a background ``AuditWriter`` that drains
+a bounded queue on one thread and inserts events in batched transactions,
+so request latency no longer includes disk syncs. Events whose type is listed
+under ``audit.durable_event_types`` (or logged with ``durable=True``) block
+until their batch is committed with ``synchronous=FULL``. Audit rows are
+hash-chained on insert (see ``storage.audit_chain``).
+"""
 
 from __future__ import annotations
 
+import atexit
 import json
-from typing import Any, Dict
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
-from storage.db import get_conn, init_db
+import tracing
+from config_loader import load_system_config
+from metrics import stage
+from storage import audit_chain
+from storage.db import ENTITY_COLUMNS, SYNCHRONOUS, get_conn, init_db
+from storage.scan_rollups import update_rollups
 
 
-def log_audit_event(event_type: str, actor: str, source: str, details: Dict[str, Any]) -> None:
-    init_db()
-    with get_conn() as conn:
-        conn.execute(
+SYSTEM_CONFIG = load_system_config()
+AUDIT_CONFIG = SYSTEM_CONFIG["audit"]
+WRITER_CONFIG = AUDIT_CONFIG.get("async_writer", {})
+DURABLE_EVENT_TYPES = set(AUDIT_CONFIG.get("durable_event_types", []))
+WRITE_RETRIES = 3
+
+AuditRow = Tuple[str, str, str, str]
+# filename, risk_level, risk_score, total_sensitive_items, source, then one
+# count per ``storage.db.ENTITY_COLUMNS`` entry.
+ScanRow = Tuple[str, str, int, int, str, int, int, int, int]
+
+
+def _insert_audit_rows(conn: sqlite3.Connection, rows: Sequence[AuditRow]) -> None:
+    if not audit_chain.CHAIN_ENABLED:
+        conn.executemany(
             """
             INSERT INTO audit_events (event_type, actor, source, details_json)
             VALUES (?, ?, ?, ?)
             """,
-            (event_type, actor, source, json.dumps(details)),
+            rows,
         )
+        return
+    if not conn.in_transaction:
+        # Take the write lock before reading the chain tail so concurrent
+        # writers cannot both extend the same row.
+        conn.execute("BEGIN IMMEDIATE")
+    tail = conn.execute("SELECT id, row_hash FROM audit_events ORDER BY id DESC LIMIT 1").fetchone()
+    last_checkpoint = conn.execute(
+        "SELECT MAX(id) FROM audit_events WHERE event_type = ?",
+        (audit_chain.CHECKPOINT_EVENT_TYPE,),
+    ).fetchone()[0]
+    tail_id = tail[0] if tail else 0
+    prev_hash = (tail[1] if tail else None) or audit_chain.GENESIS_HASH
+    # Id distance approximates the row count; exact enough for a periodic marker.
+    since_checkpoint = tail_id - (last_checkpoint or 0)
+    conn.executemany(
+        """
+        INSERT INTO audit_events
+        (created_at, event_type, actor, source, details_json, prev_hash, row_hash)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        audit_chain.chain_rows(rows, prev_hash, since_checkpoint),
+    )
 
 
-def log_scan_event(
+def _insert_scan_rows(conn: sqlite3.Connection, rows: Sequence[ScanRow]) -> None:
+    # One timestamp per batch keeps each row and its rollup bucket in agreement.
+    created_at = datetime.utcnow()
+    stamp = created_at.strftime("%Y-%m-%d %H:%M:%S")
+    conn.executemany(
+        f"""
+        INSERT INTO scan_events
+        (created_at, filename, risk_level, risk_score, total_sensitive_items, source,
+         {", ".join(ENTITY_COLUMNS)})
+        VALUES (?, ?, ?, ?, ?, ?, {", ".join("?" for _ in ENTITY_COLUMNS)})
+        """,
+        [(stamp, *row) for row in rows],
+    )
+    update_rollups(conn, created_at, rows)
+
+
+def _scan_row(
     filename: str,
     risk_level: str,
     risk_score: int,
     total_sensitive_items: int,
     source: str,
+    counts: Optional[Dict[str, int]],
+) -> ScanRow:
+    counts = counts or {}
+    return (
+        filename,
+        risk_level,
+        int(risk_score),
+        int(total_sensitive_items),
+        source,
+        *(int(counts.get(column, 0)) for column in ENTITY_COLUMNS),
+    )
+
+
+class _Item:
+    __slots__ = ("kind", "row", "done", "error")
+
+    def __init__(self, kind: str, row: Optional[tuple], done: Optional[threading.Event]) -> None:
+        self.kind = kind
+        self.row = row
+        self.done = done
+        self.error: Optional[BaseException] = None
+
+
+class AuditWriteError(RuntimeError):
+    """A durable event could not be committed yet; it stays queued for retry."""
+
+
+class AuditWriter:
+    """Single background thread that writes queued events in batches.
+
+    A batch is written when it reaches ``batch_size``, when
+    ``flush_interval`` seconds have passed since its first event, when a
+    durable event or explicit flush arrives, or when the process exits.
+
+    Events are never dropped. A batch that still fails after
+    ``WRITE_RETRIES`` attempts is kept and retried with backoff, together
+    with later events. Durable submitters and flushes waiting on it get
+    ``AuditWriteError`` and False respectively. While retained rows exceed
+    the queue size, new events are not taken, so the full queue applies
+    back-pressure. If the writer thread has died, callers write
+    synchronously instead.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = 10000,
+        batch_size: int = 200,
+        flush_interval: float = 0.2,
+    ) -> None:
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue_size = queue_size
+        self._queue: "queue.Queue[_Item]" = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        # Rows from batches that failed, oldest first, waiting for a retry.
+        self._retained: List[_Item] = []
+        self._retry_delay = 0.0
+        self._events_written = 0
+        self._batches_written = 0
+        self._write_errors = 0
+        self._blocked_puts = 0
+        self._last_flush_ms = 0.0
+        self._max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, kind: str, row: tuple, durable: bool = False) -> None:
+        """Queue an event; with ``durable``, wait until it is committed.
+
+        Raises:
+            AuditWriteError: If a durable event's batch failed; it is retried later.
+        """
+        done = threading.Event() if durable else None
+        item = _Item(kind, row, done)
+        if not self._thread.is_alive():
+            try:
+                self._write_inline([item])
+            except Exception as exc:
+                # The row is retained for the next write either way.
+                if durable:
+                    raise AuditWriteError(f"Audit event not committed yet: {exc}") from exc
+            return
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            # Never drop audit events: apply back-pressure instead.
+            with self._lock:
+                self._blocked_puts += 1
+            self._put(item)
+        if done is not None:
+            self._wait(item)
+            if item.error is not None:
+                raise AuditWriteError(f"Audit event not committed yet: {item.error}") from item.error
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until every event queued before this call is committed.
+
+        Returns False on timeout or when the write failed (the events are
+        kept for retry).
+        """
+        item = _Item("flush", None, threading.Event())
+        if not self._thread.is_alive():
+            try:
+                self._write_inline([])
+            except Exception:
+                return False
+            return True
+        self._put(item)
+        if not self._wait(item, timeout):
+            return False
+        return item.error is None
+
+    def close(self) -> None:
+        if self._thread.is_alive():
+            self._queue.put(_Item("stop", None, None))
+            self._thread.join()
+        with self._lock:
+            retained = bool(self._retained)
+        if retained:
+            try:
+                self._write_inline([])
+            except Exception as exc:
+                print(f"[audit] {len(self._retained)} events not written at exit: {exc}", file=sys.stderr)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            batches = self._batches_written
+            return {
+                "queue_depth": self._queue.qsize(),
+                "retained": len(self._retained),
+                "events_written": self._events_written,
+                "batches_written": batches,
+                "write_errors": self._write_errors,
+                "blocked_puts": self._blocked_puts,
+                "last_flush_ms": round(self._last_flush_ms, 3),
+                "max_flush_ms": round(self._max_flush_ms, 3),
+                "avg_flush_ms": round(self._total_flush_ms / batches, 3) if batches else 0.0,
+            }
+
+    def _put(self, item: _Item) -> None:
+        # A blocking put would hang forever if the writer died with a full queue.
+        while True:
+            try:
+                self._queue.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                if not self._thread.is_alive():
+                    try:
+                        self._write_inline([item])
+                    except Exception:
+                        pass  # recorded on the item; its row is retained
+                    return
+
+    def _wait(self, item: _Item, timeout: Optional[float] = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = 0.5 if deadline is None else min(0.5, deadline - time.monotonic())
+            if wait <= 0:
+                return False
+            if item.done.wait(wait):
+                return True
+            if not self._thread.is_alive():
+                # The item is stranded in the queue; write it (and the rest) here.
+                try:
+                    self._write_inline([])
+                except Exception as exc:
+                    item.error = exc
+                return True
+
+    def _write_inline(self, items: List[_Item]) -> None:
+        """Write stranded, retained and ``items`` rows on the calling thread."""
+        with self._lock:
+            pending, self._retained = self._retained, []
+        while True:
+            try:
+                pending.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        pending.extend(items)
+        rows = [item for item in pending if item.row is not None]
+        error: Optional[BaseException] = None
+        try:
+            write_event_rows(
+                [item.row for item in rows if item.kind == "audit"],
+                [item.row for item in rows if item.kind == "scan"],
+                durable=True,
+            )
+        except Exception as exc:
+            error = exc
+            with self._lock:
+                self._write_errors += 1
+                self._retained = rows + self._retained
+            raise
+        finally:
+            for item in pending:
+                if item.done is not None:
+                    item.error = error
+                    item.done.set()
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                retained = len(self._retained)
+                delay = self._retry_delay
+            if retained >= self.queue_size:
+                # Stop taking events until the backlog is written.
+                time.sleep(delay)
+                self._write([])
+                continue
+            try:
+                first = self._queue.get(timeout=delay) if retained else self._queue.get()
+            except queue.Empty:
+                self._write([])
+                continue
+            batch: List[_Item] = [first]
+            stop = first.kind == "stop"
+            deadline = time.monotonic() + self.flush_interval
+            while not stop and first.done is None and len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                if item.kind == "stop":
+                    stop = True
+                if item.done is not None:
+                    break
+            self._write(batch)
+            if stop:
+                return
+
+    def _write(self, batch: List[_Item]) -> None:
+        with self._lock:
+            pending = self._retained + [item for item in batch if item.row is not None]
+            self._retained = []
+        audit_rows = [item.row for item in pending if item.kind == "audit"]
+        scan_rows = [item.row for item in pending if item.kind == "scan"]
+        durable = any(item.done is not None and item.kind != "flush" for item in batch)
+        error: Optional[BaseException] = None
+        if audit_rows or scan_rows:
+            start = time.perf_counter()
+            for attempt in range(1, WRITE_RETRIES + 1):
+                try:
+                    write_event_rows(audit_rows, scan_rows, durable=durable)
+                    error = None
+                    break
+                except Exception as exc:
+                    error = exc
+                    with self._lock:
+                        self._write_errors += 1
+                    if attempt < WRITE_RETRIES:
+                        time.sleep(0.05 * attempt)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with self._lock:
+                if error is None:
+                    self._events_written += len(pending)
+                    self._batches_written += 1
+                    self._retry_delay = 0.0
+                else:
+                    # Keep the rows; they go first in the next attempt.
+                    self._retained = pending + self._retained
+                    self._retry_delay = min(5.0, max(0.1, self._retry_delay * 2))
+                self._last_flush_ms = elapsed_ms
+                self._max_flush_ms = max(self._max_flush_ms, elapsed_ms)
+                self._total_flush_ms += elapsed_ms
+            if error is not None:
+                print(
+                    f"[audit] write failed, keeping {len(pending)} events for retry: {error}",
+                    file=sys.stderr,
+                )
+        for item in batch:
+            if item.done is not None:
+                item.error = error
+                item.done.set()
+
+
+def write_event_rows(
+    audit_rows: Sequence[AuditRow], scan_rows: Sequence[ScanRow], durable: bool = False
 ) -> None:
+    """Insert audit and scan rows in one transaction on the calling thread."""
     init_db()
-    with get_conn() as conn:
-        conn.execute(
-            """
-            INSERT INTO scan_events
-            (filename, risk_level, risk_score, total_sensitive_items, source)
-            VALUES (?, ?, ?, ?, ?)
-            """,
-            (filename, risk_level, risk_score, total_sensitive_items, source),
+    with stage("audit_write"):
+        _write_event_rows(audit_rows, scan_rows, durable)
+
+
+def _write_event_rows(
+    audit_rows: Sequence[AuditRow], scan_rows: Sequence[ScanRow], durable: bool
+) -> None:
+    try:
+        with get_conn() as conn:
+            if durable:
+                conn.execute("PRAGMA synchronous = FULL")
+            if audit_rows:
+                _insert_audit_rows(conn, audit_rows)
+            if scan_rows:
+                _insert_scan_rows(conn, scan_rows)
+    finally:
+        if durable:
+            with get_conn() as conn:
+                conn.execute(f"PRAGMA synchronous = {SYNCHRONOUS}")
+
+
+_writer: Optional[AuditWriter] = None
+_writer_pid: Optional[int] = None
+_writer_lock = threading.Lock()
+
+
+def get_audit_writer() -> Optional[AuditWriter]:
+    """Return this process's writer, or None when async writes are disabled."""
+    global _writer, _writer_pid
+    if not WRITER_CONFIG.get("enabled", False):
+        return None
+    if _writer is not None and _writer_pid == os.getpid():
+        return _writer
+    with _writer_lock:
+        if _writer is None or _writer_pid != os.getpid():
+            # Threads do not survive fork, so children start their own writer.
+            _writer = AuditWriter(
+                queue_size=int(WRITER_CONFIG.get("queue_size", 10000)),
+                batch_size=int(WRITER_CONFIG.get("batch_size", 200)),
+                flush_interval=int(WRITER_CONFIG.get("flush_interval_ms", 200)) / 1000,
+            )
+            _writer_pid = os.getpid()
+        return _writer
+
+
+def flush_audit_writer(timeout: Optional[float] = None) -> bool:
+    """Wait until queued events are committed (no-op when writes are synchronous)."""
+    writer = _writer if _writer_pid == os.getpid() else None
+    return writer.flush(timeout) if writer is not None else True
+
+
+def audit_writer_stats() -> Dict[str, object]:
+    writer = _writer if _writer_pid == os.getpid() else None
+    if writer is None:
+        return {"enabled": bool(WRITER_CONFIG.get("enabled", False)), "started": False}
+    return {"enabled": True, "started": True, **writer.stats()}
+
+
+@atexit.register
+def _close_audit_writer() -> None:
+    writer = _writer if _writer_pid == os.getpid() else None
+    if writer is not None:
+        writer.close()
+
+
+def _submit(kind: str, row: tuple, durable: bool) -> None:
+    writer = get_audit_writer()
+    if writer is None:
+        if kind == "audit":
+            write_event_rows([row], [], durable=durable)
+        else:
+            write_event_rows([], [row], durable=durable)
+        return
+    writer.submit(kind, row, durable=durable)
+
+
+def log_audit_event(
+    event_type: str,
+    actor: str,
+    source: str,
+    details: Dict[str, Any],
+    durable: bool = False,
+) -> None:
+    trace_id = tracing.current_trace_id()
+    if trace_id and "trace_id" not in details:
+        details = {**details, "trace_id": trace_id}
+    row = (event_type, actor, source, json.dumps(details))
+    _submit("audit", row, durable or event_type in DURABLE_EVENT_TYPES)
+
+
+def log_scan_event(
+    filename: str,
+    risk_level: str,
+    risk_score: int,
+    total_sensitive_items: int,
+    source: str,
+    counts: Optional[Dict[str, int]] = None,
+    durable: bool = False,
+) -> None:
+    row = _scan_row(filename, risk_level, risk_score, total_sensitive_items, source, counts)
+    _submit("scan", row, durable)
+
+
+def _audit_rows(events: Iterable[Dict[str, Any]]) -> List[AuditRow]:
+    return [
+        (event["event_type"], event["actor"], event["source"], json.dumps(event["details"]))
+        for event in events
+    ]
+
+
+def _scan_rows(events: Iterable[Dict[str, Any]]) -> List[ScanRow]:
+    return [
+        _scan_row(
+            event["filename"],
+            event["risk_level"],
+            event["risk_score"],
+            event["total_sensitive_items"],
+            event["source"],
+            event.get("counts"),
         )
+        for event in events
+    ]
+
+
+def log_audit_events(events: Iterable[Dict[str, Any]]) -> int:
+    """Insert many audit events in a single transaction.
+
+    Each event carries the same keys as ``log_audit_event`` arguments.
+    Returns the number of rows written.
+    """
+    rows = _audit_rows(events)
+    if rows:
+        write_event_rows(rows, [])
+    return len(rows)
+
+
+def log_scan_events(events: Iterable[Dict[str, Any]]) -> int:
+    """Insert many scan events in a single transaction.
+
+    ``counts`` (per-entity finding counts) is optional in each event.
+    """
+    rows = _scan_rows(events)
+    if rows:
+        write_event_rows([], rows)
+    return len(rows)
+
+
+def log_event_batch(
+    audit_events: Iterable[Dict[str, Any]], scan_events: Iterable[Dict[str, Any]]
+) -> None:
+    """Insert audit and scan events together in one transaction."""
+    audit_rows = _audit_rows(audit_events)
+    scan_rows = _scan_rows(scan_events)
+    if audit_rows or scan_rows:
+        write_event_rows(audit_rows, scan_rows)
@@ -1,22 +1,73 @@
-"""SQLite persistence for PRIVGUARD AI audit and scan events."""
+"""SQLite persistence for PRIVGUARD AI audit and scan events.
+
+Connections are tuned once (WAL journaling, relaxed ``synchronous``, busy
+timeout) and reused per thread, and the schema is created at most once per
+process and database path, so hot paths such as audit logging cost a single
+transaction instead of several connects and DDL statements.
+"""
 
 from __future__ import annotations
 
+import os
 import sqlite3
+import threading
 from contextlib import contextmanager
 from pathlib import Path
-from typing import Iterator
+from typing import Dict, Iterator, Set
 
 from config_loader import load_system_config
 
 
 SYSTEM_CONFIG = load_system_config()
-DB_PATH = Path(SYSTEM_CONFIG["audit"]["database_path"])
+AUDIT_CONFIG = SYSTEM_CONFIG["audit"]
+DB_PATH = Path(AUDIT_CONFIG["database_path"])
+JOURNAL_MODE = str(AUDIT_CONFIG.get("journal_mode", "WAL"))
+SYNCHRONOUS = str(AUDIT_CONFIG.get("synchronous", "NORMAL"))
+BUSY_TIMEOUT_MS = int(AUDIT_CONFIG.get("busy_timeout_ms", 5000))
 
+# Per-entity finding counts stored on scan_events and summed in the rollups.
+ENTITY_COLUMNS = ("national_ids", "phone_numbers", "emails", "kra_pins")
+# Rollup table -> strftime format of its time bucket.
+ROLLUP_BUCKETS = {
+    "scan_rollup_daily": "%Y-%m-%d",
+    "scan_rollup_hourly": "%Y-%m-%d %H:00",
+}
 
-def init_db() -> None:
+_schema_lock = threading.Lock()
+_initialized: Set[str] = set()
+_local = threading.local()
+
+
+def connect() -> sqlite3.Connection:
+    """Open a new connection to the audit database with tuned pragmas.
+
+    Use this for long-lived, caller-owned connections; request-scoped work
+    should go through ``get_conn``.
+    """
     DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-    with sqlite3.connect(DB_PATH) as conn:
+    conn = sqlite3.connect(DB_PATH, timeout=BUSY_TIMEOUT_MS / 1000)
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA synchronous = {SYNCHRONOUS}")
+    return conn
+
+
+def init_db() -> None:
+    """Create the schema once per process for the current ``DB_PATH``."""
+    key = str(DB_PATH)
+    if key in _initialized:
+        return
+    with _schema_lock:
+        if key in _initialized:
+            return
+        _create_schema()
+        _initialized.add(key)
+
+
+def _create_schema() -> None:
+    conn = connect()
+    try:
+        # journal_mode is persistent in the database file; set it once here.
+        conn.execute(f"PRAGMA journal_mode = {JOURNAL_MODE}")
         conn.execute(
             """
             CREATE TABLE IF NOT EXISTS audit_events (
@@ -25,10 +76,13 @@ def init_db() -> None:
                 event_type TEXT NOT NULL,
                 actor TEXT NOT NULL,
                 source TEXT NOT NULL,
-                details_json TEXT NOT NULL
+                details_json TEXT NOT NULL,
+                prev_hash TEXT,
+                row_hash TEXT
             )
             """
         )
+        _add_missing_columns(conn, "audit_events", {"prev_hash": "TEXT", "row_hash": "TEXT"})
         conn.execute(
             """
             CREATE TABLE IF NOT EXISTS scan_events (
@@ -38,18 +92,206 @@ def init_db() -> None:
                 risk_level TEXT NOT NULL,
                 risk_score INTEGER NOT NULL,
                 total_sensitive_items INTEGER NOT NULL,
-                source TEXT NOT NULL
+                source TEXT NOT NULL,
+                national_ids INTEGER NOT NULL DEFAULT 0,
+                phone_numbers INTEGER NOT NULL DEFAULT 0,
+                emails INTEGER NOT NULL DEFAULT 0,
+                kra_pins INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        _add_missing_columns(
+            conn,
+            "scan_events",
+            {column: "INTEGER NOT NULL DEFAULT 0" for column in ENTITY_COLUMNS},
+        )
+        _create_rollup_tables(conn)
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_audit_events_created_at ON audit_events (created_at)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_audit_events_event_type ON audit_events (event_type)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_audit_events_actor ON audit_events (actor)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_scan_events_created_at ON scan_events (created_at)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_scan_events_risk_level ON scan_events (risk_level)"
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS audit_archive_segments (
+                period TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                first_id INTEGER NOT NULL,
+                last_id INTEGER NOT NULL,
+                start_at TEXT NOT NULL,
+                end_at TEXT NOT NULL,
+                event_count INTEGER NOT NULL,
+                last_row_hash TEXT,
+                signature TEXT NOT NULL,
+                sealed_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                priority TEXT NOT NULL DEFAULT 'interactive',
+                status TEXT NOT NULL,
+                actor TEXT NOT NULL,
+                owner TEXT NOT NULL,
+                params_json TEXT NOT NULL,
+                result_json TEXT,
+                error TEXT,
+                timings_json TEXT,
+                created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                started_at TEXT,
+                finished_at TEXT
+            )
+            """
+        )
+        _add_missing_columns(conn, "jobs", {"priority": "TEXT NOT NULL DEFAULT 'interactive'"})
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_finished_at ON jobs (finished_at)")
+        # Older databases keyed results without the suffix. The table is only
+        # a cache, so it is rebuilt rather than migrated.
+        result_columns = {row[1] for row in conn.execute("PRAGMA table_info(scan_results)")}
+        if result_columns and "suffix" not in result_columns:
+            conn.execute("DROP TABLE scan_results")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS scan_results (
+                content_hash TEXT NOT NULL,
+                suffix TEXT NOT NULL,
+                rules_version TEXT NOT NULL,
+                text TEXT NOT NULL,
+                findings_json TEXT NOT NULL,
+                risk_json TEXT NOT NULL,
+                created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (content_hash, suffix, rules_version)
+            )
+            """
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_scan_results_created_at ON scan_results (created_at)"
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS user_profiles (
+                username TEXT PRIMARY KEY,
+                display_name TEXT,
+                avatar_url TEXT,
+                updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS scan_state (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                content_hash TEXT NOT NULL,
+                rules_version TEXT NOT NULL,
+                status TEXT NOT NULL,
+                summary_json TEXT NOT NULL,
+                scanned_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
             )
             """
         )
         conn.commit()
+    finally:
+        conn.close()
+
+
+def _create_rollup_tables(conn: sqlite3.Connection) -> None:
+    """Create scan rollup tables, backfilling them from existing scan_events."""
+    entity_defs = ", ".join(f"{column} INTEGER NOT NULL DEFAULT 0" for column in ENTITY_COLUMNS)
+    entity_sums = ", ".join(f"SUM({column})" for column in ENTITY_COLUMNS)
+    for table, bucket_format in ROLLUP_BUCKETS.items():
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone()
+        if exists:
+            continue
+        conn.execute(
+            f"""
+            CREATE TABLE {table} (
+                bucket TEXT NOT NULL,
+                risk_level TEXT NOT NULL,
+                scans INTEGER NOT NULL DEFAULT 0,
+                risk_score_sum INTEGER NOT NULL DEFAULT 0,
+                sensitive_items INTEGER NOT NULL DEFAULT 0,
+                {entity_defs},
+                PRIMARY KEY (bucket, risk_level)
+            )
+            """
+        )
+        conn.execute(
+            f"""
+            INSERT INTO {table}
+            (bucket, risk_level, scans, risk_score_sum, sensitive_items, {", ".join(ENTITY_COLUMNS)})
+            SELECT strftime('{bucket_format}', created_at), risk_level, COUNT(*),
+                   SUM(risk_score), SUM(total_sensitive_items), {entity_sums}
+            FROM scan_events
+            GROUP BY 1, 2
+            """
+        )
+
+
+def _add_missing_columns(conn: sqlite3.Connection, table: str, columns: Dict[str, str]) -> None:
+    """Add nullable columns that databases created by older versions lack."""
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    for name, column_type in columns.items():
+        if name not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
+
+
+def _thread_conns() -> Dict[str, sqlite3.Connection]:
+    # Connections must never cross a fork; drop any inherited from the parent.
+    if getattr(_local, "pid", None) != os.getpid():
+        _local.pid = os.getpid()
+        _local.conns = {}
+        _local.depth = {}
+    return _local.conns
 
 
 @contextmanager
 def get_conn() -> Iterator[sqlite3.Connection]:
-    conn = sqlite3.connect(DB_PATH)
+    """Yield this thread's connection; commit on success, roll back on error.
+
+    Nested uses on the same thread share one transaction that is committed
+    when the outermost block exits.
+    """
+    conns = _thread_conns()
+    key = str(DB_PATH)
+    conn = conns.get(key)
+    if conn is None:
+        conn = connect()
+        conns[key] = conn
+    depth = _local.depth
+    depth[key] = depth.get(key, 0) + 1
     try:
         yield conn
-        conn.commit()
+        if depth[key] == 1:
+            conn.commit()
+    except BaseException:
+        if depth[key] == 1:
+            conn.rollback()
+        raise
     finally:
+        depth[key] -= 1
+
+
+def close_thread_conns() -> None:
+    """Close connections cached for the calling thread."""
+    conns = _thread_conns()
+    for conn in conns.values():
         conn.close()
+    conns.clear()
@@ -0,0 +1,208 @@
+"""Filtered, keyset-paginated reads over audit_events and scan_events.
+
+Pages are addressed by an id cursor (``id > cursor`` ascending, ``id <
+cursor`` descending) rather than OFFSET. Each page therefore costs the same
+however deep into the table it is. Filters map onto indexed columns.
+Audit queries also read sealed archive segments (``storage.audit_archive``)
+for ids at or below the hot table's floor.
+"""
+
+from __future__ import annotations
+
+import json
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from storage.audit_archive import archived_through_id, iter_archived_events
+from storage.db import ENTITY_COLUMNS, get_conn, init_db
+
+
+MAX_PAGE_SIZE = 1000
+
+# kind -> (table, selected columns, filters allowed as exact matches)
+EVENT_KINDS: Dict[str, Tuple[str, Tuple[str, ...], Tuple[str, ...]]] = {
+    "audit": (
+        "audit_events",
+        ("id", "created_at", "event_type", "actor", "source", "details_json"),
+        ("event_type", "actor", "source"),
+    ),
+    "scan": (
+        "scan_events",
+        (
+            "id",
+            "created_at",
+            "filename",
+            "risk_level",
+            "risk_score",
+            "total_sensitive_items",
+            "source",
+            *ENTITY_COLUMNS,
+        ),
+        ("risk_level", "source"),
+    ),
+}
+
+
+def normalize_timestamp(value: str) -> str:
+    """Convert an ISO date/datetime into the stored ``YYYY-MM-DD HH:MM:SS`` UTC form.
+
+    Values with an offset are converted to UTC; naive values are taken as UTC.
+    """
+    text = value.strip()
+    if text.endswith("Z"):
+        text = text[:-1]
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError as exc:
+        raise ValueError(f"Invalid timestamp: {value!r}") from exc
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc)
+    return parsed.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _build_query(
+    kind: str,
+    filters: Dict[str, Optional[str]],
+    cursor: Optional[int],
+    descending: bool,
+    floor: int = 0,
+) -> Tuple[str, List[object]]:
+    if kind not in EVENT_KINDS:
+        raise ValueError(f"Unknown event kind: {kind}")
+    table, columns, exact = EVENT_KINDS[kind]
+    unknown = set(filters) - set(exact) - {"since", "until"}
+    if unknown:
+        raise ValueError(f"Unsupported filter(s) for {kind} events: {', '.join(sorted(unknown))}")
+
+    clauses: List[str] = []
+    params: List[object] = []
+    for name in exact:
+        value = filters.get(name)
+        if value:
+            clauses.append(f"{name} = ?")
+            params.append(value)
+    if filters.get("since"):
+        clauses.append("created_at >= ?")
+        params.append(normalize_timestamp(str(filters["since"])))
+    if filters.get("until"):
+        clauses.append("created_at < ?")
+        params.append(normalize_timestamp(str(filters["until"])))
+    if cursor is not None:
+        clauses.append("id < ?" if descending else "id > ?")
+        params.append(int(cursor))
+    if floor:
+        clauses.append("id > ?")
+        params.append(floor)
+
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    sql = (
+        f"SELECT {', '.join(columns)} FROM {table} {where} "
+        f"ORDER BY id {'DESC' if descending else 'ASC'} LIMIT ?"
+    )
+    return sql, params
+
+
+def _row_to_event(kind: str, row: tuple) -> Dict[str, object]:
+    columns = EVENT_KINDS[kind][1]
+    event = dict(zip(columns, row))
+    if kind == "audit":
+        event["details"] = json.loads(str(event.pop("details_json")))
+    else:
+        event["counts"] = {column: event.pop(column) for column in ENTITY_COLUMNS}
+    return event
+
+
+def _iter_hot(
+    kind: str,
+    filters: Dict[str, Optional[str]],
+    cursor: Optional[int],
+    limit: Optional[int],
+    descending: bool,
+    page_size: int,
+    floor: int,
+) -> Iterator[Dict[str, object]]:
+    remaining = limit
+    while remaining is None or remaining > 0:
+        fetch = page_size if remaining is None else min(page_size, remaining)
+        sql, params = _build_query(kind, filters, cursor, descending, floor)
+        with get_conn() as conn:
+            rows = conn.execute(sql, (*params, fetch)).fetchall()
+        for row in rows:
+            yield _row_to_event(kind, row)
+        if len(rows) < fetch:
+            return
+        cursor = rows[-1][0]
+        if remaining is not None:
+            remaining -= len(rows)
+
+
+def _iter_archive(
+    filters: Dict[str, Optional[str]],
+    cursor: Optional[int],
+    limit: Optional[int],
+    descending: bool,
+    floor: int,
+) -> Iterator[Dict[str, object]]:
+    since = normalize_timestamp(str(filters["since"])) if filters.get("since") else None
+    until = normalize_timestamp(str(filters["until"])) if filters.get("until") else None
+    exact = {name: filters[name] for name in EVENT_KINDS["audit"][2] if filters.get(name)}
+    if descending:
+        after_id, before_id = 0, min(cursor, floor + 1) if cursor is not None else floor + 1
+    else:
+        after_id, before_id = cursor or 0, floor + 1
+    columns = EVENT_KINDS["audit"][1]
+    matches = (
+        _row_to_event("audit", tuple(row[column] for column in columns))
+        for row in iter_archived_events(after_id, before_id, since, until, descending)
+        if all(row[name] == value for name, value in exact.items())
+        and (since is None or row["created_at"] >= since)
+        and (until is None or row["created_at"] < until)
+    )
+    yield from islice(matches, limit)
+
+
+def iter_events(
+    kind: str,
+    filters: Optional[Dict[str, Optional[str]]] = None,
+    cursor: Optional[int] = None,
+    limit: Optional[int] = None,
+    descending: bool = False,
+    page_size: int = MAX_PAGE_SIZE,
+) -> Iterator[Dict[str, object]]:
+    """Yield matching events page by page, starting after ``cursor``.
+
+    ``limit=None`` walks every matching row. Hot-table memory stays bounded
+    by one page. Bad kinds, filters and timestamps raise ``ValueError`` here,
+    on the call, rather than on the first ``next()``.
+    """
+    filters = {key: value for key, value in (filters or {}).items() if value}
+    _build_query(kind, filters, cursor, descending)
+    return _iter_events(kind, filters, cursor, limit, descending, page_size)
+
+
+def _iter_events(
+    kind: str,
+    filters: Dict[str, Optional[str]],
+    cursor: Optional[int],
+    limit: Optional[int],
+    descending: bool,
+    page_size: int,
+) -> Iterator[Dict[str, object]]:
+    init_db()
+    floor = archived_through_id() if kind == "audit" else 0
+    if not floor:
+        yield from _iter_hot(kind, filters, cursor, limit, descending, page_size, 0)
+        return
+    remaining = limit
+    for tier in ("hot", "archive") if descending else ("archive", "hot"):
+        if remaining == 0:
+            return
+        if tier == "hot":
+            events = _iter_hot(kind, filters, cursor, remaining, descending, page_size, floor)
+        else:
+            events = _iter_archive(filters, cursor, remaining, descending, floor)
+        for event in events:
+            yield event
+            if remaining is not None:
+                remaining -= 1
@@ -0,0 +1,252 @@
+"""SQLite persistence for background scan/protect jobs.
+
+A job row moves through ``queued -> running -> done | failed``; a queued
+job can also be cancelled straight to ``failed``. Any worker process can
+read it, so clients may poll or stream a job from a process other than the
+one running it. Results can contain findings, so finished rows are purged
+after ``jobs.result_ttl_seconds``. Successful scans, whose id doubles as a
+reusable scan id, are kept for ``uploads.result_ttl_seconds`` instead.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import socket
+import uuid
+from typing import Any, Dict, Iterable, List, Optional
+
+from storage.db import get_conn, init_db
+
+
+TERMINAL_STATUSES = {"done", "failed"}
+# Owner of queued jobs handed back by a stopping worker; any runner may claim them.
+RELEASED_OWNER = ""
+
+
+def _owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def create_job(kind: str, actor: str, params: Dict[str, Any], priority: str = "interactive") -> str:
+    init_db()
+    job_id = uuid.uuid4().hex
+    with get_conn() as conn:
+        conn.execute(
+            """
+            INSERT INTO jobs (id, kind, priority, status, actor, owner, params_json)
+            VALUES (?, ?, ?, 'queued', ?, ?, ?)
+            """,
+            (job_id, kind, priority, actor, _owner(), json.dumps(params)),
+        )
+    return job_id
+
+
+def delete_job(job_id: str) -> None:
+    with get_conn() as conn:
+        conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+
+def mark_running(job_id: str) -> bool:
+    """Move a queued job to running; False if it is no longer queued (cancelled)."""
+    with get_conn() as conn:
+        return (
+            conn.execute(
+                """
+                UPDATE jobs SET status = 'running', started_at = CURRENT_TIMESTAMP
+                WHERE id = ? AND status = 'queued'
+                """,
+                (job_id,),
+            ).rowcount
+            > 0
+        )
+
+
+def mark_finished(
+    job_id: str,
+    result: Optional[Dict[str, Any]],
+    error: Optional[str],
+    timings: Dict[str, float],
+) -> None:
+    with get_conn() as conn:
+        conn.execute(
+            """
+            UPDATE jobs
+            SET status = ?, result_json = ?, error = ?, timings_json = ?,
+                finished_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+            """,
+            (
+                "failed" if error is not None else "done",
+                json.dumps(result) if result is not None else None,
+                error,
+                json.dumps(timings),
+                job_id,
+            ),
+        )
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    init_db()
+    with get_conn() as conn:
+        row = conn.execute(
+            """
+            SELECT id, kind, priority, status, actor, result_json, error, timings_json,
+                   created_at, started_at, finished_at
+            FROM jobs WHERE id = ?
+            """,
+            (job_id,),
+        ).fetchone()
+    if row is None:
+        return None
+    return {
+        "job_id": row[0],
+        "kind": row[1],
+        "priority": row[2],
+        "status": row[3],
+        "actor": row[4],
+        "result": json.loads(row[5]) if row[5] else None,
+        "error": row[6],
+        "timings_ms": json.loads(row[7]) if row[7] else None,
+        "created_at": row[8],
+        "started_at": row[9],
+        "finished_at": row[10],
+    }
+
+
+def get_job_params(job_id: str) -> Optional[Dict[str, Any]]:
+    """Return a job's submitted parameters (server-side paths; never sent to clients)."""
+    init_db()
+    with get_conn() as conn:
+        row = conn.execute("SELECT params_json FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def cancel_queued_jobs(job_ids: Iterable[str], reason: str = "Cancelled") -> List[str]:
+    """Fail jobs that have not started yet, wherever they are queued; return their ids.
+
+    Running and finished jobs are left alone.
+    """
+    cancelled = []
+    with get_conn() as conn:
+        for job_id in job_ids:
+            changed = conn.execute(
+                """
+                UPDATE jobs SET status = 'failed', error = ?, finished_at = CURRENT_TIMESTAMP
+                WHERE id = ? AND status = 'queued'
+                """,
+                (reason, job_id),
+            ).rowcount
+            if changed:
+                cancelled.append(job_id)
+    return cancelled
+
+
+def release_jobs(job_ids: Iterable[str]) -> int:
+    """Hand queued jobs back to the shared queue for another worker to claim."""
+    with get_conn() as conn:
+        return sum(
+            conn.execute(
+                "UPDATE jobs SET owner = ? WHERE id = ? AND status = 'queued'",
+                (RELEASED_OWNER, job_id),
+            ).rowcount
+            for job_id in job_ids
+        )
+
+
+def claim_released_jobs(limit: int = 100) -> List[Dict[str, Any]]:
+    """Take ownership of up to ``limit`` released jobs, oldest first.
+
+    The claim is a single UPDATE, so two workers never claim the same job.
+    """
+    init_db()
+    token = f"claim:{uuid.uuid4().hex}"
+    with get_conn() as conn:
+        conn.execute(
+            """
+            UPDATE jobs SET owner = ?
+            WHERE id IN (
+                SELECT id FROM jobs WHERE owner = ? AND status = 'queued'
+                ORDER BY created_at LIMIT ?
+            )
+            """,
+            (token, RELEASED_OWNER, limit),
+        )
+        rows = conn.execute(
+            "SELECT id, kind, priority, actor, params_json FROM jobs WHERE owner = ? ORDER BY created_at",
+            (token,),
+        ).fetchall()
+        conn.execute("UPDATE jobs SET owner = ? WHERE owner = ?", (_owner(), token))
+    return [
+        {"job_id": row[0], "kind": row[1], "priority": row[2], "actor": row[3], "params": json.loads(row[4])}
+        for row in rows
+    ]
+
+
+def fail_interrupted_jobs() -> int:
+    """Fail unfinished jobs whose owning process on this host has exited.
+
+    Worker pools live inside a single process, so those jobs would never be
+    picked up again. Jobs owned by live sibling workers, and released jobs
+    waiting to be claimed, are left alone. Runners call this on start and
+    then periodically, so a worker killed after its replacement started is
+    still noticed.
+    """
+    init_db()
+    host = socket.gethostname()
+    with get_conn() as conn:
+        owners = [
+            row[0]
+            for row in conn.execute(
+                "SELECT DISTINCT owner FROM jobs WHERE status IN ('queued', 'running')"
+            )
+        ]
+        dead = [
+            owner
+            for owner in owners
+            if owner.rpartition(":")[0] == host and not _pid_alive(int(owner.rpartition(":")[2]))
+        ]
+        failed = 0
+        for owner in dead:
+            cursor = conn.execute(
+                """
+                UPDATE jobs
+                SET status = 'failed', error = 'Interrupted: worker process exited',
+                    finished_at = CURRENT_TIMESTAMP
+                WHERE owner = ? AND status IN ('queued', 'running')
+                """,
+                (owner,),
+            )
+            failed += cursor.rowcount
+    return failed
+
+
+def purge_finished_jobs(ttl_seconds: int, scan_ttl_seconds: Optional[int] = None) -> int:
+    """Delete finished jobs older than ``ttl_seconds``.
+
+    Successful scans are kept for ``scan_ttl_seconds`` instead when given:
+    their job id is the scan id that ``/protect`` and ``/verify-redaction``
+    accept, so it should live as long as the stored result behind it.
+    """
+    init_db()
+    scan_ttl_seconds = ttl_seconds if scan_ttl_seconds is None else scan_ttl_seconds
+    with get_conn() as conn:
+        cursor = conn.execute(
+            """
+            DELETE FROM jobs
+            WHERE finished_at < datetime('now', CASE
+                WHEN kind = 'scan' AND status = 'done' THEN ? ELSE ? END)
+            """,
+            (f"-{int(scan_ttl_seconds)} seconds", f"-{int(ttl_seconds)} seconds"),
+        )
+        return cursor.rowcount
@@ -0,0 +1,188 @@
+"""User display-name/avatar profiles for the web dashboard.
+
+Two backends share one interface:
+
+* ``JsonProfileStore`` keeps the original ``instance/user_profiles.json``
+  layout. The parsed file is cached in memory and re-read only when its
+  (mtime, size, inode) changes. Writes hold a process lock plus an advisory
+  file lock, re-read the latest file, then replace it atomically through a
+  temp file and ``os.replace``. Concurrent updates neither lose writes nor
+  leave a torn file.
+* ``SqliteProfileStore`` keeps one row per user in the audit database, so a
+  lookup or update costs the same however many users there are. On first
+  use it imports an existing JSON file.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+from config_loader import load_system_config
+from storage.db import get_conn, init_db
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows has no fcntl
+    fcntl = None
+
+
+SYSTEM_CONFIG = load_system_config()
+PROFILE_CONFIG = SYSTEM_CONFIG.get("profiles", {})
+PROFILE_BACKEND = PROFILE_CONFIG.get("backend", "json")
+PROFILE_PATH = Path(PROFILE_CONFIG.get("path", "instance/user_profiles.json"))
+
+Profile = Dict[str, str]
+
+
+def _public(username: str, stored: Dict[str, object]) -> Profile:
+    return {
+        "display_name": str(stored.get("display_name") or username),
+        "avatar_url": str(stored.get("avatar_url") or ""),
+    }
+
+
+class JsonProfileStore:
+    def __init__(self, path: Path = PROFILE_PATH) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._cache: Dict[str, Dict[str, object]] = {}
+        self._signature: Optional[Tuple[int, int, int]] = None
+
+    def _stat_signature(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def _profiles(self) -> Dict[str, Dict[str, object]]:
+        signature = self._stat_signature()
+        if signature != self._signature:
+            profiles: Dict[str, Dict[str, object]] = {}
+            if signature is not None:
+                try:
+                    profiles = json.loads(self.path.read_text(encoding="utf-8"))
+                except (OSError, ValueError):
+                    profiles = {}
+            self._cache, self._signature = profiles, signature
+        return self._cache
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        if fcntl is None:
+            yield
+            return
+        with open(self.path.with_name(self.path.name + ".lock"), "a") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def get(self, username: str) -> Profile:
+        with self._lock:
+            return _public(username, self._profiles().get(username, {}))
+
+    def update(self, username: str, **fields: Optional[str]) -> Profile:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock, self._file_lock():
+            # Re-read under the lock so another process's write is not lost.
+            profiles = dict(self._profiles())
+            current = dict(profiles.get(username, {}))
+            current.update({key: value for key, value in fields.items() if value is not None})
+            profiles[username] = current
+            handle = tempfile.NamedTemporaryFile(
+                "w", encoding="utf-8", dir=self.path.parent, prefix=".profiles-", delete=False
+            )
+            try:
+                with handle:
+                    json.dump(profiles, handle, indent=2)
+                    handle.flush()
+                    os.fsync(handle.fileno())
+                os.replace(handle.name, self.path)
+            except BaseException:
+                if os.path.exists(handle.name):
+                    os.unlink(handle.name)
+                raise
+            self._cache, self._signature = profiles, self._stat_signature()
+            return _public(username, current)
+
+
+class SqliteProfileStore:
+    def __init__(self, import_path: Optional[Path] = PROFILE_PATH) -> None:
+        self.import_path = import_path
+        self._imported = False
+        self._lock = threading.Lock()
+
+    def _ensure_imported(self) -> None:
+        if self._imported:
+            return
+        with self._lock:
+            if self._imported:
+                return
+            init_db()
+            with get_conn() as conn:
+                empty = conn.execute("SELECT 1 FROM user_profiles LIMIT 1").fetchone() is None
+                if empty and self.import_path is not None and self.import_path.exists():
+                    try:
+                        profiles = json.loads(self.import_path.read_text(encoding="utf-8"))
+                    except (OSError, ValueError):
+                        profiles = {}
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO user_profiles (username, display_name, avatar_url) "
+                        "VALUES (?, ?, ?)",
+                        [
+                            (name, entry.get("display_name"), entry.get("avatar_url"))
+                            for name, entry in profiles.items()
+                        ],
+                    )
+            self._imported = True
+
+    def get(self, username: str) -> Profile:
+        self._ensure_imported()
+        with get_conn() as conn:
+            row = conn.execute(
+                "SELECT display_name, avatar_url FROM user_profiles WHERE username = ?",
+                (username,),
+            ).fetchone()
+        return _public(username, {"display_name": row[0], "avatar_url": row[1]} if row else {})
+
+    def update(self, username: str, **fields: Optional[str]) -> Profile:
+        self._ensure_imported()
+        with get_conn() as conn:
+            conn.execute(
+                """
+                INSERT INTO user_profiles (username, display_name, avatar_url)
+                VALUES (?, ?, ?)
+                ON CONFLICT(username) DO UPDATE SET
+                    display_name = COALESCE(excluded.display_name, display_name),
+                    avatar_url = COALESCE(excluded.avatar_url, avatar_url),
+                    updated_at = CURRENT_TIMESTAMP
+                """,
+                (username, fields.get("display_name"), fields.get("avatar_url")),
+            )
+        return self.get(username)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_profile_store():
+    """Return the configured backend (``profiles.backend``: json or sqlite)."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            if PROFILE_BACKEND == "sqlite":
+                _store = SqliteProfileStore()
+            elif PROFILE_BACKEND == "json":
+                _store = JsonProfileStore()
+            else:
+                raise ValueError(f"Unknown profiles.backend: {PROFILE_BACKEND}")
+        return _store
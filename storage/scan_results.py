@@ -0,0 +1,74 @@
+"""Stored scan results keyed by content hash, file suffix and rules version.
+
+A result can be reused for any upload with the same bytes and suffix while
+the detection rules and risk policy are unchanged. The suffix is part of the
+key because it picks the extraction method: the same bytes as ``.txt`` and
+``.png`` yield different text, and an unsupported suffix must still fail. Rows hold extracted text and
+findings, so they expire after ``uploads.result_ttl_seconds``.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, Optional
+
+from storage.db import get_conn, init_db
+
+
+def get_scan_result(
+    content_hash: str, suffix: str, rules_version: str
+) -> Optional[Dict[str, Any]]:
+    init_db()
+    with get_conn() as conn:
+        row = conn.execute(
+            """
+            SELECT text, findings_json, risk_json FROM scan_results
+            WHERE content_hash = ? AND suffix = ? AND rules_version = ?
+            """,
+            (content_hash, suffix.lower(), rules_version),
+        ).fetchone()
+    if row is None:
+        return None
+    return {"text": row[0], "findings": json.loads(row[1]), "risk": json.loads(row[2])}
+
+
+def save_scan_result(
+    content_hash: str,
+    suffix: str,
+    rules_version: str,
+    text: str,
+    findings: Dict[str, Any],
+    risk: Dict[str, Any],
+) -> None:
+    init_db()
+    with get_conn() as conn:
+        conn.execute(
+            """
+            INSERT INTO scan_results
+            (content_hash, suffix, rules_version, text, findings_json, risk_json)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(content_hash, suffix, rules_version) DO UPDATE SET
+                text = excluded.text,
+                findings_json = excluded.findings_json,
+                risk_json = excluded.risk_json,
+                created_at = CURRENT_TIMESTAMP
+            """,
+            (
+                content_hash,
+                suffix.lower(),
+                rules_version,
+                text,
+                json.dumps(findings),
+                json.dumps(risk),
+            ),
+        )
+
+
+def purge_scan_results(ttl_seconds: int) -> int:
+    init_db()
+    with get_conn() as conn:
+        cursor = conn.execute(
+            "DELETE FROM scan_results WHERE created_at < datetime('now', ?)",
+            (f"-{int(ttl_seconds)} seconds",),
+        )
+        return cursor.rowcount
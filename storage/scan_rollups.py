@@ -0,0 +1,158 @@
+"""Incrementally maintained scan aggregates for the dashboard.
+
+``update_rollups`` runs in the same transaction as each scan_events insert
+and adds the batch to the hourly and daily rollup rows. Dashboard totals
+then come from a small GROUP BY over rollup rows rather than a scan of
+scan_events. Retention prunes scan_events but not the rollups, so the
+rollups keep org-wide history without filenames.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Sequence, Tuple
+
+from storage.db import ENTITY_COLUMNS, ROLLUP_BUCKETS, get_conn, init_db
+
+
+RISK_LEVELS = ("High", "Medium", "Low")
+TREND_SIZE = 10
+
+_ENTITY_LIST = ", ".join(ENTITY_COLUMNS)
+_ENTITY_PLACEHOLDERS = ", ".join("?" for _ in ENTITY_COLUMNS)
+_ENTITY_UPDATES = ", ".join(f"{column} = {column} + excluded.{column}" for column in ENTITY_COLUMNS)
+
+
+def update_rollups(conn: sqlite3.Connection, created_at: datetime, rows: Sequence[tuple]) -> None:
+    """Add scan rows (``storage.audit_repo.ScanRow`` shape) to every rollup table."""
+    # One upsert per risk level per table, however many rows are in the batch.
+    totals: Dict[str, List[int]] = defaultdict(lambda: [0] * (3 + len(ENTITY_COLUMNS)))
+    for row in rows:
+        entry = totals[row[1]]
+        entry[0] += 1
+        entry[1] += int(row[2])
+        entry[2] += int(row[3])
+        for index, count in enumerate(row[5:], start=3):
+            entry[index] += int(count)
+    for table, bucket_format in ROLLUP_BUCKETS.items():
+        bucket = created_at.strftime(bucket_format)
+        conn.executemany(
+            f"""
+            INSERT INTO {table}
+            (bucket, risk_level, scans, risk_score_sum, sensitive_items, {_ENTITY_LIST})
+            VALUES (?, ?, ?, ?, ?, {_ENTITY_PLACEHOLDERS})
+            ON CONFLICT(bucket, risk_level) DO UPDATE SET
+                scans = scans + excluded.scans,
+                risk_score_sum = risk_score_sum + excluded.risk_score_sum,
+                sensitive_items = sensitive_items + excluded.sensitive_items,
+                {_ENTITY_UPDATES}
+            """,
+            [(bucket, level, *entry) for level, entry in totals.items()],
+        )
+
+
+def recent_scans(limit: int = TREND_SIZE) -> List[Dict[str, object]]:
+    """Latest scans across all workers, newest first."""
+    init_db()
+    with get_conn() as conn:
+        rows = conn.execute(
+            f"""
+            SELECT filename, risk_level, risk_score, {_ENTITY_LIST}
+            FROM scan_events
+            ORDER BY id DESC
+            LIMIT ?
+            """,
+            (limit,),
+        ).fetchall()
+    return [
+        {
+            "filename": row[0],
+            "risk_level": row[1],
+            "risk_score": row[2],
+            "counts": dict(zip(ENTITY_COLUMNS, row[3:])),
+        }
+        for row in rows
+    ]
+
+
+def scan_feed_version() -> Tuple[int, int]:
+    """``(min id, max id)`` of scan_events: changes whenever the dashboard data can.
+
+    Inserts move the max (and every rollup change comes with an insert);
+    retention pruning moves the min. Both are rowid lookups.
+    """
+    init_db()
+    with get_conn() as conn:
+        # Separate subqueries: SQLite only uses the rowid shortcut for a lone MIN/MAX.
+        low, high = conn.execute(
+            "SELECT (SELECT MIN(id) FROM scan_events), (SELECT MAX(id) FROM scan_events)"
+        ).fetchone()
+    return int(low or 0), int(high or 0)
+
+
+def latest_scan_id() -> int:
+    return scan_feed_version()[1]
+
+
+def dashboard_summary(recent: Sequence[Dict[str, object]] = ()) -> Dict[str, object]:
+    """Org-wide dashboard totals from the daily rollup.
+
+    ``recent`` (newest first, as returned by ``recent_scans``) supplies the
+    trend line.
+    """
+    init_db()
+    entity_sums = ", ".join(f"SUM({column})" for column in ENTITY_COLUMNS)
+    with get_conn() as conn:
+        rows = conn.execute(
+            f"""
+            SELECT risk_level, SUM(scans), SUM(risk_score_sum), {entity_sums}
+            FROM scan_rollup_daily
+            GROUP BY risk_level
+            """
+        ).fetchall()
+
+    risk_distribution = {level: 0 for level in RISK_LEVELS}
+    entity_totals = {column: 0 for column in ENTITY_COLUMNS}
+    total_scans = 0
+    score_sum = 0
+    for level, scans, level_score, *entities in rows:
+        risk_distribution[level] = risk_distribution.get(level, 0) + int(scans)
+        total_scans += int(scans)
+        score_sum += int(level_score)
+        for column, count in zip(ENTITY_COLUMNS, entities):
+            entity_totals[column] += int(count)
+
+    return {
+        "documents_scanned": total_scans,
+        "average_risk_score": round(score_sum / total_scans, 2) if total_scans else 0.0,
+        "risk_score_sum": score_sum,
+        "high_risk_ratio": round(risk_distribution["High"] / total_scans * 100, 2) if total_scans else 0.0,
+        "risk_distribution": risk_distribution,
+        "entity_totals": entity_totals,
+        "trend_scores": [int(entry["risk_score"]) for entry in reversed(recent)],
+    }
+
+
+def scan_volume(granularity: str = "daily", limit: int = 30) -> List[Dict[str, object]]:
+    """Per-bucket scan counts, oldest first, for the most recent ``limit`` buckets."""
+    table = f"scan_rollup_{granularity}"
+    if table not in ROLLUP_BUCKETS:
+        raise ValueError(f"Unknown rollup granularity: {granularity}")
+    init_db()
+    with get_conn() as conn:
+        rows = conn.execute(
+            f"""
+            SELECT bucket, SUM(scans), SUM(risk_score_sum)
+            FROM {table}
+            GROUP BY bucket
+            ORDER BY bucket DESC
+            LIMIT ?
+            """,
+            (limit,),
+        ).fetchall()
+    return [
+        {"bucket": bucket, "scans": int(scans), "average_risk_score": round(score / scans, 2)}
+        for bucket, scans, score in reversed(rows)
+    ]
@@ -0,0 +1,131 @@
+"""File-state manifest for incremental corpus rescans.
+
+Each scanned path is recorded with its size, mtime, content hash, the rules
+version it was scanned under and a compact result summary. Reruns consult
+this table to skip documents that have not changed since their last scan.
+Rows for files that a completed run no longer finds are pruned, so the
+table tracks the corpus instead of every path ever scanned.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from storage import db
+
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(path: Path) -> str:
+    """Return the SHA-256 hex digest of a file, read in fixed-size chunks."""
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ScanStateStore:
+    """Holds one connection for the duration of a corpus scan.
+
+    Lookups are primary-key reads; updates are buffered and written in one
+    transaction per ``flush`` so progress survives a crash or Ctrl-C up to
+    the last flushed batch.
+    """
+
+    def __init__(self) -> None:
+        db.init_db()
+        self._conn = db.connect()
+        self._pending: List[Tuple[object, ...]] = []
+
+    def __enter__(self) -> "ScanStateStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def get(self, path: str) -> Optional[Dict[str, object]]:
+        rows = self._conn.execute(
+            """
+            SELECT size, mtime_ns, content_hash, rules_version, status, summary_json
+            FROM scan_state WHERE path = ?
+            """,
+            (path,),
+        ).fetchall()
+        if not rows:
+            return None
+        size, mtime_ns, content_hash, rules_version, status, summary_json = rows[0]
+        return {
+            "size": size,
+            "mtime_ns": mtime_ns,
+            "content_hash": content_hash,
+            "rules_version": rules_version,
+            "status": status,
+            "summary": json.loads(summary_json),
+        }
+
+    def record(
+        self,
+        path: str,
+        size: int,
+        mtime_ns: int,
+        content_hash: str,
+        rules_version: str,
+        status: str,
+        summary: Dict[str, object],
+    ) -> None:
+        self._pending.append(
+            (path, size, mtime_ns, content_hash, rules_version, status, json.dumps(summary))
+        )
+
+    def paths_under(self, prefix: str) -> List[str]:
+        """Recorded paths that start with ``prefix`` (all of them for ``""``)."""
+        rows = self._conn.execute(
+            "SELECT path FROM scan_state WHERE substr(path, 1, ?) = ?",
+            (len(prefix), prefix),
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def delete(self, paths: Iterable[str]) -> int:
+        rows = [(path,) for path in paths]
+        if not rows:
+            return 0
+        with self._conn:
+            self._conn.executemany("DELETE FROM scan_state WHERE path = ?", rows)
+        return len(rows)
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        with self._conn:
+            self._conn.executemany(
+                """
+                INSERT INTO scan_state
+                (path, size, mtime_ns, content_hash, rules_version, status, summary_json)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(path) DO UPDATE SET
+                    size = excluded.size,
+                    mtime_ns = excluded.mtime_ns,
+                    content_hash = excluded.content_hash,
+                    rules_version = excluded.rules_version,
+                    status = excluded.status,
+                    summary_json = excluded.summary_json,
+                    scanned_at = CURRENT_TIMESTAMP
+                """,
+                self._pending,
+            )
+        self._pending = []
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            self._conn.close()
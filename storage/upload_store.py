@@ -0,0 +1,69 @@
+"""Content-addressed storage for uploaded documents.
+
+Uploads are streamed to a temporary file in the upload directory and hashed
+as they are written. The finished file is renamed to
+``<dir>/<hh>/<sha256><suffix>``. Identical bytes therefore land on one path
+whatever the client called them, and two concurrent uploads can no longer
+overwrite each other's files under a shared name. The suffix is kept because
+extraction dispatches on it.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, NamedTuple
+
+from werkzeug.utils import secure_filename
+
+from metrics import stage
+from storage.scan_state import HASH_CHUNK_SIZE
+
+
+class StoredUpload(NamedTuple):
+    path: Path
+    content_hash: str
+    filename: str
+    size: int
+
+
+def store_stream(stream: BinaryIO, filename: str, directory: str) -> StoredUpload:
+    """Copy ``stream`` into content-addressed storage under ``directory``."""
+    with stage("upload_save"):
+        return _store_stream(stream, filename, directory)
+
+
+def _store_stream(stream: BinaryIO, filename: str, directory: str) -> StoredUpload:
+    safe_name = secure_filename(filename) or "upload"
+    root = Path(directory)
+    root.mkdir(parents=True, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    handle = tempfile.NamedTemporaryFile(dir=root, prefix=".upload-", delete=False)
+    try:
+        with handle:
+            for chunk in iter(lambda: stream.read(HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+                handle.write(chunk)
+                size += len(chunk)
+        content_hash = digest.hexdigest()
+        target = root / content_hash[:2] / f"{content_hash}{Path(safe_name).suffix.lower()}"
+        target.parent.mkdir(exist_ok=True)
+        if target.exists():
+            os.unlink(handle.name)
+            # Refresh mtime so retention counts from the latest upload.
+            os.utime(target)
+        else:
+            os.replace(handle.name, target)
+    except BaseException:
+        if os.path.exists(handle.name):
+            os.unlink(handle.name)
+        raise
+    return StoredUpload(target, content_hash, safe_name, size)
+
+
+def store_upload(file_obj, directory: str) -> StoredUpload:
+    """Store a werkzeug ``FileStorage`` upload."""
+    return store_stream(file_obj.stream, file_obj.filename or "", directory)
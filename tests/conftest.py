@@ -0,0 +1,36 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Test modules import ``app``, which creates the database schema at import
+# time, and ``backend.logger``, which creates its log directory. Point both
+# at a scratch directory first so a test run never writes into the tree.
+_SESSION_DIR = Path(tempfile.mkdtemp(prefix="privguard-tests-"))
+os.environ["PRIVGUARD_LOG_DIR"] = str(_SESSION_DIR / "logs")
+
+import storage.db  # noqa: E402
+import tracing  # noqa: E402
+
+storage.db.DB_PATH = _SESSION_DIR / "audit.db"
+
+
+def pytest_sessionfinish(session, exitstatus):
+    storage.db.close_thread_conns()
+    shutil.rmtree(_SESSION_DIR, ignore_errors=True)
+
+
+@pytest.fixture(autouse=True)
+def _isolated_trace_file(tmp_path, monkeypatch):
+    # Sampled and failed traces from any test go to the test's own directory.
+    monkeypatch.setattr(tracing, "TRACE_PATH", tmp_path / "traces.jsonl")
+
+
+@pytest.fixture()
+def audit_db(tmp_path, monkeypatch):
+    """Point the audit database at the test's own directory and yield that directory."""
+    monkeypatch.setattr(storage.db, "DB_PATH", tmp_path / "audit.db")
+    yield tmp_path
+    storage.db.close_thread_conns()
@@ -0,0 +1,105 @@
+import gzip
+from datetime import datetime
+
+import pytest
+
+import ops.audit_export as audit_export
+import security.keys
+import storage.audit_archive as audit_archive
+import storage.audit_chain as audit_chain
+import storage.db
+from ops.audit_integrity import verify_audit_chain
+from storage.audit_repo import log_audit_events
+from storage.event_query import iter_events
+
+
+def _log_at(monkeypatch, when, actors):
+    class _At(datetime):
+        @classmethod
+        def utcnow(cls):
+            return when
+
+    monkeypatch.setattr(audit_chain, "datetime", _At)
+    log_audit_events(
+        {"event_type": "scan", "actor": actor, "source": "cli", "details": {"at": when.isoformat()}}
+        for actor in actors
+    )
+    monkeypatch.setattr(audit_chain, "datetime", datetime)
+
+
+@pytest.fixture()
+def archived_db(audit_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(security.keys, "SIGNING_KEY_PATH", tmp_path / "signing.key")
+    monkeypatch.setattr(audit_archive, "ARCHIVE_DIR", tmp_path / "archive")
+    monkeypatch.setattr(audit_export, "EXPORT_DIR", tmp_path / "exports")
+    monkeypatch.setattr(audit_chain, "CHAIN_ENABLED", True)
+    monkeypatch.setattr(audit_archive, "HOT_MONTHS", 1)
+    _log_at(monkeypatch, datetime(2024, 1, 10), ["alice", "bob", "alice"])
+    _log_at(monkeypatch, datetime(2024, 2, 5), ["bob", "alice"])
+    _log_at(monkeypatch, datetime(2024, 4, 2), ["alice", "bob"])
+    result = audit_archive.archive_sealed_months(now=datetime(2024, 4, 15))
+    yield result
+
+
+def test_sealing_moves_old_months_to_signed_segments(archived_db):
+    assert archived_db["sealed_periods"] == ["2024-01", "2024-02"]
+    assert archived_db["events_archived"] == 5
+    segments = audit_archive.list_segments()
+    assert [(s["first_id"], s["last_id"]) for s in segments] == [(1, 3), (4, 5)]
+    with gzip.open(segments[0]["path"], "rt", encoding="utf-8") as handle:
+        assert len(handle.read().splitlines()) == 4
+    with storage.db.get_conn() as conn:
+        assert [row[0] for row in conn.execute("SELECT id FROM audit_events")] == [6, 7]
+
+    assert audit_archive.verify_archive()["valid"]
+    assert verify_audit_chain()["valid"]
+    assert audit_archive.archive_sealed_months(now=datetime(2024, 4, 15))["sealed_periods"] == []
+
+
+def test_queries_and_exports_span_archive_and_hot_table(archived_db):
+    assert [e["id"] for e in iter_events("audit")] == [1, 2, 3, 4, 5, 6, 7]
+    assert [e["id"] for e in iter_events("audit", {"actor": "alice"})] == [1, 3, 5, 6]
+    newest = list(iter_events("audit", {}, limit=3, descending=True))
+    assert [e["id"] for e in newest] == [7, 6, 5]
+    older = list(iter_events("audit", {}, cursor=newest[-1]["id"], limit=3, descending=True))
+    assert [e["id"] for e in older] == [4, 3, 2]
+    page = list(iter_events("audit", {"since": "2024-02-01", "until": "2024-04-03"}))
+    assert [e["id"] for e in page] == [4, 5, 6, 7]
+    assert page[0]["details"] == {"at": "2024-02-05T00:00:00"}
+
+    result = audit_export.export_signed_audit(after_id=2)
+    assert (result["event_count"], result["first_id"], result["last_id"]) == (5, 3, 7)
+
+
+def test_tampered_segment_fails_verification(archived_db):
+    path = audit_archive.list_segments()[1]["path"]
+    with gzip.open(path, "rt", encoding="utf-8") as handle:
+        lines = handle.read().replace('"actor":"bob"', '"actor":"mallory"')
+    with gzip.open(path, "wt", encoding="utf-8") as handle:
+        handle.write(lines)
+
+    report = audit_archive.verify_archive()
+    assert not report["valid"] and report["error"].startswith("2024-02")
+
+
+def test_descending_archive_reads_stop_at_the_newest_segments_needed(archived_db, monkeypatch):
+    opened = []
+    segment_rows = audit_archive._segment_rows
+
+    def spy(segment):
+        opened.append(segment["period"])
+        return segment_rows(segment)
+
+    monkeypatch.setattr(audit_archive, "_segment_rows", spy)
+    page = list(iter_events("audit", {}, cursor=6, limit=2, descending=True))
+    assert [e["id"] for e in page] == [5, 4]
+    assert opened == ["2024-02"]
+
+    # Time ranges are not ordered by id: an earlier segment past ``until``
+    # must not hide a later one that is still in range.
+    with storage.db.get_conn() as conn:
+        conn.execute(
+            "UPDATE audit_archive_segments SET start_at = '2024-03-01 00:00:00' WHERE period = '2024-01'"
+        )
+    page = list(iter_events("audit", {"until": "2024-02-10"}))
+    assert [e["id"] for e in page] == [4, 5]
@@ -0,0 +1,47 @@
+import gzip
+import json
+from pathlib import Path
+
+import pytest
+
+import ops.audit_export as audit_export
+import security.keys
+from storage.audit_repo import log_audit_events
+
+
+@pytest.fixture()
+def audit_env(audit_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(security.keys, "SIGNING_KEY_PATH", tmp_path / "signing.key")
+    monkeypatch.setattr(audit_export, "EXPORT_DIR", tmp_path / "exports")
+    log_audit_events(
+        {"event_type": "scan", "actor": "tester", "source": "cli", "details": {"n": n, "b": 1}}
+        for n in range(5)
+    )
+    return tmp_path
+
+
+def test_streaming_export_pages_by_id_and_signs_canonical_jsonl(audit_env):
+    result = audit_export.export_signed_audit(after_id=1)
+    export_path = Path(result["export_file"])
+
+    lines = export_path.read_text(encoding="utf-8").splitlines()
+    header, events = json.loads(lines[0]), [json.loads(line) for line in lines[1:]]
+    assert header["after_id"] == 1
+    assert [event["id"] for event in events] == [2, 3, 4, 5]
+    assert lines[1] == json.dumps(events[0], sort_keys=True, separators=(",", ":"))
+    assert (result["event_count"], result["first_id"], result["last_id"]) == (4, 2, 5)
+    assert audit_export.verify_signed_export(export_path, Path(result["signature_file"]))
+
+    export_path.write_text("\n".join(lines[:-1]) + "\n", encoding="utf-8")
+    assert not audit_export.verify_signed_export(export_path, Path(result["signature_file"]))
+
+
+def test_gzip_export_verifies_against_uncompressed_bytes(audit_env, monkeypatch):
+    monkeypatch.setattr(audit_export, "PAGE_SIZE", 2)
+    result = audit_export.export_signed_audit(limit=3, compress=True)
+    export_path = Path(result["export_file"])
+
+    with gzip.open(export_path, "rt", encoding="utf-8") as handle:
+        assert len(handle.read().splitlines()) == 4
+    assert export_path.name.endswith(".jsonl.gz")
+    assert audit_export.verify_signed_export(export_path, Path(result["signature_file"]))
@@ -0,0 +1,67 @@
+from datetime import datetime
+
+import pytest
+
+import ops.retention as retention
+import security.keys
+import storage.audit_chain as audit_chain
+import storage.db
+from ops.audit_integrity import verify_audit_chain
+from storage.audit_repo import log_audit_events
+
+
+def _log(count):
+    log_audit_events(
+        {"event_type": "scan", "actor": "tester", "source": "cli", "details": {"n": n}}
+        for n in range(count)
+    )
+
+
+@pytest.fixture()
+def chained_db(audit_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(security.keys, "SIGNING_KEY_PATH", tmp_path / "signing.key")
+    monkeypatch.setattr(audit_chain, "CHAIN_ENABLED", True)
+    monkeypatch.setattr(audit_chain, "CHECKPOINT_INTERVAL", 3)
+    yield storage.db
+
+
+def test_chain_verifies_and_detects_edits_and_deletions(chained_db):
+    _log(4)
+    _log(3)
+    report = verify_audit_chain(page_size=2)
+    assert report["valid"]
+    assert report["rows_verified"] == 9
+    assert report["checkpoints_verified"] == 2
+
+    latest = verify_audit_chain(from_checkpoint=True)
+    assert latest["valid"] and latest["start_id"] == 8 and latest["rows_verified"] == 2
+
+    with chained_db.get_conn() as conn:
+        conn.execute("UPDATE audit_events SET actor = 'intruder' WHERE id = 2")
+    report = verify_audit_chain()
+    assert not report["valid"] and report["error_id"] == 2
+
+    with chained_db.get_conn() as conn:
+        conn.execute("DELETE FROM audit_events WHERE id = 2")
+    report = verify_audit_chain()
+    assert not report["valid"] and report["error_id"] == 3
+
+
+def test_retention_keeps_chain_verifiable_from_a_checkpoint(chained_db, monkeypatch):
+    class _Past(datetime):
+        @classmethod
+        def utcnow(cls):
+            return datetime(2000, 1, 1)
+
+    monkeypatch.setattr(audit_chain, "datetime", _Past)
+    _log(7)
+    monkeypatch.setattr(audit_chain, "datetime", datetime)
+    _log(2)
+
+    report = retention._cleanup_audit(90)
+
+    # Ids 1-7 predate the newest old checkpoint (id 8), which is kept as the anchor.
+    assert report["audit_deleted"] == 7
+    result = verify_audit_chain()
+    assert result["valid"] and result["start_id"] == 0
+    assert result["checkpoints_verified"] >= 1
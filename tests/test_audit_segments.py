@@ -0,0 +1,67 @@
+import json
+from pathlib import Path
+
+import pytest
+
+import ops.audit_segments as audit_segments
+import security.keys
+from storage.audit_repo import log_audit_events
+
+
+def _log(count):
+    log_audit_events(
+        {"event_type": "scan", "actor": "tester", "source": "cli", "details": {"n": n}}
+        for n in range(count)
+    )
+
+
+@pytest.fixture()
+def chain_env(audit_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(security.keys, "SIGNING_KEY_PATH", tmp_path / "signing.key")
+    monkeypatch.setattr(audit_segments, "CHAIN_DIR", tmp_path / "chain")
+    return tmp_path / "chain"
+
+
+def test_segments_export_only_new_events_and_chain(chain_env):
+    _log(3)
+    first = audit_segments.export_audit_segment()
+    assert (first["sequence"], first["event_count"], first["last_id"]) == (1, 3, 3)
+
+    assert audit_segments.export_audit_segment()["event_count"] == 0
+
+    _log(2)
+    second = audit_segments.export_audit_segment(compress=True)
+    assert (second["sequence"], second["first_id"], second["last_id"]) == (2, 4, 5)
+    assert second["prev_digest"] == first["digest"]
+    assert audit_segments.load_checkpoint()["digest"] == second["digest"]
+
+    full = audit_segments.verify_export_chain()
+    assert full["valid"] and full["segments_verified"] == 2
+
+    _log(1)
+    audit_segments.export_audit_segment()
+    resumed = audit_segments.verify_export_chain(trusted=full)
+    assert resumed["valid"] and resumed["segments_verified"] == 1
+    assert resumed["last_id"] == 6
+
+
+def test_chain_verification_detects_tampering_and_missing_segments(chain_env):
+    _log(2)
+    audit_segments.export_audit_segment()
+    _log(2)
+    audit_segments.export_audit_segment()
+
+    segment = chain_env / "audit_segment_000001.jsonl"
+    lines = segment.read_text(encoding="utf-8").splitlines()
+    event = json.loads(lines[1])
+    event["actor"] = "someone-else"
+    lines[1] = json.dumps(event, sort_keys=True, separators=(",", ":"))
+    original = segment.read_text(encoding="utf-8")
+    segment.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    result = audit_segments.verify_export_chain()
+    assert not result["valid"] and "signature mismatch" in result["error"]
+
+    segment.write_text(original, encoding="utf-8")
+    Path(chain_env / "audit_segment_000002.jsonl").unlink()
+    result = audit_segments.verify_export_chain()
+    assert not result["valid"] and result["segments_verified"] == 1
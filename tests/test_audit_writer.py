@@ -0,0 +1,72 @@
+import pytest
+
+import storage.audit_repo
+import storage.db
+from storage.audit_repo import AuditWriteError, AuditWriter
+
+
+@pytest.fixture()
+def writer(audit_db):
+    audit_writer = AuditWriter(queue_size=100, batch_size=50, flush_interval=5.0)
+    yield audit_writer
+    audit_writer.close()
+
+
+def _count(table):
+    with storage.db.get_conn() as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_writer_batches_events_until_flush(writer):
+    for index in range(10):
+        writer.submit("audit", ("scan", "tester", "cli", f'{{"n": {index}}}'))
+    writer.submit("scan", ("a.txt", "High", 90, 4, "cli", 1, 1, 1, 1))
+
+    assert writer.flush(timeout=5)
+    assert _count("audit_events") == 10
+    assert _count("scan_events") == 1
+    stats = writer.stats()
+    assert stats["events_written"] == 11
+    assert stats["batches_written"] == 1
+    assert stats["queue_depth"] == 0
+
+
+def test_durable_submit_returns_after_commit(writer):
+    writer.submit("audit", ("decrypt", "tester", "cli", "{}"), durable=True)
+
+    assert _count("audit_events") == 1
+
+
+def test_failed_batches_are_retried_and_durable_callers_see_the_error(writer, monkeypatch):
+    real_write = storage.audit_repo.write_event_rows
+    failures = {"left": storage.audit_repo.WRITE_RETRIES}
+
+    def flaky(audit_rows, scan_rows, durable=False):
+        if failures["left"]:
+            failures["left"] -= 1
+            raise storage.db.sqlite3.OperationalError("disk I/O error")
+        real_write(audit_rows, scan_rows, durable=durable)
+
+    monkeypatch.setattr(storage.audit_repo, "write_event_rows", flaky)
+    writer.submit("audit", ("scan", "tester", "cli", "{}"))
+    with pytest.raises(AuditWriteError):
+        writer.submit("audit", ("decrypt", "tester", "cli", "{}"), durable=True)
+    assert writer.stats()["retained"] == 2
+
+    # The kept batch goes out with the next write instead of being dropped.
+    assert writer.flush(timeout=10)
+    assert _count("audit_events") == 2
+    stats = writer.stats()
+    assert stats["retained"] == 0
+    assert stats["write_errors"] == storage.audit_repo.WRITE_RETRIES
+
+
+def test_dead_writer_thread_falls_back_to_synchronous_writes(writer):
+    writer.close()
+    assert not writer._thread.is_alive()
+
+    writer.submit("audit", ("decrypt", "tester", "cli", "{}"), durable=True)
+    writer.submit("scan", ("a.txt", "High", 90, 4, "cli", 1, 1, 1, 1))
+    assert writer.flush(timeout=5)
+    assert _count("audit_events") == 1
+    assert _count("scan_events") == 1
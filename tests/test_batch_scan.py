@@ -0,0 +1,122 @@
+import io
+import json
+import threading
+import zipfile
+
+import pytest
+
+import app as web_app
+import ops.batch_scan
+import storage.db
+from ops.batch_scan import store_batch_uploads, stream_batch
+from ops.jobs import JobRunner, run_scan_job
+from storage.audit_repo import flush_audit_writer
+
+
+class _Upload:
+    def __init__(self, name, data):
+        self.filename = name
+        self.stream = io.BytesIO(data)
+
+
+def _zip(entries):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, data in entries.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+@pytest.fixture()
+def batch_db(audit_db, tmp_path, monkeypatch):
+    monkeypatch.setitem(web_app.app.config, "UPLOAD_FOLDER", str(tmp_path / "uploads"))
+    yield tmp_path
+
+
+def test_zip_members_are_expanded_and_unsupported_ones_ignored(tmp_path):
+    archive = _zip({"docs/a.txt": b"one", "b.csv": b"two", "tool.exe": b"x", "__MACOSX/._a.txt": b"x"})
+    stored, skipped = store_batch_uploads(
+        [_Upload("bundle.zip", archive), _Upload("c.txt", b"three"), _Upload("bad.zip", b"nope")],
+        str(tmp_path),
+    )
+
+    assert sorted(upload.filename for upload in stored) == ["a.txt", "b.csv", "c.txt"]
+    assert skipped == [{"filename": "bad.zip", "error": "Not a valid zip archive"}]
+    with pytest.raises(ValueError):
+        store_batch_uploads([_Upload("bundle.zip", archive)], str(tmp_path), max_files=1)
+
+
+def test_batch_streams_one_line_per_file_and_logs_every_scan(batch_db, monkeypatch):
+    runner = JobRunner(workers=2)
+    monkeypatch.setattr(web_app, "get_job_runner", lambda: runner)
+    client = web_app.app.test_client()
+    with client.session_transaction() as sess:
+        sess["username"] = "reviewer"
+        sess["role"] = "reviewer"
+    try:
+        response = client.post(
+            "/scan/batch",
+            data={
+                "files": [
+                    (io.BytesIO(b"mail jane@example.com"), "a.txt"),
+                    (io.BytesIO(_zip({"b.txt": b"call 0712345678", "c.txt": b"nothing"})), "more.zip"),
+                ]
+            },
+        )
+        assert response.mimetype == "application/x-ndjson"
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    finally:
+        runner.close()
+        flush_audit_writer()
+
+    results, summary = lines[:-1], lines[-1]
+    assert sorted(line["filename"] for line in results) == ["a.txt", "b.txt", "c.txt"]
+    assert all(line["status"] == "done" and "risk_level" in line for line in results)
+    assert summary["batch_complete"] and summary["done"] == 3
+    with storage.db.get_conn() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM scan_events").fetchone()[0] == 3
+        assert conn.execute("SELECT COUNT(*) FROM audit_events WHERE event_type = 'scan'").fetchone()[0] == 3
+        assert (
+            conn.execute("SELECT COUNT(*) FROM audit_events WHERE event_type = 'scan_batch'").fetchone()[0]
+            == 1
+        )
+
+
+def test_disconnect_cancels_unstarted_files_and_audits_the_rest(batch_db, monkeypatch):
+    monkeypatch.setattr(ops.batch_scan, "EVENT_BATCH_SIZE", 1)
+    started, release = threading.Event(), threading.Event()
+
+    def scan(params, timings):
+        if params["filename"] == "b.txt":
+            started.set()
+            release.wait(5)
+        return run_scan_job(params, timings)
+
+    runner = JobRunner(workers=1, handlers={"scan": scan})
+    uploads, _ = store_batch_uploads(
+        [_Upload(name, f"mail {name}@example.com".encode()) for name in ("a.txt", "b.txt", "c.txt")],
+        str(batch_db / "uploads"),
+    )
+    try:
+        stream = stream_batch(runner, uploads, [], "reviewer")
+        first = json.loads(next(stream))
+        assert first["filename"] == "a.txt"
+        with storage.db.get_conn() as conn:
+            # Written as it arrived, not when the batch ends.
+            assert conn.execute("SELECT COUNT(*) FROM scan_events").fetchone()[0] == 1
+        assert started.wait(5)
+        threading.Timer(0.2, release.set).start()
+        stream.close()  # b.txt is running, c.txt still queued
+    finally:
+        runner.close()
+
+    with storage.db.get_conn() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM scan_events").fetchone()[0] == 2
+        details = json.loads(
+            conn.execute(
+                "SELECT details_json FROM audit_events WHERE event_type = 'scan_batch'"
+            ).fetchone()[0]
+        )
+        statuses = dict(conn.execute("SELECT json_extract(params_json, '$.filename'), status FROM jobs"))
+    assert (details["done"], details["cancelled"]) == (2, 1)
+    assert statuses == {"a.txt": "done", "b.txt": "done", "c.txt": "failed"}
@@ -0,0 +1,88 @@
+import json
+
+import config_loader
+import storage.db
+from ops.corpus_scan import is_corpus_input, iter_input_paths, scan_corpus
+
+
+def _make_corpus(root):
+    (root / "nested").mkdir()
+    (root / "a.txt").write_text("Phone 0712345678", encoding="utf-8")
+    (root / "nested" / "b.md").write_text("email person@example.org", encoding="utf-8")
+    (root / "ignored.bin").write_bytes(b"\x00\x01")
+
+
+def test_iter_input_paths_walks_directory_and_glob(tmp_path):
+    _make_corpus(tmp_path)
+
+    walked = sorted(p.name for p in iter_input_paths(str(tmp_path)))
+    globbed = sorted(p.name for p in iter_input_paths(str(tmp_path / "**" / "*.md")))
+
+    assert walked == ["a.txt", "b.md"]
+    assert globbed == ["b.md"]
+    assert is_corpus_input(str(tmp_path))
+    assert not is_corpus_input(str(tmp_path / "a.txt"))
+
+
+def test_scan_corpus_writes_jsonl_and_batches_events(audit_db, tmp_path):
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    _make_corpus(corpus)
+    output = tmp_path / "out.jsonl"
+
+    result = scan_corpus(str(corpus), output_path=output, workers=1, progress=None)
+
+    records = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    assert result["files_scanned"] == 2
+    assert {r["status"] for r in records} == {"ok"}
+    with storage.db.get_conn() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM scan_events").fetchone()[0] == 2
+        assert conn.execute("SELECT COUNT(*) FROM audit_events").fetchone()[0] == 2
+
+
+def test_incremental_rescan_skips_unchanged_files(audit_db, tmp_path):
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    _make_corpus(corpus)
+    output = tmp_path / "out.jsonl"
+
+    first = scan_corpus(str(corpus), output, workers=1, progress=None, incremental=True)
+    (corpus / "a.txt").write_text("Phone 0798765432 changed", encoding="utf-8")
+    second = scan_corpus(str(corpus), output, workers=1, progress=None, incremental=True)
+
+    assert (first["files_scanned"], first["files_skipped"]) == (2, 0)
+    assert (second["files_scanned"], second["files_skipped"]) == (1, 1)
+    records = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    unchanged = [r for r in records if r["status"] == "unchanged"]
+    assert unchanged[0]["risk"]["counts"]["emails"] == 1
+
+
+def test_incremental_rescan_prunes_state_for_files_that_are_gone(audit_db, tmp_path):
+    corpus = tmp_path / "corpus"
+    other = tmp_path / "other"
+    corpus.mkdir()
+    other.mkdir()
+    _make_corpus(corpus)
+    (other / "c.txt").write_text("Phone 0712345678", encoding="utf-8")
+    output = tmp_path / "out.jsonl"
+
+    scan_corpus(str(other), output, workers=1, progress=None, incremental=True)
+    first = scan_corpus(str(corpus), output, workers=1, progress=None, incremental=True)
+    (corpus / "nested" / "b.md").unlink()
+    second = scan_corpus(str(corpus), output, workers=1, progress=None, incremental=True)
+
+    assert (first["files_pruned"], second["files_pruned"]) == (0, 1)
+    with storage.db.get_conn() as conn:
+        paths = sorted(row[0] for row in conn.execute("SELECT path FROM scan_state"))
+    # State recorded for another input tree is left alone.
+    assert paths == [str(corpus / "a.txt"), str(other / "c.txt")]
+
+
+def test_rules_version_covers_the_detection_engine_version(monkeypatch):
+    before = config_loader.rules_version()
+    monkeypatch.setattr(config_loader, "DETECTION_ENGINE_VERSION", "test-bump")
+    config_loader.rules_version.cache_clear()
+    try:
+        assert config_loader.rules_version() != before
+    finally:
+        config_loader.rules_version.cache_clear()
@@ -0,0 +1,110 @@
+import threading
+
+import app as web_app
+import ops.dashboard_feed
+from ops.dashboard_feed import DashboardFeed, close_event_streams, scan_delta, sse_stream
+from storage.audit_repo import flush_audit_writer, log_scan_event
+
+
+def _scan(name, level="High", score=80, emails=1):
+    log_scan_event(name, level, score, emails, source="web", counts={"emails": emails})
+    flush_audit_writer()
+
+
+def test_scan_delta_sums_counters():
+    delta = scan_delta(
+        [
+            {"id": 4, "filename": "a", "risk_level": "High", "risk_score": 90, "counts": {"emails": 2}},
+            {"id": 5, "filename": "b", "risk_level": "Low", "risk_score": 10, "counts": {"kra_pins": 1}},
+        ]
+    )
+    assert delta["last_id"] == 5
+    assert delta["counters"]["documents_scanned"] == 2
+    assert delta["counters"]["risk_score_sum"] == 100
+    assert delta["counters"]["risk_distribution"] == {"High": 1, "Medium": 0, "Low": 1}
+    assert delta["counters"]["entity_totals"]["emails"] == 2
+
+
+def test_feed_replays_missed_scans_then_streams_new_ones(audit_db):
+    _scan("old.txt")
+    _scan("missed.txt", level="Low", score=5)
+    feed = DashboardFeed(poll_interval=3600)
+    stream = sse_stream(feed, after=1, keepalive=0.01)
+
+    replay = next(stream)
+    assert replay.startswith("id: 2\nevent: scans\n")
+    assert "missed.txt" in replay and "old.txt" not in replay
+
+    assert next(stream) == ": keep-alive\n\n"
+    _scan("live.txt")
+    assert feed.poll_once()["last_id"] == 3
+    live = next(stream)
+    assert live.startswith("id: 3\nevent: scans\n") and "live.txt" in live
+    stream.close()
+    assert feed.poll_once() is None
+
+
+def test_snapshot_supports_etag_revalidation(audit_db):
+    client = web_app.app.test_client()
+    with client.session_transaction() as sess:
+        sess["username"] = "reviewer"
+        sess["role"] = "reviewer"
+    first = client.get("/api/dashboard-data")
+    etag = first.headers["ETag"]
+    assert first.get_json()["last_event_id"] == 0
+
+    assert client.get("/api/dashboard-data", headers={"If-None-Match": etag}).status_code == 304
+    _scan("new.txt")
+    changed = client.get("/api/dashboard-data", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.get_json()["summary"]["documents_scanned"] == 1
+    assert changed.headers["ETag"] != etag
+
+
+def test_streams_end_with_their_last_id_after_max_lifetime_or_on_shutdown(audit_db, monkeypatch):
+    _scan("one.txt")
+    feed = DashboardFeed(poll_interval=3600)
+    expiring = sse_stream(feed, after=0, keepalive=0.01, max_seconds=0.05)
+    assert next(expiring).startswith("id: 1\nevent: scans\n")
+    frames = list(expiring)
+    assert frames[-1] == "id: 1\nretry: 1000\n\n"
+    assert set(frames[:-1]) <= {": keep-alive\n\n"}
+
+    monkeypatch.setattr(ops.dashboard_feed, "_closing", threading.Event())
+    monkeypatch.setattr(ops.dashboard_feed, "_feed", feed)
+    monkeypatch.setattr(ops.dashboard_feed, "_feed_pid", ops.dashboard_feed.os.getpid())
+    live = sse_stream(feed, after=1, keepalive=60)
+    done = threading.Event()
+    frames = []
+
+    def consume():
+        frames.extend(live)
+        done.set()
+
+    threading.Thread(target=consume, daemon=True).start()
+    close_event_streams()
+    assert done.wait(5)
+    assert frames == ["id: 1\nretry: 1000\n\n"]
+    assert not ops.dashboard_feed.acquire_stream_slot()
+
+
+def test_event_streams_are_capped_per_process(audit_db, monkeypatch):
+    monkeypatch.setattr(ops.dashboard_feed, "MAX_STREAMS", 1)
+    monkeypatch.setattr(ops.dashboard_feed, "_open_streams", 0)
+    monkeypatch.setattr(ops.dashboard_feed, "_closing", threading.Event())
+    _scan("replayed.txt")  # gives each stream a first chunk without waiting
+    client = web_app.app.test_client()
+    with client.session_transaction() as sess:
+        sess["username"] = "reviewer"
+        sess["role"] = "reviewer"
+
+    first = client.get("/api/dashboard-events?after=0", buffered=False)
+    assert first.status_code == 200
+    busy = client.get("/api/dashboard-events?after=0", buffered=False)
+    assert busy.status_code == 503
+    assert busy.headers["Retry-After"]
+    first.close()
+    again = client.get("/api/dashboard-events?after=0", buffered=False)
+    assert again.status_code == 200
+    again.close()
+    assert ops.dashboard_feed._open_streams == 0
@@ -0,0 +1,38 @@
+import threading
+
+import pytest
+
+import storage.db
+from storage.audit_repo import flush_audit_writer, log_audit_event
+
+
+def test_connections_use_wal_and_are_reused_per_thread(audit_db):
+    storage.db.init_db()
+    with storage.db.get_conn() as first:
+        mode = first.execute("PRAGMA journal_mode").fetchone()[0]
+    with storage.db.get_conn() as second:
+        assert second is first
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(storage.db.get_conn().__enter__()))
+    thread.start()
+    thread.join()
+
+    assert mode == "wal"
+    assert other[0] is not first
+
+
+def test_failed_block_rolls_back_without_losing_committed_events(audit_db):
+    log_audit_event("scan", "tester", "cli", {"n": 1})
+    flush_audit_writer()
+
+    with pytest.raises(RuntimeError):
+        with storage.db.get_conn() as conn:
+            conn.execute(
+                "INSERT INTO audit_events (event_type, actor, source, details_json) "
+                "VALUES ('scan', 'tester', 'cli', '{}')"
+            )
+            raise RuntimeError("boom")
+
+    with storage.db.get_conn() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM audit_events").fetchone()[0] == 1
@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+import storage.db
+from storage.audit_repo import log_audit_events, log_scan_events
+from storage.event_query import iter_events, normalize_timestamp
+
+
+@pytest.fixture()
+def events_db(audit_db):
+    log_audit_events(
+        {
+            "event_type": "scan" if n % 2 else "protect",
+            "actor": "alice" if n < 4 else "bob",
+            "source": "cli",
+            "details": {"n": n},
+        }
+        for n in range(8)
+    )
+    log_scan_events(
+        {
+            "filename": f"f{n}.txt",
+            "risk_level": "High" if n % 3 == 0 else "Low",
+            "risk_score": n * 10,
+            "total_sensitive_items": n,
+            "source": "web",
+            "counts": {"emails": n},
+        }
+        for n in range(6)
+    )
+    yield storage.db
+
+
+def test_keyset_pages_cover_every_match_once(events_db):
+    first = list(iter_events("audit", {"actor": "alice"}, limit=3))
+    rest = list(iter_events("audit", {"actor": "alice"}, cursor=first[-1]["id"], limit=3))
+
+    assert [event["details"]["n"] for event in first + rest] == [0, 1, 2, 3]
+    assert [event["id"] for event in iter_events("audit", {"event_type": "scan"}, page_size=2)] == [2, 4, 6, 8]
+    newest = list(iter_events("audit", {}, limit=2, descending=True))
+    assert [event["id"] for event in newest] == [8, 7]
+    assert [event["id"] for event in iter_events("audit", {}, cursor=7, descending=True)] == list(range(6, 0, -1))
+
+
+def test_scan_filters_and_time_range(events_db):
+    high = list(iter_events("scan", {"risk_level": "High"}))
+    assert [event["filename"] for event in high] == ["f0.txt", "f3.txt"]
+    assert high[1]["counts"]["emails"] == 3
+
+    assert list(iter_events("scan", {"until": "2000-01-01"})) == []
+    assert len(list(iter_events("scan", {"since": "2000-01-01T00:00:00Z"}))) == 6
+    json.dumps(high)
+
+
+def test_invalid_filters_are_rejected(events_db):
+    # Raised on the call itself, before the generator is first advanced.
+    with pytest.raises(ValueError):
+        iter_events("scan", {"actor": "alice"})
+    with pytest.raises(ValueError):
+        iter_events("audit", {"since": "last tuesday"})
+    with pytest.raises(ValueError):
+        iter_events("tickets")
+    assert normalize_timestamp("2024-03-01T08:15:00Z") == "2024-03-01 08:15:00"
+    assert normalize_timestamp("2024-03-01T11:15:00+03:00") == "2024-03-01 08:15:00"
+    assert normalize_timestamp("2024-03-01T00:30:00-02:00") == "2024-03-01 02:30:00"
@@ -0,0 +1,307 @@
+import io
+import threading
+
+import pytest
+
+import app as web_app
+import ops.jobs
+import storage.db
+from ops.jobs import JobQueueFull, JobRunner
+from ops.scheduler import PriorityScheduler
+from storage import job_store
+from storage.audit_repo import flush_audit_writer
+from storage.upload_store import store_stream
+
+
+def test_scan_job_persists_result_and_stage_timings(audit_db):
+    sample = audit_db / "sample.txt"
+    sample.write_text("Contact jane@example.com or 0712345678", encoding="utf-8")
+    runner = JobRunner(workers=1)
+    try:
+        job_id = runner.submit("scan", "reviewer", {"path": str(sample)})
+        assert runner.wait(job_id, 10)
+    finally:
+        runner.close()
+
+    job = job_store.get_job(job_id)
+    assert job["status"] == "done"
+    assert job["actor"] == "reviewer"
+    assert job["result"]["filename"] == "sample.txt"
+    assert job["result"]["counts"]["emails"] == 1
+    for stage in ("queue_wait_ms", "extract_ms", "detect_ms", "classify_ms", "total_ms"):
+        assert stage in job["timings_ms"]
+    flush_audit_writer()
+    with storage.db.get_conn() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM scan_events").fetchone()[0] == 1
+
+
+def test_repeat_content_reuses_stored_result(audit_db):
+    sample = io.BytesIO(b"Reach me at jane@example.com")
+    upload = store_stream(sample, "first.txt", str(audit_db / "uploads"))
+    params = {"path": str(upload.path), "filename": "first.txt", "content_hash": upload.content_hash}
+    runner = JobRunner(workers=1)
+    try:
+        first = runner.submit("scan", "reviewer", params)
+        runner.wait(first, 10)
+        second = runner.submit("scan", "reviewer", {**params, "filename": "copy.txt"})
+        runner.wait(second, 10)
+    finally:
+        runner.close()
+        flush_audit_writer()
+
+    fresh, reused = job_store.get_job(first), job_store.get_job(second)
+    assert fresh["result"]["reused_result"] is False
+    assert reused["result"]["reused_result"] is True
+    assert reused["result"]["filename"] == "copy.txt"
+    assert reused["result"]["findings"] == fresh["result"]["findings"]
+    assert "extract_ms" not in reused["timings_ms"]
+
+
+def test_stored_results_are_not_reused_across_file_types(audit_db):
+    uploads = [
+        store_stream(io.BytesIO(b"Reach me at jane@example.com"), name, str(audit_db / "uploads"))
+        for name in ("a.txt", "a.exe")
+    ]
+    assert uploads[0].content_hash == uploads[1].content_hash
+    runner = JobRunner(workers=1)
+    try:
+        job_ids = []
+        for upload in uploads:
+            params = {"path": str(upload.path), "content_hash": upload.content_hash}
+            job_ids.append(runner.submit("scan", "reviewer", params))
+            runner.wait(job_ids[-1], 10)
+    finally:
+        runner.close()
+        flush_audit_writer()
+
+    text_job, exe_job = (job_store.get_job(job_id) for job_id in job_ids)
+    assert text_job["status"] == "done"
+    # Same bytes, but the suffix selects extraction: .exe is unsupported.
+    assert exe_job["status"] == "failed"
+    assert "Unsupported" in exe_job["error"]
+
+
+def test_failed_job_records_error(audit_db):
+    runner = JobRunner(workers=1)
+    try:
+        job_id = runner.submit("scan", "reviewer", {"path": str(audit_db / "missing.txt")})
+        runner.wait(job_id, 10)
+    finally:
+        runner.close()
+
+    job = job_store.get_job(job_id)
+    assert job["status"] == "failed"
+    assert job["error"]
+    assert job["result"] is None
+
+
+def test_full_queue_is_refused_with_retry_after(audit_db):
+    def blocked(params, timings):
+        release.wait(10)
+        return {}
+
+    release = threading.Event()
+    scheduler = PriorityScheduler(capacity={"interactive": 1, "batch": 1, "background": 1})
+    runner = JobRunner(workers=1, scheduler=scheduler, handlers={"slow": blocked})
+    try:
+        first = runner.submit("slow", "a", {})
+        # Wait until the worker has taken the first job off the queue.
+        for _ in range(100):
+            if runner.stats()["running"]:
+                break
+            release.wait(0.01)
+        runner.submit("slow", "a", {})
+        with pytest.raises(JobQueueFull) as refused:
+            runner.submit("slow", "a", {})
+        assert refused.value.retry_after >= 1
+        # Other classes have their own capacity.
+        runner.submit("slow", "a", {}, priority="batch")
+    finally:
+        release.set()
+        runner.close()
+    assert job_store.get_job(first)["status"] == "done"
+    assert runner.stats()["rejected"] == 1
+    with storage.db.get_conn() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] == 3
+
+
+def test_stopping_runner_hands_queued_jobs_to_another_runner(audit_db):
+    def blocked(params, timings):
+        release.wait(10)
+        return {"ran": params["n"]}
+
+    release = threading.Event()
+    stopping = JobRunner(workers=1, handlers={"slow": blocked})
+    try:
+        first = stopping.submit("slow", "a", {"n": 1})
+        for _ in range(100):
+            if stopping.stats()["running"]:
+                break
+            release.wait(0.01)
+        queued = [stopping.submit("slow", "a", {"n": n}) for n in (2, 3)]
+        assert stopping.release_queue() == 2
+        # Work submitted while stopping is released too, not run here.
+        late = stopping.submit("slow", "a", {"n": 4})
+        assert stopping.wait(queued[0], 0)
+        # Running jobs are not waited for past the timeout.
+        assert stopping.close(timeout=0.1) is False
+    finally:
+        release.set()
+    assert stopping.close(timeout=10) is True
+    assert job_store.get_job(first)["status"] == "done"
+    assert {job_store.get_job(job_id)["status"] for job_id in [*queued, late]} == {"queued"}
+    # Released jobs survive the dead-owner sweep.
+    assert job_store.fail_interrupted_jobs() == 0
+
+    sibling = JobRunner(workers=1, handlers={"slow": blocked})
+    try:
+        for job_id in [*queued, late]:
+            for _ in range(500):
+                if job_store.get_job(job_id)["status"] == "done":
+                    break
+                release.wait(0.01)
+    finally:
+        sibling.close()
+    assert [job_store.get_job(job_id)["result"] for job_id in [*queued, late]] == [
+        {"ran": 2}, {"ran": 3}, {"ran": 4}
+    ]
+    assert job_store.claim_released_jobs() == []
+
+
+def test_running_runner_fails_jobs_of_workers_that_died_later(audit_db, monkeypatch):
+    monkeypatch.setattr(ops.jobs, "ADOPT_INTERVAL_SECONDS", 0.01)
+    runner = JobRunner(workers=1)
+    try:
+        # A sibling worker was killed mid-job after this runner started.
+        job_id = job_store.create_job("scan", "reviewer", {"path": "x"})
+        with storage.db.get_conn() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'running', owner = ? WHERE id = ?",
+                (f"{job_store.socket.gethostname()}:999999", job_id),
+            )
+        for _ in range(500):
+            if job_store.get_job(job_id)["status"] == "failed":
+                break
+            threading.Event().wait(0.01)
+    finally:
+        runner.close()
+    assert job_store.get_job(job_id)["error"] == "Interrupted: worker process exited"
+
+
+def test_scan_ids_outlive_other_finished_jobs(audit_db):
+    ids = {}
+    for kind, status in (("scan", "done"), ("scan", "failed"), ("protect", "done")):
+        ids[kind, status] = job_store.create_job(kind, "reviewer", {"path": "x"})
+        job_store.mark_finished(ids[kind, status], None, None if status == "done" else "boom", {})
+    with storage.db.get_conn() as conn:
+        conn.execute("UPDATE jobs SET finished_at = datetime('now', '-2 hours')")
+
+    assert job_store.purge_finished_jobs(3600, 86400) == 2
+    assert job_store.get_job(ids["scan", "done"])["status"] == "done"
+    assert job_store.get_job(ids["protect", "done"]) is None
+
+
+def test_interrupted_jobs_from_dead_processes_are_failed(audit_db):
+    job_id = job_store.create_job("scan", "reviewer", {"path": "x"})
+    with storage.db.get_conn() as conn:
+        conn.execute(
+            "UPDATE jobs SET owner = ? WHERE id = ?", (f"{job_store.socket.gethostname()}:999999", job_id)
+        )
+    live_id = job_store.create_job("scan", "reviewer", {"path": "y"})
+
+    assert job_store.fail_interrupted_jobs() == 1
+    assert job_store.get_job(job_id)["status"] == "failed"
+    assert job_store.get_job(live_id)["status"] == "queued"
+
+
+def test_web_scan_answers_inline_or_with_job_links(audit_db, monkeypatch):
+    monkeypatch.setitem(web_app.app.config, "UPLOAD_FOLDER", str(audit_db))
+    runner = JobRunner(workers=1)
+    monkeypatch.setattr(web_app, "get_job_runner", lambda: runner)
+    client = web_app.app.test_client()
+    with client.session_transaction() as sess:
+        sess["username"] = "reviewer"
+        sess["role"] = "reviewer"
+    try:
+        inline = client.post("/scan", data={"file": (io.BytesIO(b"mail a@b.co"), "a.txt")})
+        assert inline.status_code == 200
+        assert inline.get_json()["filename"] == "a.txt"
+
+        queued = client.post("/scan?async=1", data={"file": (io.BytesIO(b"none"), "b.txt")})
+        assert queued.status_code == 202
+        links = queued.get_json()
+        runner.wait(links["job_id"], 10)
+        status = client.get(links["status_url"]).get_json()
+        assert status["status"] == "done"
+        events = client.get(links["events_url"]).get_data(as_text=True)
+        assert "event: done" in events
+
+        assert status["priority"] == "interactive"
+        assert client.post("/scan?priority=urgent", data={"file": (io.BytesIO(b"x"), "c.txt")}).status_code == 400
+
+        with client.session_transaction() as sess:
+            sess["username"] = "someone-else"
+        assert client.get(links["status_url"]).status_code == 404
+    finally:
+        runner.close()
+        flush_audit_writer()
+
+
+def test_web_scan_returns_429_with_retry_after_when_full(audit_db, monkeypatch):
+    scheduler = PriorityScheduler(capacity={"interactive": 0, "batch": 0, "background": 0})
+    runner = JobRunner(workers=1, scheduler=scheduler)
+    monkeypatch.setitem(web_app.app.config, "UPLOAD_FOLDER", str(audit_db))
+    monkeypatch.setattr(web_app, "get_job_runner", lambda: runner)
+    client = web_app.app.test_client()
+    with client.session_transaction() as sess:
+        sess["username"] = "reviewer"
+        sess["role"] = "reviewer"
+    try:
+        response = client.post("/scan", data={"file": (io.BytesIO(b"x"), "a.txt")})
+    finally:
+        runner.close()
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert not (audit_db / "a.txt").exists()
+
+
+def test_protect_and_verify_reuse_a_scan_id(audit_db, monkeypatch):
+    monkeypatch.setitem(web_app.app.config, "UPLOAD_FOLDER", str(audit_db / "uploads"))
+    monkeypatch.setattr(web_app, "OUTPUT_FOLDER", str(audit_db))
+    extractions = []
+    real_read = ops.jobs.read_document_text
+    monkeypatch.setattr(
+        ops.jobs, "read_document_text", lambda path: extractions.append(path) or real_read(path)
+    )
+    runner = JobRunner(workers=1)
+    monkeypatch.setattr(web_app, "get_job_runner", lambda: runner)
+    client = web_app.app.test_client()
+    with client.session_transaction() as sess:
+        sess["username"] = "admin"
+        sess["role"] = "admin"
+    try:
+        scanned = client.post("/scan", data={"file": (io.BytesIO(b"Email jane@example.com"), "a.txt")})
+        scan_id = scanned.get_json()["scan_id"]
+        assert scan_id
+
+        protected = client.post("/protect", data={"scan_id": scan_id, "action": "redact"})
+        assert protected.status_code == 200
+        redacted = protected.get_json()["preview"]
+        assert "jane@example.com" not in redacted
+
+        verified = client.post(
+            "/verify-redaction",
+            data={"scan_id": scan_id, "protected": (io.BytesIO(redacted.encode()), "a.redacted.txt")},
+        )
+        assert verified.status_code == 200
+        assert verified.get_json()["quality_status"] == "PASS"
+        assert len(extractions) == 1
+
+        assert client.post("/protect", data={"scan_id": "missing", "action": "redact"}).status_code == 404
+        with client.session_transaction() as sess:
+            sess["username"] = "officer"
+            sess["role"] = "officer"
+        assert client.post("/protect", data={"scan_id": scan_id, "action": "redact"}).status_code == 404
+    finally:
+        runner.close()
+        flush_audit_writer()
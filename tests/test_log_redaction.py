@@ -0,0 +1,43 @@
+import logging
+import sys
+
+from security.log_redaction import RedactingFilter
+
+
+def _record(msg, args=()):
+    return logging.LogRecord("app", logging.INFO, __file__, 1, msg, args, None)
+
+
+def test_filter_redacts_args_and_constant_messages():
+    redacting = RedactingFilter()
+    with_args = _record("sms to %s for %s", ("0712345678", "person@example.org"))
+    constant = _record("callback from 0712345678 failed")
+
+    assert redacting.filter(with_args) and redacting.filter(constant)
+    assert with_args.getMessage() == "sms to [REDACTED] for [REDACTED]"
+    assert constant.getMessage() == "callback from [REDACTED] failed"
+
+
+def test_filter_leaves_clean_records_untouched():
+    redacting = RedactingFilter(action="mask")
+    clean = _record("GET %s status=%d", ("/health", 200))
+    repeated = _record("request completed")
+
+    redacting.filter(clean)
+    redacting.filter(repeated)
+
+    assert clean.getMessage() == "GET /health status=200"
+    assert repeated.msg == "request completed"
+
+
+def test_filter_scrubs_exception_text():
+    redacting = RedactingFilter()
+    try:
+        raise ValueError("bad phone 0712345678")
+    except ValueError:
+        record = logging.LogRecord("app", logging.ERROR, __file__, 1, "failed", (), sys.exc_info())
+
+    redacting.filter(record)
+
+    assert "0712345678" not in record.exc_text
+    assert "[REDACTED]" in record.exc_text
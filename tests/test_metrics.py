@@ -0,0 +1,84 @@
+import pytest
+
+import app as web_app
+import metrics
+from classification import build_risk_summary
+from detection import detect_sensitive_data
+from extraction import read_document_text
+from metrics import collect_timings, render_prometheus, stage
+from ops.jobs import JobRunner
+
+
+def test_stages_are_noops_when_disabled_and_not_collecting(monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", False)
+    before = metrics.STAGE_SECONDS.snapshot().get(("idle",))
+    assert stage("idle") is stage("other")
+    with stage("idle"):
+        pass
+    assert metrics.STAGE_SECONDS.snapshot().get(("idle",)) == before
+
+
+def test_collect_timings_records_pipeline_stages_even_when_disabled(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", False)
+    document = tmp_path / "doc.txt"
+    document.write_text("Call 0712345678 or mail jane@example.com", encoding="utf-8")
+
+    with collect_timings() as timings:
+        findings = detect_sensitive_data(read_document_text(document))
+        build_risk_summary(findings)
+        with stage("extract"):
+            pass
+
+    for key in ("extract_ms", "detect_ms", "detect_emails_ms", "detect_phone_numbers_ms", "classify_ms"):
+        assert key in timings
+    # Outside the block, stages are no-ops again.
+    assert stage("extract") is stage("detect")
+
+
+def test_render_prometheus_exposes_histograms_and_counters(monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", True)
+    with stage("unit_test_stage"):
+        pass
+    with pytest.raises(ValueError):
+        with stage("unit_test_stage"):
+            raise ValueError("boom")
+    detect_sensitive_data("mail jane@example.com")
+
+    text = render_prometheus(["custom_metric 1"])
+    assert "# TYPE privguard_stage_seconds histogram" in text
+    assert 'privguard_stage_seconds_bucket{stage="unit_test_stage",le="+Inf"} 2' in text
+    assert 'privguard_stage_seconds_count{stage="unit_test_stage"} 2' in text
+    assert 'privguard_stage_errors_total{stage="unit_test_stage"} 1' in text
+    assert 'privguard_findings_total{entity="emails"}' in text
+    assert text.endswith("custom_metric 1\n")
+
+
+def test_metrics_endpoint_is_admin_only(audit_db, monkeypatch):
+    runner = JobRunner(workers=1)
+    monkeypatch.setattr(web_app, "get_job_runner", lambda: runner)
+    monkeypatch.setenv("PRIVGUARD_METRICS_TOKEN", "scrape-secret")
+    client = web_app.app.test_client()
+    try:
+        assert client.get("/metrics").status_code == 401
+        token = client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"})
+        assert token.status_code == 200
+        assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+
+        with client.session_transaction() as sess:
+            sess["username"] = "reviewer"
+            sess["role"] = "reviewer"
+        assert client.get("/metrics").status_code == 403
+
+        with client.session_transaction() as sess:
+            sess["username"] = "admin"
+            sess["role"] = "admin"
+        response = client.get("/metrics")
+    finally:
+        runner.close()
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    body = response.get_data(as_text=True)
+    assert 'privguard_job_queue_depth{priority="interactive"} 0' in body
+    assert 'privguard_job_queue_wait_seconds_count{priority="batch"} 0' in body
+    assert "privguard_process_info{pid=" in body
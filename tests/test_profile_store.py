@@ -0,0 +1,64 @@
+import json
+import threading
+
+from storage.profile_store import JsonProfileStore, SqliteProfileStore
+
+
+def test_json_store_caches_until_the_file_changes(tmp_path, monkeypatch):
+    path = tmp_path / "profiles.json"
+    path.write_text(json.dumps({"ann": {"display_name": "Ann"}}), encoding="utf-8")
+    store = JsonProfileStore(path)
+    reads = []
+    real_read = type(path).read_text
+    monkeypatch.setattr(
+        type(path), "read_text", lambda self, **kw: reads.append(self) or real_read(self, **kw)
+    )
+
+    assert store.get("ann") == {"display_name": "Ann", "avatar_url": ""}
+    assert store.get("ann")["display_name"] == "Ann"
+    assert len(reads) == 1
+
+    # Another process replaces the file.
+    replacement = tmp_path / "other.json"
+    replacement.write_text(json.dumps({"ann": {"display_name": "Annie"}}), encoding="utf-8")
+    replacement.replace(path)
+    assert store.get("ann")["display_name"] == "Annie"
+    assert store.get("bob") == {"display_name": "bob", "avatar_url": ""}
+
+
+def test_json_store_concurrent_updates_keep_every_write(tmp_path):
+    path = tmp_path / "profiles.json"
+    stores = [JsonProfileStore(path), JsonProfileStore(path)]
+
+    def update(index):
+        stores[index % 2].update(f"user{index}", display_name=f"User {index}")
+
+    threads = [threading.Thread(target=update, args=(index,)) for index in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    saved = json.loads(path.read_text(encoding="utf-8"))
+    assert len(saved) == 20
+    assert not list(tmp_path.glob(".profiles-*"))
+    assert stores[0].update("user3", avatar_url="/a.png") == {
+        "display_name": "User 3",
+        "avatar_url": "/a.png",
+    }
+
+
+def test_sqlite_store_imports_json_and_updates_fields(audit_db, tmp_path):
+    legacy = tmp_path / "profiles.json"
+    legacy.write_text(
+        json.dumps({"ann": {"display_name": "Ann", "avatar_url": "/ann.png"}}), encoding="utf-8"
+    )
+    store = SqliteProfileStore(import_path=legacy)
+    assert store.get("ann") == {"display_name": "Ann", "avatar_url": "/ann.png"}
+    assert store.update("ann", display_name="Annie")["avatar_url"] == "/ann.png"
+    assert store.update("bob", avatar_url="/bob.png") == {
+        "display_name": "bob",
+        "avatar_url": "/bob.png",
+    }
+    # A second store instance does not re-import over newer rows.
+    assert SqliteProfileStore(import_path=legacy).get("ann")["display_name"] == "Annie"
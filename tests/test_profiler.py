@@ -0,0 +1,102 @@
+import io
+import pstats
+import tracemalloc
+
+import pytest
+
+import app as web_app
+import ops.profiler
+import storage.db
+from ops.jobs import JobRunner
+from ops.profiler import ProfilerBusy, format_profile_report, profile_document
+from storage.audit_repo import flush_audit_writer
+
+SAMPLE = "Call 0712345678 or mail jane@example.com about ID 12345678.\n" * 20
+
+
+def test_profile_document_reports_stages_hot_functions_and_pstats(tmp_path):
+    document = tmp_path / "doc.txt"
+    document.write_text(SAMPLE, encoding="utf-8")
+    dump = tmp_path / "out" / "doc.pstats"
+
+    report = profile_document(document, action="mask", top=5, sort="cumulative", pstats_path=dump)
+
+    assert [row["stage"] for row in report["stages"]] == [
+        "extract", "detect", "classify", "mask", "verify_redaction"
+    ]
+    for row in report["stages"]:
+        assert row["wall_ms"] >= 0 and row["peak_kb"] >= 0
+    assert report["total"]["peak_kb"] > 0
+    assert "detect_emails_ms" in report["stage_timings_ms"]
+    assert report["quality_status"] == "PASS"
+
+    hot = report["hot_functions"]
+    assert [item["rank"] for item in hot] == [1, 2, 3, 4, 5]
+    cumulative = [item["cumulative_ms"] for item in hot]
+    assert cumulative == sorted(cumulative, reverse=True)
+    assert not any("ops/profiler.py" in item["function"] for item in hot)
+    assert any(item["function"].startswith("detection.py:") for item in hot)
+
+    assert pstats.Stats(str(dump)).total_calls > 0
+    assert not tracemalloc.is_tracing()
+
+    text = format_profile_report(report)
+    assert "verify_redaction" in text
+    assert "Hot functions (by cumulative):" in text
+    assert f"pstats written to {dump}" in text
+
+
+def test_profile_document_validates_arguments_and_runs_one_at_a_time(tmp_path):
+    document = tmp_path / "doc.txt"
+    document.write_text(SAMPLE, encoding="utf-8")
+    with pytest.raises(ValueError):
+        profile_document(document, action="shred")
+    with pytest.raises(ValueError):
+        profile_document(document, sort="name")
+
+    with ops.profiler._profile_lock:
+        with pytest.raises(ProfilerBusy):
+            profile_document(document)
+
+    report = profile_document(document, action="encrypt")
+    assert report["stages"][-1]["stage"] == "encrypt"
+    assert "quality_status" not in report
+
+
+def test_admin_profile_endpoint_is_admin_only(audit_db, monkeypatch):
+    monkeypatch.setitem(web_app.app.config, "UPLOAD_FOLDER", str(audit_db))
+    runner = JobRunner(workers=1)
+    monkeypatch.setattr(web_app, "get_job_runner", lambda: runner)
+    client = web_app.app.test_client()
+
+    def upload():
+        return {"file": (io.BytesIO(SAMPLE.encode()), "doc.txt"), "top": "3"}
+
+    try:
+        with client.session_transaction() as sess:
+            sess["username"] = "officer"
+            sess["role"] = "officer"
+        assert client.post("/admin/profile", data=upload()).status_code == 403
+
+        with client.session_transaction() as sess:
+            sess["username"] = "admin"
+            sess["role"] = "admin"
+        response = client.post("/admin/profile", data=upload())
+        text = client.post("/admin/profile", data={**upload(), "format": "text"})
+    finally:
+        runner.close()
+        flush_audit_writer()
+
+    assert response.status_code == 200
+    report = response.get_json()
+    assert report["input_file"] == "doc.txt"
+    assert len(report["hot_functions"]) == 3
+    assert text.status_code == 200
+    assert text.mimetype == "text/plain"
+    assert text.get_data(as_text=True).startswith("Profile: doc.txt (redact,")
+
+    with storage.db.get_conn() as conn:
+        actors = conn.execute(
+            "SELECT actor FROM audit_events WHERE event_type = 'profile_document'"
+        ).fetchall()
+    assert [row[0] for row in actors] == ["admin", "admin"]
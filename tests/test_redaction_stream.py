@@ -0,0 +1,47 @@
+import io
+
+from detection import detect_sensitive_data
+from protection import mask_text, redact_text
+from redaction_stream import LineRedactor, redact_stream
+
+
+SAMPLE = (
+    "INFO login phone=0712345678 id 12345678\n"
+    "INFO GET /health 200\n"
+    "WARN contact person@example.org pin A123456789B\n"
+    "partial line without newline 0798765432"
+)
+
+
+def test_line_redactor_matches_protection_semantics():
+    findings = detect_sensitive_data(SAMPLE)
+
+    assert LineRedactor("redact").apply(SAMPLE) == redact_text(SAMPLE, findings)
+    assert LineRedactor("mask").apply(SAMPLE) == mask_text(SAMPLE, findings)
+
+
+def test_redact_stream_aggregates_audit_events():
+    emitted = []
+    sink = io.BytesIO()
+
+    result = redact_stream(io.BytesIO(SAMPLE.encode("utf-8")), sink, emit=emitted.append)
+
+    output = sink.getvalue().decode("utf-8")
+    assert "0712345678" not in output and "0798765432" not in output
+    assert output.count("\n") == SAMPLE.count("\n")
+    assert result["lines"] == 4
+    assert len(emitted) == 1
+    assert emitted[0]["values_rewritten"]["phone_numbers"] == 2
+
+
+def test_line_redactor_counts_per_call_on_a_shared_instance():
+    redactor = LineRedactor("redact")
+    first, second = {}, {}
+
+    redactor.apply(SAMPLE, first)
+    redactor.apply("callback 0712345678", second)
+    redacted = redactor.apply(SAMPLE)
+
+    assert first["phone_numbers"] == 2
+    assert second == {"phone_numbers": 1}
+    assert "0712345678" not in redacted
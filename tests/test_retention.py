@@ -0,0 +1,28 @@
+import ops.retention as retention
+import storage.db
+
+
+def test_cleanup_audit_deletes_old_rows_in_batches(audit_db, monkeypatch):
+    monkeypatch.setitem(retention.RETENTION, "delete_batch_size", 3)
+    monkeypatch.setitem(retention.RETENTION, "delete_pause_ms", 0)
+    storage.db.init_db()
+    with storage.db.get_conn() as conn:
+        for index in range(7):
+            conn.execute(
+                "INSERT INTO audit_events (created_at, event_type, actor, source, details_json) "
+                "VALUES (datetime('now', '-100 day'), 'scan', 'tester', 'cli', '{}')"
+            )
+        conn.execute(
+            "INSERT INTO audit_events (event_type, actor, source, details_json) "
+            "VALUES ('scan', 'tester', 'cli', '{}')"
+        )
+
+    report = retention._cleanup_audit(90)
+
+    assert report == {"audit_deleted": 7, "scan_events_deleted": 0}
+    with storage.db.get_conn() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM audit_events").fetchone()[0] == 1
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM audit_events WHERE created_at < '2000-01-01'"
+        ).fetchall()
+    assert "idx_audit_events_created_at" in str(plan)
@@ -0,0 +1,82 @@
+import sqlite3
+
+import pytest
+
+from storage.audit_repo import flush_audit_writer, log_scan_event, log_scan_events
+from storage.scan_rollups import dashboard_summary, recent_scans, scan_volume
+
+
+def test_rollups_aggregate_scans_incrementally(audit_db):
+    log_scan_events(
+        [
+            {
+                "filename": "a.txt",
+                "risk_level": "High",
+                "risk_score": 90,
+                "total_sensitive_items": 5,
+                "source": "cli",
+                "counts": {"national_ids": 2, "emails": 3},
+            },
+            {
+                "filename": "b.txt",
+                "risk_level": "Low",
+                "risk_score": 10,
+                "total_sensitive_items": 1,
+                "source": "cli",
+                "counts": {"phone_numbers": 1},
+            },
+        ]
+    )
+    log_scan_event("c.txt", "High", 80, 2, source="web", counts={"kra_pins": 2})
+    flush_audit_writer()
+
+    recent = recent_scans()
+    summary = dashboard_summary(recent)
+
+    assert [scan["filename"] for scan in recent] == ["c.txt", "b.txt", "a.txt"]
+    assert recent[0]["counts"]["kra_pins"] == 2
+    assert summary["documents_scanned"] == 3
+    assert summary["average_risk_score"] == 60.0
+    assert summary["high_risk_ratio"] == 66.67
+    assert summary["risk_distribution"] == {"High": 2, "Medium": 0, "Low": 1}
+    assert summary["entity_totals"] == {
+        "national_ids": 2,
+        "phone_numbers": 1,
+        "emails": 3,
+        "kra_pins": 2,
+    }
+    assert summary["trend_scores"] == [90, 10, 80]
+    assert sum(bucket["scans"] for bucket in scan_volume("hourly")) == 3
+    assert scan_volume("daily")[-1]["scans"] == 3
+
+
+def test_rollups_are_backfilled_for_existing_databases(audit_db):
+    conn = sqlite3.connect(audit_db / "audit.db")
+    conn.execute(
+        """
+        CREATE TABLE scan_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            filename TEXT NOT NULL,
+            risk_level TEXT NOT NULL,
+            risk_score INTEGER NOT NULL,
+            total_sensitive_items INTEGER NOT NULL,
+            source TEXT NOT NULL
+        )
+        """
+    )
+    conn.executemany(
+        "INSERT INTO scan_events (created_at, filename, risk_level, risk_score, total_sensitive_items, source) "
+        "VALUES (?, ?, ?, ?, ?, 'cli')",
+        [("2024-01-01 10:00:00", "old1", "Medium", 40, 2), ("2024-01-02 11:30:00", "old2", "Medium", 60, 4)],
+    )
+    conn.commit()
+    conn.close()
+
+    summary = dashboard_summary()
+
+    assert summary["documents_scanned"] == 2
+    assert summary["risk_distribution"]["Medium"] == 2
+    assert [bucket["bucket"] for bucket in scan_volume("daily")] == ["2024-01-01", "2024-01-02"]
+    with pytest.raises(ValueError):
+        scan_volume("weekly")
@@ -0,0 +1,121 @@
+import threading
+
+import pytest
+
+import extraction
+from ops.scheduler import PriorityScheduler, SchedulerFull, retry_after_seconds
+
+
+def _drain(scheduler, count):
+    return [scheduler.get()[0] for _ in range(count)]
+
+
+def test_classes_are_served_in_priority_order():
+    scheduler = PriorityScheduler()
+    scheduler.put_nowait("bg", "background", "ops")
+    scheduler.put_nowait("bulk", "batch", "alice")
+    scheduler.put_nowait("upload", "interactive", "bob")
+
+    assert _drain(scheduler, 3) == ["upload", "bulk", "bg"]
+
+
+def test_users_are_served_round_robin_within_a_class():
+    scheduler = PriorityScheduler()
+    for index in range(3):
+        scheduler.put_nowait(f"alice-{index}", "batch", "alice")
+    scheduler.put_nowait("bob-0", "batch", "bob")
+
+    assert _drain(scheduler, 4) == ["alice-0", "bob-0", "alice-1", "alice-2"]
+
+
+def test_admission_refuses_full_class_and_per_user_overflow():
+    scheduler = PriorityScheduler(
+        capacity={"interactive": 2, "batch": 3, "background": 1}, max_per_user=2
+    )
+    scheduler.put_nowait(1, "batch", "alice")
+    scheduler.put_nowait(2, "batch", "alice")
+    with pytest.raises(SchedulerFull):
+        scheduler.put_nowait(3, "batch", "alice")
+    scheduler.put_nowait(4, "batch", "bob")
+    with pytest.raises(SchedulerFull) as full:
+        scheduler.check_admission("batch", "carol")
+    assert full.value.priority == "batch"
+    # Interactive capacity is untouched by the batch backlog.
+    scheduler.check_admission("interactive", "carol")
+    assert scheduler.ahead_of("interactive") == 0
+    assert scheduler.ahead_of("background") == 3
+
+
+def test_queue_wait_is_recorded_per_class():
+    scheduler = PriorityScheduler()
+    scheduler.put_nowait("a", "interactive", "u")
+    scheduler.put_nowait("b", "batch", "u")
+    _drain(scheduler, 2)
+
+    stats = scheduler.stats()
+    assert stats["interactive"]["queue_wait"]["count"] == 1
+    assert stats["batch"]["queue_wait"]["count"] == 1
+    assert stats["background"]["queue_wait"]["count"] == 0
+    assert stats["batch"]["queue_wait"]["buckets"]["300.0"] == 1
+
+
+def test_close_releases_blocked_consumers():
+    scheduler = PriorityScheduler()
+    results = []
+    consumer = threading.Thread(target=lambda: results.append(scheduler.get()))
+    consumer.start()
+    scheduler.close()
+    consumer.join(5)
+    assert results == [None]
+
+
+def test_close_can_discard_queued_items():
+    scheduler = PriorityScheduler()
+    scheduler.put_nowait("a", "interactive", "u")
+    scheduler.put_nowait("b", "batch", "v")
+    assert sorted(scheduler.close(discard=True)) == ["a", "b"]
+    assert scheduler.depth() == 0
+    assert scheduler.get() is None
+
+
+def test_remove_drops_matching_items_and_keeps_the_rest_in_order():
+    scheduler = PriorityScheduler()
+    for item in ("a1", "a2", "a3"):
+        scheduler.put_nowait(item, "batch", "u")
+    scheduler.put_nowait("b1", "batch", "v")
+    assert scheduler.remove(lambda item: item in {"a2", "b1"}) == ["a2", "b1"]
+    assert scheduler.depth("batch") == 2
+    assert [scheduler.get()[0] for _ in range(2)] == ["a1", "a3"]
+
+
+def test_retry_after_scales_with_backlog():
+    assert retry_after_seconds(0, 2.0, 2) == 1
+    assert retry_after_seconds(10, 2.0, 2) == 10
+    assert retry_after_seconds(100000, 2.0, 1) == 300
+
+
+def test_ocr_concurrency_cap(monkeypatch):
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def fake_ocr(image, config=""):
+        with lock:
+            active.append(1)
+            peak.append(len(active))
+        threading.Event().wait(0.02)
+        with lock:
+            active.pop()
+        return "text"
+
+    monkeypatch.setattr(extraction.pytesseract, "image_to_string", fake_ocr)
+    extraction.set_ocr_concurrency(2)
+    try:
+        threads = [threading.Thread(target=extraction._run_ocr, args=(None,)) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        extraction.set_ocr_concurrency(None)
+    assert max(peak) <= 2
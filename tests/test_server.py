@@ -0,0 +1,159 @@
+import os
+import re
+import signal
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+from ops.server import PooledWSGIServer
+
+
+ROOT = Path(__file__).resolve().parents[1]
+PID_SERVER = """
+import os
+from ops.server import PreforkServer
+
+def app(environ, start_response):
+    start_response("200 OK", [("Content-Type", "text/plain")])
+    return [str(os.getpid()).encode()]
+
+PreforkServer(app, port=0, workers=1, threads=2, max_requests=2, max_requests_jitter=0).run()
+"""
+STREAM_SERVER = """
+import os
+import time
+from ops.server import PreforkServer
+
+def app(environ, start_response):
+    start_response("200 OK", [("Content-Type", "text/plain")])
+    if environ["PATH_INFO"] == "/stream":
+        def forever():
+            yield (str(os.getpid()) + "\\n").encode()
+            while True:
+                time.sleep(0.05)
+                yield b"."
+        return forever()
+    return [str(os.getpid()).encode()]
+
+PreforkServer(
+    app, port=0, workers=1, threads=4, max_requests=2, max_requests_jitter=0, graceful_timeout=1
+).run()
+"""
+
+
+def _get(url):
+    with urllib.request.urlopen(url, timeout=10) as response:
+        return response.read().decode()
+
+
+def _read_until_closed(stream):
+    """Read until the server closes the connection (EOF or reset); return the seconds taken."""
+    started = time.monotonic()
+    try:
+        while stream.read(1):
+            pass
+    except OSError:
+        pass
+    finally:
+        stream.close()
+    return time.monotonic() - started
+
+
+def _start(script):
+    proc = subprocess.Popen([sys.executable, "-c", script], cwd=ROOT, stderr=subprocess.PIPE, text=True)
+    line = ""
+    while "Serving on" not in line:
+        line = proc.stderr.readline()
+        assert line, "server exited before it started"
+    return proc, re.search(r"http://[\d.]+:\d+", line).group(0)
+
+
+def test_pooled_server_serves_requests_from_its_thread_pool():
+    def app(environ, start_response):
+        start_response("200 OK", [("Content-Type", "text/plain")])
+        return [environ["PATH_INFO"].encode()]
+
+    server = PooledWSGIServer("127.0.0.1", 0, app, threads=2)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05})
+    thread.start()
+    try:
+        assert _get(f"http://127.0.0.1:{server.port}/hello") == "/hello"
+    finally:
+        server.shutdown()
+        thread.join(timeout=10)
+    assert not thread.is_alive()
+    assert server.drain(5) is True
+
+
+def test_pooled_server_drain_closes_connections_left_open():
+    def app(environ, start_response):
+        start_response("200 OK", [("Content-Type", "text/plain")])
+
+        def forever():
+            while True:
+                yield b"."
+                time.sleep(0.05)
+
+        return forever()
+
+    server = PooledWSGIServer("127.0.0.1", 0, app, threads=2)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05})
+    thread.start()
+    stream = urllib.request.urlopen(f"http://127.0.0.1:{server.port}/events", timeout=10)
+    assert stream.read(1) == b"."
+    server.shutdown()
+    thread.join(timeout=10)
+
+    started = time.monotonic()
+    assert server.drain(0.3) is False
+    assert time.monotonic() - started < 2
+    assert _read_until_closed(stream) < 2
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="pre-fork server needs os.fork")
+def test_prefork_workers_recycle_after_max_requests_and_stop_on_sigterm():
+    proc, url = _start(PID_SERVER)
+    try:
+        pids = [_get(url) for _ in range(6)]
+        assert pids[0] == pids[1]
+        # Each worker exits once its budget is spent and a fresh one takes over.
+        assert len(set(pids)) >= 2
+        assert str(proc.pid) not in pids
+
+        proc.send_signal(signal.SIGTERM)
+        assert proc.wait(timeout=30) == 0
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        proc.stderr.close()
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="pre-fork server needs os.fork")
+def test_recycling_worker_is_replaced_while_a_stream_keeps_it_draining():
+    proc, url = _start(STREAM_SERVER)
+    try:
+        stream = urllib.request.urlopen(f"{url}/stream", timeout=10)
+        old_pid = stream.readline().decode().strip()
+        # Second request spends the budget; the worker stops accepting.
+        assert _get(url) == old_pid
+        started = time.monotonic()
+        new_pid = _get(url)
+        assert new_pid != old_pid
+        # The replacement answered before the old worker's 1s drain ran out.
+        assert time.monotonic() - started < 1
+        # Then the open stream is cut instead of holding the old worker forever.
+        assert _read_until_closed(stream) < 2
+
+        proc.send_signal(signal.SIGTERM)
+        assert proc.wait(timeout=30) == 0
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        proc.stderr.close()
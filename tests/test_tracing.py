@@ -0,0 +1,105 @@
+import io
+import json
+
+import pytest
+
+import app as web_app
+import storage.db
+import tracing
+from metrics import stage
+from ops.jobs import JobRunner
+from storage.audit_repo import flush_audit_writer, log_audit_event
+
+
+def _spans(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_nested_spans_share_a_trace_and_carry_attributes(monkeypatch):
+    monkeypatch.setattr(tracing, "SAMPLE_RATE", 1.0)
+    with tracing.trace("job.scan", trace_id="t-1", job_id="j-1") as trace_id:
+        with stage("extract"):
+            tracing.set_attributes(pages=3)
+            with tracing.span("ocr_page", page=1):
+                tracing.set_attributes(chars=42)
+    assert trace_id == "t-1"
+    assert tracing.current_trace_id() is None
+
+    spans = {item["name"]: item for item in _spans(tracing.TRACE_PATH)}
+    assert {item["trace_id"] for item in spans.values()} == {"t-1"}
+    assert spans["job.scan"]["parent_id"] is None
+    assert spans["job.scan"]["attributes"] == {"job_id": "j-1"}
+    assert spans["extract"]["parent_id"] == spans["job.scan"]["span_id"]
+    assert spans["extract"]["attributes"] == {"pages": 3}
+    assert spans["ocr_page"]["parent_id"] == spans["extract"]["span_id"]
+    assert spans["ocr_page"]["attributes"] == {"page": 1, "chars": 42}
+
+
+def test_sampling_keeps_slow_and_failed_traces(monkeypatch):
+    monkeypatch.setattr(tracing, "SAMPLE_RATE", 0.0)
+    with tracing.trace("fast"):
+        pass
+    assert not tracing.TRACE_PATH.exists()
+
+    with pytest.raises(ValueError):
+        with tracing.trace("broken"):
+            with stage("detect"):
+                raise ValueError("bad input")
+    spans = _spans(tracing.TRACE_PATH)
+    assert [item["name"] for item in spans] == ["detect", "broken"]
+    assert spans[0]["error"] == "ValueError: bad input"
+
+    monkeypatch.setattr(tracing, "SLOW_THRESHOLD_MS", 0)
+    with tracing.trace("slow"):
+        pass
+    assert _spans(tracing.TRACE_PATH)[-1]["name"] == "slow"
+
+
+def test_trace_file_rotates(monkeypatch):
+    monkeypatch.setattr(tracing, "SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(tracing, "MAX_BYTES", 400)
+    monkeypatch.setattr(tracing, "BACKUP_COUNT", 2)
+    for _ in range(6):
+        with tracing.trace("request", padding="x" * 100):
+            pass
+    path = tracing.TRACE_PATH
+    assert path.exists()
+    assert path.with_name(path.name + ".1").exists()
+    assert path.with_name(path.name + ".2").exists()
+    assert not path.with_name(path.name + ".3").exists()
+
+
+def test_disabled_tracing_is_a_noop(monkeypatch):
+    monkeypatch.setattr(tracing, "ENABLED", False)
+    with tracing.trace("request") as trace_id:
+        tracing.set_attributes(ignored=True)
+        assert tracing.current_trace_id() is None
+    assert trace_id is None
+    assert not tracing.TRACE_PATH.exists()
+
+
+def test_web_scan_trace_id_reaches_job_spans_and_audit_details(audit_db, monkeypatch):
+    monkeypatch.setattr(tracing, "SAMPLE_RATE", 1.0)
+    monkeypatch.setitem(web_app.app.config, "UPLOAD_FOLDER", str(audit_db))
+    runner = JobRunner(workers=1)
+    monkeypatch.setattr(web_app, "get_job_runner", lambda: runner)
+    client = web_app.app.test_client()
+    with client.session_transaction() as sess:
+        sess["username"] = "reviewer"
+        sess["role"] = "reviewer"
+    try:
+        response = client.post("/scan", data={"file": (io.BytesIO(b"mail a@b.co"), "a.txt")})
+        log_audit_event("outside", "tester", "test", {})
+    finally:
+        runner.close()
+        flush_audit_writer()
+
+    assert response.status_code == 200
+    trace_id = response.headers["X-Trace-Id"]
+    names = {item["name"] for item in _spans(tracing.TRACE_PATH) if item["trace_id"] == trace_id}
+    assert {"http POST /scan", "upload_save", "job.scan", "extract", "detect_emails"} <= names
+
+    with storage.db.get_conn() as conn:
+        rows = dict(conn.execute("SELECT event_type, details_json FROM audit_events").fetchall())
+    assert json.loads(rows["scan"])["trace_id"] == trace_id
+    assert "trace_id" not in json.loads(rows["outside"])
@@ -0,0 +1,38 @@
+import hashlib
+import io
+
+from storage.upload_store import store_stream
+
+
+def test_identical_content_shares_one_path(tmp_path):
+    first = store_stream(io.BytesIO(b"same bytes"), "a.txt", str(tmp_path))
+    second = store_stream(io.BytesIO(b"same bytes"), "renamed.TXT", str(tmp_path))
+
+    assert first.content_hash == hashlib.sha256(b"same bytes").hexdigest()
+    assert first.path == second.path
+    assert first.path.name == f"{first.content_hash}.txt"
+    assert (first.filename, second.filename) == ("a.txt", "renamed.TXT")
+    assert first.path.read_bytes() == b"same bytes"
+    assert not list(tmp_path.glob(".upload-*"))
+
+
+def test_same_name_different_content_do_not_overwrite(tmp_path):
+    first = store_stream(io.BytesIO(b"one"), "card.png", str(tmp_path))
+    second = store_stream(io.BytesIO(b"two"), "card.png", str(tmp_path))
+
+    assert first.path != second.path
+    assert first.path.read_bytes() == b"one"
+    assert second.path.read_bytes() == b"two"
+    assert second.size == 3
+
+
+def test_failed_stream_leaves_no_temp_file(tmp_path):
+    class Broken(io.BytesIO):
+        def read(self, size=-1):
+            raise OSError("client went away")
+
+    try:
+        store_stream(Broken(), "a.txt", str(tmp_path))
+    except OSError:
+        pass
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,88 @@
+import threading
+import time
+
+import pytest
+
+from ops.watcher import DropFolderWatcher
+
+
+def test_polling_watcher_processes_settled_files_once(tmp_path):
+    drop = tmp_path / "drop"
+    outputs = drop / "outputs"
+    outputs.mkdir(parents=True)
+    (drop / "existing.txt").write_text("already here", encoding="utf-8")
+    seen = []
+    watcher = DropFolderWatcher(
+        [drop],
+        seen.append,
+        workers=1,
+        debounce_seconds=0.0,
+        poll_interval=0.0,
+        use_inotify=False,
+        ignore_dirs=[outputs],
+    )
+    watcher.start()
+
+    (drop / "new.txt").write_text("Phone 0712345678", encoding="utf-8")
+    (outputs / "new.redacted.txt").write_text("[REDACTED]", encoding="utf-8")
+    (drop / "notes.bin").write_bytes(b"\x00")
+    for _ in range(3):
+        watcher.run_once(timeout=0.01)
+    deadline = time.monotonic() + 2
+    while not seen and time.monotonic() < deadline:
+        time.sleep(0.01)
+    watcher.stop()
+
+    assert [p.name for p in seen] == ["new.txt"]
+    stats = watcher.stats()
+    assert stats["processed"] == 1
+    assert stats["queue_depth"] == 0
+
+
+def test_stop_drops_queued_files_instead_of_draining_them(tmp_path):
+    started, release = threading.Event(), threading.Event()
+    seen = []
+
+    def handler(path):
+        seen.append(path.name)
+        started.set()
+        release.wait(2)
+
+    watcher = DropFolderWatcher(
+        [tmp_path], handler, workers=1, debounce_seconds=0.0, poll_interval=0.0, use_inotify=False
+    )
+    watcher.start()
+    for name in ("a.txt", "b.txt", "c.txt"):
+        (tmp_path / name).write_text("Phone 0712345678", encoding="utf-8")
+    watcher.run_once(timeout=0.01)
+    watcher.run_once(timeout=0.01)
+    assert started.wait(2)
+
+    stopper = threading.Timer(0.05, release.set)
+    stopper.start()
+    dropped = watcher.stop()
+    stopper.join()
+
+    assert len(seen) == 1
+    assert sorted(p.name for p in dropped) == sorted({"a.txt", "b.txt", "c.txt"} - set(seen))
+    assert watcher.stats()["dropped"] == 2
+
+
+def test_inotify_watcher_picks_up_files_in_directories_moved_in(tmp_path):
+    pytest.importorskip("inotify_simple")
+    drop, staging = tmp_path / "drop", tmp_path / "staging"
+    drop.mkdir()
+    (staging / "nested").mkdir(parents=True)
+    (staging / "nested" / "report.txt").write_text("Phone 0712345678", encoding="utf-8")
+    seen = []
+    watcher = DropFolderWatcher([drop], seen.append, workers=1, debounce_seconds=0.0)
+    assert watcher.backend == "inotify"
+    watcher.start()
+
+    staging.rename(drop / "batch")
+    deadline = time.monotonic() + 2
+    while not seen and time.monotonic() < deadline:
+        watcher.run_once(timeout=0.05)
+    watcher.stop()
+
+    assert [p.name for p in seen] == ["report.txt"]
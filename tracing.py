@@ -0,0 +1,228 @@
+"""Minimal local tracing for PRIVGUARD AI.
+
+``with trace("job.scan", trace_id=...)`` opens a root span. Every
+``metrics.stage`` and ``span`` inside it becomes a nested child span. Spans
+carry attributes such as bytes, page counts, matches and cache hits, set with
+``set_attributes``. Sampling is tail-based. Every trace's spans are
+buffered in memory, and the keep/drop decision is made when the root ends.
+A kept trace is appended to a rotating JSONL file (``tracing.path``), one
+span per line:
+
+* traces slower than ``slow_threshold_ms`` or containing an error are always kept;
+* of the rest, ``sample_rate`` are kept at random.
+
+Deciding at the end is what lets slow and failed traces through, at the cost
+of recording spans for traces that are then dropped.
+
+Trace ids are propagated from web requests into the jobs they submit, and
+``storage.audit_repo`` records the active trace id in audit event details.
+Outside a trace every helper here is a no-op.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from config_loader import load_system_config
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows has no fcntl
+    fcntl = None
+
+
+SYSTEM_CONFIG = load_system_config()
+TRACING_CONFIG = SYSTEM_CONFIG.get("tracing", {})
+ENABLED = bool(TRACING_CONFIG.get("enabled", True))
+TRACE_PATH = Path(TRACING_CONFIG.get("path", "logs/traces.jsonl"))
+SAMPLE_RATE = float(TRACING_CONFIG.get("sample_rate", 0.1))
+SLOW_THRESHOLD_MS = float(TRACING_CONFIG.get("slow_threshold_ms", 5000))
+MAX_BYTES = int(TRACING_CONFIG.get("max_bytes", 10 * 1024 * 1024))
+BACKUP_COUNT = int(TRACING_CONFIG.get("backup_count", 5))
+
+_current: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar(
+    "privguard_span", default=None
+)
+_write_lock = threading.Lock()
+
+
+class _Trace:
+    __slots__ = ("trace_id", "spans")
+
+    def __init__(self, trace_id: str) -> None:
+        self.trace_id = trace_id
+        self.spans: List[Span] = []
+
+
+class Span:
+    """One timed operation within a trace."""
+
+    __slots__ = (
+        "trace", "span_id", "parent_id", "name", "attributes", "error", "duration_ms", "started_at", "start"
+    )
+
+    def __init__(
+        self, trace: _Trace, name: str, parent_id: Optional[str], attributes: Dict[str, Any]
+    ) -> None:
+        self.trace = trace
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.error: Optional[str] = None
+        self.duration_ms = 0.0
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+
+    def to_dict(self) -> Dict[str, Any]:
+        record = {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": round(self.started_at, 6),
+            "duration_ms": self.duration_ms,
+            "attributes": self.attributes,
+        }
+        if self.error is not None:
+            record["error"] = self.error
+        return record
+
+
+def current_trace_id() -> Optional[str]:
+    current = _current.get()
+    return current.trace.trace_id if current is not None else None
+
+
+def set_attributes(**attributes: Any) -> None:
+    """Add attributes to the innermost open span (no-op outside a trace)."""
+    current = _current.get()
+    if current is not None:
+        current.attributes.update(attributes)
+
+
+SpanHandle = Tuple[Span, contextvars.Token]
+
+
+def start_span(name: str, **attributes: Any) -> Optional[SpanHandle]:
+    """Open a child of the current span; returns None outside a trace."""
+    parent = _current.get()
+    if parent is None:
+        return None
+    child = Span(parent.trace, name, parent.span_id, attributes)
+    return child, _current.set(child)
+
+
+def end_span(handle: Optional[SpanHandle], error: Optional[BaseException] = None) -> None:
+    if handle is None:
+        return
+    child, token = handle
+    child.duration_ms = round((time.perf_counter() - child.start) * 1000, 3)
+    if error is not None:
+        child.error = f"{type(error).__name__}: {error}"
+    child.trace.spans.append(child)
+    _current.reset(token)
+
+
+class _SpanScope:
+    __slots__ = ("name", "attributes", "handle")
+
+    def __init__(self, name: str, **attributes: Any) -> None:
+        self.name = name
+        self.attributes = attributes
+
+    def __enter__(self) -> None:
+        self.handle = start_span(self.name, **self.attributes)
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        end_span(self.handle, exc)
+
+
+def span(name: str, **attributes: Any) -> _SpanScope:
+    """Context manager for a child span; does nothing outside a trace."""
+    return _SpanScope(name, **attributes)
+
+
+class _TraceScope:
+    def __init__(self, name: str, trace_id: Optional[str], attributes: Dict[str, Any]) -> None:
+        self.name = name
+        self.trace_id = trace_id
+        self.attributes = attributes
+        self.handle: Optional[SpanHandle] = None
+        self.root: Optional[Span] = None
+        self.token: Optional[contextvars.Token] = None
+
+    def __enter__(self) -> Optional[str]:
+        if not ENABLED:
+            return None
+        if _current.get() is not None:
+            self.handle = start_span(self.name, **self.attributes)
+            return current_trace_id()
+        self.root = Span(_Trace(self.trace_id or uuid.uuid4().hex), self.name, None, self.attributes)
+        self.token = _current.set(self.root)
+        return self.root.trace.trace_id
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self.handle is not None:
+            end_span(self.handle, exc)
+            return
+        root = self.root
+        if root is None:
+            return
+        _current.reset(self.token)
+        root.duration_ms = round((time.perf_counter() - root.start) * 1000, 3)
+        if exc is not None:
+            root.error = f"{type(exc).__name__}: {exc}"
+        spans = root.trace.spans + [root]
+        # Tail sampling: the decision needs the finished trace's outcome.
+        failed = any(item.error is not None for item in spans)
+        if failed or root.duration_ms >= SLOW_THRESHOLD_MS or random.random() < SAMPLE_RATE:
+            write_spans(spans)
+
+
+def trace(name: str, trace_id: Optional[str] = None, **attributes: Any) -> _TraceScope:
+    """Context manager for a root span; yields the trace id (None when disabled).
+
+    Nested inside another trace it acts as a plain child span of it.
+    """
+    return _TraceScope(name, trace_id, attributes)
+
+
+def write_spans(spans: List[Span], path: Optional[Path] = None) -> None:
+    """Append spans to the trace file, rotating it once it exceeds ``MAX_BYTES``.
+
+    Writes happen under a lock file, so several server workers can share one
+    trace file. Failures are swallowed: tracing must never fail a request.
+    """
+    target = path or TRACE_PATH
+    payload = "".join(json.dumps(item.to_dict(), default=str) + "\n" for item in spans)
+    try:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with _write_lock, open(target.with_name(target.name + ".lock"), "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            if target.exists() and target.stat().st_size + len(payload) > MAX_BYTES:
+                _rotate(target)
+            with open(target, "a", encoding="utf-8") as handle:
+                handle.write(payload)
+    except OSError:
+        pass
+
+
+def _rotate(target: Path) -> None:
+    if BACKUP_COUNT <= 0:
+        os.unlink(target)
+        return
+    for index in range(BACKUP_COUNT - 1, 0, -1):
+        older = target.with_name(f"{target.name}.{index}")
+        if older.exists():
+            os.replace(older, target.with_name(f"{target.name}.{index + 1}"))
+    os.replace(target, target.with_name(f"{target.name}.1"))